@@ -0,0 +1,24 @@
+"""add files list index
+
+Revision ID: 20261018_add_files_list_index
+Revises: 20261018_add_upload_sessions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "20261018_add_files_list_index"
+down_revision: Union[str, None] = "20261018_add_upload_sessions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_files_user_upload", "files", ["user_id", "upload_time", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("idx_files_user_upload", table_name="files")
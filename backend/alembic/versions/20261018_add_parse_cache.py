@@ -0,0 +1,43 @@
+"""add parse cache
+
+Revision ID: 20261018_add_parse_cache
+Revises: 20260614_add_file_folders
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20261018_add_parse_cache"
+down_revision: Union[str, None] = "20260614_add_file_folders"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.create_index(op.f("ix_files_content_hash"), "files", ["content_hash"], unique=False)
+
+    op.create_table(
+        "parse_cache",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("settings_key", sa.String(length=64), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=True),
+        sa.ForeignKeyConstraint(["file_id"], ["files.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_parse_cache_file_id"), "parse_cache", ["file_id"], unique=False)
+    op.create_index("idx_parse_cache_key", "parse_cache", ["content_hash", "settings_key"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("idx_parse_cache_key", table_name="parse_cache")
+    op.drop_index(op.f("ix_parse_cache_file_id"), table_name="parse_cache")
+    op.drop_table("parse_cache")
+    op.drop_index(op.f("ix_files_content_hash"), table_name="files")
+    op.drop_column("files", "content_hash")
@@ -0,0 +1,70 @@
+"""add search pages
+
+Revision ID: 20261018_add_search_pages
+Revises: 20261018_add_files_list_index
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20261018_add_search_pages"
+down_revision: Union[str, None] = "20261018_add_files_list_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "search_pages",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.String(length=64), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=False),
+        sa.Column("source", sa.String(length=16), nullable=False),
+        sa.Column("page", sa.Integer(), nullable=True),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(["file_id"], ["files.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_search_pages_user_id"), "search_pages", ["user_id"], unique=False)
+    op.create_index(op.f("ix_search_pages_file_id"), "search_pages", ["file_id"], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        # trigram 分词需要 SQLite 3.34+，对中文按三字滑窗建索引
+        op.execute(
+            "CREATE VIRTUAL TABLE search_pages_fts USING fts5("
+            "text, content='search_pages', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER search_pages_ai AFTER INSERT ON search_pages BEGIN "
+            "INSERT INTO search_pages_fts(rowid, text) VALUES (new.id, new.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER search_pages_ad AFTER DELETE ON search_pages BEGIN "
+            "INSERT INTO search_pages_fts(search_pages_fts, rowid, text) VALUES ('delete', old.id, old.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER search_pages_au AFTER UPDATE ON search_pages BEGIN "
+            "INSERT INTO search_pages_fts(search_pages_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+            "INSERT INTO search_pages_fts(rowid, text) VALUES (new.id, new.text); END"
+        )
+    elif dialect == "postgresql":
+        op.execute("CREATE INDEX ix_search_pages_tsv ON search_pages USING gin (to_tsvector('simple', text))")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS search_pages_au")
+        op.execute("DROP TRIGGER IF EXISTS search_pages_ad")
+        op.execute("DROP TRIGGER IF EXISTS search_pages_ai")
+        op.execute("DROP TABLE IF EXISTS search_pages_fts")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_search_pages_tsv")
+    op.drop_index(op.f("ix_search_pages_file_id"), table_name="search_pages")
+    op.drop_index(op.f("ix_search_pages_user_id"), table_name="search_pages")
+    op.drop_table("search_pages")
@@ -0,0 +1,41 @@
+"""add upload sessions
+
+Revision ID: 20261018_add_upload_sessions
+Revises: 20261018_add_parse_cache
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20261018_add_upload_sessions"
+down_revision: Union[str, None] = "20261018_add_parse_cache"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("user_id", sa.String(length=64), nullable=False),
+        sa.Column("folder_id", sa.Integer(), nullable=True),
+        sa.Column("filename", sa.String(length=256), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("content_type", sa.String(length=64), nullable=True),
+        sa.Column("minio_path", sa.String(length=512), nullable=False),
+        sa.Column("upload_id", sa.String(length=256), nullable=False),
+        sa.Column("part_size", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=True),
+        sa.ForeignKeyConstraint(["folder_id"], ["folders.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_upload_sessions_user_id"), "upload_sessions", ["user_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_upload_sessions_user_id"), table_name="upload_sessions")
+    op.drop_table("upload_sessions")
@@ -0,0 +1,52 @@
+"""add user stats
+
+Revision ID: 20261018_add_user_stats
+Revises: 20261018_add_search_pages
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "20261018_add_user_stats"
+down_revision: Union[str, None] = "20261018_add_search_pages"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("files", sa.Column("page_count", sa.Integer(), nullable=True))
+    op.create_table(
+        "user_stats",
+        sa.Column("user_id", sa.String(length=64), nullable=False),
+        sa.Column("file_count", sa.Integer(), nullable=False),
+        sa.Column("total_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("parsed_count", sa.Integer(), nullable=False),
+        sa.Column("failed_count", sa.Integer(), nullable=False),
+        sa.Column("pages_parsed", sa.Integer(), nullable=False),
+        sa.Column("parse_seconds", sa.Float(), nullable=False),
+        sa.Column("reconciled_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_table(
+        "user_daily_stats",
+        sa.Column("user_id", sa.String(length=64), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("uploads", sa.Integer(), nullable=False),
+        sa.Column("upload_bytes", sa.BigInteger(), nullable=False),
+        sa.Column("parsed", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("pages_parsed", sa.Integer(), nullable=False),
+        sa.Column("parse_seconds", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "day"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_daily_stats")
+    op.drop_table("user_stats")
+    with op.batch_alter_table("files") as batch_op:
+        batch_op.drop_column("page_count")
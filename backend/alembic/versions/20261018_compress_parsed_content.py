@@ -0,0 +1,120 @@
+"""compress parsed content
+
+Revision ID: 20261018_compress_parsed
+Revises: 20261018_add_user_stats
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+import hashlib
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+revision: str = "20261018_compress_parsed"
+down_revision: Union[str, None] = "20261018_add_user_stats"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 200
+
+parsed_contents = sa.table(
+    "parsed_contents",
+    sa.column("id", sa.Integer()),
+    sa.column("content", sa.Text()),
+    sa.column("storage", sa.String()),
+    sa.column("content_hash", sa.String()),
+    sa.column("content_size", sa.Integer()),
+    sa.column("content_blob", sa.LargeBinary()),
+)
+
+
+def _compress(data: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(storage: str, blob: bytes) -> bytes:
+    if storage == "zstd":
+        if zstandard is None:
+            raise RuntimeError("downgrade 需要安装 zstandard 才能解压 zstd 行")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("parsed_contents") as batch_op:
+        batch_op.alter_column("content", existing_type=sa.Text(), nullable=True)
+        batch_op.add_column(sa.Column("storage", sa.String(length=16), nullable=False, server_default="inline"))
+        batch_op.add_column(sa.Column("content_hash", sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column("content_size", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("content_blob", sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column("object_key", sa.String(length=512), nullable=True))
+
+    # 分批把已有的文本行压缩进 content_blob，避免一次读入全部 Markdown
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(parsed_contents.c.id, parsed_contents.c.content)
+            .where(parsed_contents.c.storage == "inline", parsed_contents.c.id > last_id)
+            .order_by(parsed_contents.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row_id, content in rows:
+            data = (content or "").encode("utf-8")
+            storage, blob = _compress(data)
+            bind.execute(
+                parsed_contents.update()
+                .where(parsed_contents.c.id == row_id)
+                .values(
+                    storage=storage,
+                    content=None,
+                    content_hash=hashlib.sha256(data).hexdigest(),
+                    content_size=len(data),
+                    content_blob=blob,
+                )
+            )
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.execute(sa.text("SELECT COUNT(*) FROM parsed_contents WHERE storage = 'object'")).scalar():
+        raise RuntimeError("存在只保存 MinIO 指针的解析内容，无法还原为文本列")
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(parsed_contents.c.id, parsed_contents.c.storage, parsed_contents.c.content_blob)
+            .where(parsed_contents.c.storage != "inline", parsed_contents.c.id > last_id)
+            .order_by(parsed_contents.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row_id, storage, blob in rows:
+            bind.execute(
+                parsed_contents.update()
+                .where(parsed_contents.c.id == row_id)
+                .values(storage="inline", content=_decompress(storage, blob).decode("utf-8"), content_blob=None)
+            )
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table("parsed_contents") as batch_op:
+        batch_op.drop_column("object_key")
+        batch_op.drop_column("content_blob")
+        batch_op.drop_column("content_size")
+        batch_op.drop_column("content_hash")
+        batch_op.drop_column("storage")
+        batch_op.alter_column("content", existing_type=sa.Text(), nullable=False)
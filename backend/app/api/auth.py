@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import Optional
+
+from fastapi import APIRouter, Cookie, Depends, Header, HTTPException, Response
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.user import User
 from app.services.auth import (
+    AUTH_COOKIE_NAME,
     clear_auth_cookie,
     create_session_token,
     hash_password,
     normalize_email,
+    session_cache,
     set_auth_cookie,
     validate_password,
     verify_password,
@@ -56,7 +60,15 @@ def login(payload: AuthRequest, response: Response, db: Session = Depends(get_db
 
 
 @router.post("/auth/logout")
-def logout(response: Response):
+def logout(
+    response: Response,
+    session_token: Optional[str] = Cookie(None, alias=AUTH_COOKIE_NAME),
+    authorization: Optional[str] = Header(None),
+):
+    # 令牌本身无状态，这里只能清掉 Cookie 和本进程的会话缓存
+    session_cache.invalidate_token(session_token)
+    if authorization and authorization.startswith("Bearer "):
+        session_cache.invalidate_token(authorization.removeprefix("Bearer ").strip())
     clear_auth_cookie(response)
     return {"msg": "已退出登录"}
 
@@ -1,17 +1,27 @@
+import json
 import mimetypes
 import os
 from pathlib import Path
 from urllib.parse import quote
 
-from fastapi import APIRouter, Query, HTTPException, Depends
+from fastapi import APIRouter, Query, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sqlalchemy import or_
-from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, load_only
 from app.database import get_db
+from app.models.enums import FileStatus
 from app.models.file import File as FileModel
 from app.models.folder import Folder
+from app.models.parse_cache import ParseCache
 from app.models.parsed_content import ParsedContent
+from app.models.search_page import SearchPage
+from app.services import progress_events
+from app.services.file_listing import LIST_COLUMNS, LIST_ORDER, after_cursor, encode_cursor, file_count_cache
+from app.services.parser import DEAD_LETTER_STREAM
+from app.services.search_index import SearchIndexService
+from app.utils.redis_client import redis_client
 from app.utils.minio_client import minio_client, MINIO_BUCKET
 from app.utils.user_dep import get_user_id
 
@@ -23,6 +33,10 @@ except ImportError:
 router = APIRouter()
 MINIO_MDS_BUCKET = os.getenv("MINIO_MDS_BUCKET", "mds")
 _MINIO_MISSING_ERROR_CODES = {"NoSuchKey", "NoSuchObject", "NoSuchBucket", "NotFound"}
+# SSE 连接空闲时发送注释行的间隔，防止代理断开长连接
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# 死信由所有用户共用，按用户过滤时每次从 Redis 读取的条数
+DEAD_LETTER_SCAN_BATCH = 200
 
 
 class FileFolderPayload(BaseModel):
@@ -41,6 +55,8 @@ def _parsed_artifact_paths(file: FileModel) -> list[str]:
         f"{stem}_popo.md",
         f"{stem}_popo_status.json",
         f"{stem}_middle.json",
+        f"{stem}_source_map.json",
+        f"{stem}_source_map_index.json",
     ]
 
 
@@ -86,6 +102,8 @@ def list_files(
     search: str = Query('', description="按文件名搜索"),
     status: str = Query('', description="按状态筛选"),
     folder_id: str = Query('', description="按文件夹筛选，none 表示未分类"),
+    cursor: str = Query('', description="上一页返回的 next_cursor，传入后忽略 page"),
+    with_total: bool = Query(True, description="是否返回总数，翻页时可关闭"),
     user_id: str = Depends(get_user_id),
     db: Session = Depends(get_db)
 ):
@@ -101,16 +119,134 @@ def list_files(
             query = query.filter(FileModel.folder_id == int(folder_id))
         except ValueError:
             raise HTTPException(status_code=400, detail="文件夹参数无效")
-    total = query.count()
-    files = query.order_by(FileModel.upload_time.desc()) \
-        .offset((page-1)*page_size).limit(page_size).all()
+
+    total = None
+    if with_total:
+        total = file_count_cache.get_or_count(
+            (user_id, search, status.upper(), folder_id),
+            lambda: query.with_entities(func.count(FileModel.id)).order_by(None).scalar(),
+        )
+
+    page_query = query.options(load_only(*LIST_COLUMNS)).order_by(*LIST_ORDER)
+    if cursor:
+        page_query = after_cursor(page_query, cursor)
+    else:
+        page_query = page_query.offset((page-1)*page_size)
+    # 多取一条判断是否还有下一页
+    files = page_query.limit(page_size + 1).all()
+    has_more = len(files) > page_size
+    files = files[:page_size]
     return {
         "total": total,
         "page": page,
         "page_size": page_size,
+        "next_cursor": encode_cursor(files[-1]) if has_more else None,
         "files": [f.to_dict() for f in files]
     }
 
+def _sse_message(data: dict) -> str:
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _progress_snapshot(db: Session, user_id: str) -> list[dict]:
+    in_flight = db.query(FileModel).filter(
+        FileModel.user_id == user_id,
+        FileModel.status.in_([FileStatus.PENDING, FileStatus.PARSING]),
+    ).all()
+    return [progress_events.progress_event(file) for file in in_flight]
+
+
+@router.get("/files/events")
+async def file_events(
+    request: Request,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """通过 SSE 推送当前用户所有文件的解析进度，连接建立时先发送排队和解析中文件的快照。"""
+    snapshot = await run_in_threadpool(_progress_snapshot, db, user_id)
+
+    async def stream():
+        for event in snapshot:
+            yield _sse_message(event)
+        idle_seconds = 0.0
+        async for event in progress_events.subscribe_progress(user_id):
+            if await request.is_disconnected():
+                break
+            if event is not None:
+                idle_seconds = 0.0
+                yield _sse_message(event)
+                continue
+            idle_seconds += 1.0
+            if idle_seconds >= SSE_KEEPALIVE_SECONDS:
+                idle_seconds = 0.0
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _decode_stream_value(value):
+    return value.decode("utf-8", errors="replace") if isinstance(value, bytes) else value
+
+
+@router.get("/files/dead-letters")
+def list_dead_letters(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = Query(None, description="上一页返回的 next_cursor"),
+    user_id: str = Depends(get_user_id),
+):
+    """查看当前用户被移入死信队列的解析任务（多次中断后不再自动重试）。
+
+    死信由所有用户共用，这里从 cursor 往前分批读取，直到凑满 limit 条当前用户的记录或读完为止。
+    """
+    if redis_client.client is None:
+        raise HTTPException(status_code=503, detail="Redis 不可用")
+    items = []
+    next_cursor = None
+    while True:
+        batch = redis_client.read_dead_letters(DEAD_LETTER_STREAM, count=DEAD_LETTER_SCAN_BATCH, before=cursor)
+        for message_id, fields in batch:
+            cursor = _decode_stream_value(message_id)
+            fields = {_decode_stream_value(key): _decode_stream_value(value) for key, value in fields.items()}
+            try:
+                task_data = json.loads(fields.get("data") or "{}")
+            except ValueError:
+                task_data = {}
+            if str(task_data.get("user_id")) != user_id:
+                continue
+            items.append({
+                "id": cursor,
+                "file_id": task_data.get("file_id"),
+                "parse_method": task_data.get("parse_method"),
+                "stream": fields.get("stream"),
+                "original_id": fields.get("original_id"),
+                "consumer": fields.get("consumer"),
+                "deliveries": int(fields.get("deliveries") or 0),
+                "reason": fields.get("reason"),
+                "dead_at": fields.get("dead_at"),
+            })
+            if len(items) >= limit:
+                next_cursor = cursor
+                break
+        if next_cursor or len(batch) < DEAD_LETTER_SCAN_BATCH:
+            break
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/files/search")
+def search_files(
+    q: str = Query(..., min_length=1, max_length=200, description="检索词，多个词以空格分隔"),
+    limit: int = Query(20, ge=1, le=100),
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """按解析内容全文检索，返回按相关度排序的命中页和摘要。"""
+    return {"query": q, "hits": SearchIndexService(db).search(user_id, q, limit)}
+
+
 @router.get("/files/{file_id}")
 def file_detail(
     file_id: int,
@@ -221,6 +357,10 @@ def delete_file(
             ParsedContent.user_id == user_id
         ).delete()
 
+        # 产物已删除，指向该文件的解析缓存失效
+        db.query(ParseCache).filter(ParseCache.file_id == file_id).delete()
+        db.query(SearchPage).filter(SearchPage.file_id == file_id).delete()
+
         # 删除文件记录
         db.delete(file)
         db.commit()
@@ -2,15 +2,18 @@ import json
 import re
 import traceback
 from io import BytesIO
-from typing import Any
-from fastapi import APIRouter, Query, HTTPException, Depends, Request
+from fastapi import APIRouter, Query, HTTPException, Depends, Header, Response
+from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from pathlib import Path
 from app.database import get_db
 from app.models.file import File as FileModel
 from app.models.enums import FileStatus
 from app.models.parsed_content import ParsedContent
-from app.services.parser import ParserService, get_buckets
+from app.services.parsed_content_store import ParsedContentStore
+from app.services.parser import PARSE_LANE_REPARSE, ParserService, get_buckets
+from app.services.source_lookup import SourceLookup, source_lookup_cache
+from app.services.source_map import SourceMapService
 from app.utils.minio_client import get_presigned_url, minio_client
 from app.utils.user_dep import get_user_id
 
@@ -24,6 +27,12 @@ router = APIRouter()
 _MINIO_MISSING_ERROR_CODES = {"NoSuchKey", "NoSuchObject", "NoSuchBucket", "NotFound"}
 
 
+class SourceTracePayload(BaseModel):
+    text: str = Field(..., max_length=20000)
+    page: int | None = None
+    limit: int = Field(20, ge=1, le=100)
+
+
 def _artifact_stem(file: FileModel) -> str:
     return Path(file.minio_path).stem
 
@@ -58,13 +67,33 @@ def _popo_tree_path(file: FileModel) -> str:
     return f"{_artifact_stem(file)}_popo.json"
 
 
-def _middle_json_candidates(file: FileModel) -> list[str]:
-    stem = _artifact_stem(file)
-    return [
-        f"{stem}/{stem}_middle.json",
-        f"{stem}/auto/{stem}_middle.json",
-        f"{stem}_middle.json",
-    ]
+def _parse_page_range(pages: str | None) -> tuple[int, int] | None:
+    if not pages:
+        return None
+    match = re.fullmatch(r"\s*(\d+)\s*(?:-\s*(\d+)\s*)?", pages)
+    if not match:
+        raise HTTPException(status_code=400, detail="页码范围格式应为 10-20 或 3")
+    first = int(match.group(1))
+    last = int(match.group(2)) if match.group(2) else first
+    if first < 1 or last < first:
+        raise HTTPException(status_code=400, detail="页码范围无效")
+    return first, last
+
+
+def _source_map_etag(digest: str, page_range: tuple[int, int] | None) -> str:
+    return f"{digest}-{page_range[0]}-{page_range[1]}" if page_range else digest
+
+
+def _source_map_headers(etag: str) -> dict[str, str]:
+    # no-cache 让浏览器每次带 If-None-Match 重新验证，内容未变时只返回 304
+    return {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/").strip('"') == etag for value in candidates)
 
 
 def _read_minio_object(bucket: str, path: str) -> bytes:
@@ -88,216 +117,6 @@ def _is_missing_object_error(exc: Exception) -> bool:
     return False
 
 
-def _coerce_number(value: Any) -> int | float | None:
-    if isinstance(value, bool):
-        return None
-    if isinstance(value, int | float):
-        return value
-    if isinstance(value, str):
-        try:
-            number = float(value)
-        except ValueError:
-            return None
-        if number.is_integer():
-            return int(number)
-        return number
-    return None
-
-
-def _flatten_numbers(value: Any) -> list[int | float]:
-    if isinstance(value, list | tuple):
-        numbers: list[int | float] = []
-        for item in value:
-            numbers.extend(_flatten_numbers(item))
-        return numbers
-    number = _coerce_number(value)
-    return [number] if number is not None else []
-
-
-def _normalize_bbox(value: Any) -> list[int | float] | None:
-    numbers = _flatten_numbers(value)
-    if len(numbers) == 4:
-        return numbers
-    if len(numbers) >= 8 and len(numbers) % 2 == 0:
-        xs = numbers[0::2]
-        ys = numbers[1::2]
-        return [min(xs), min(ys), max(xs), max(ys)]
-    return None
-
-
-def _extract_bbox(item: dict[str, Any]) -> list[int | float] | None:
-    for key in ("bbox", "layout_bbox", "line_bbox", "span_bbox", "poly"):
-        bbox = _normalize_bbox(item.get(key))
-        if bbox:
-            return bbox
-    return None
-
-
-def _clean_source_text(value: Any) -> str:
-    text = str(value)
-    text = re.sub(r"<[^>]+>", " ", text)
-    return re.sub(r"\s+", " ", text).strip()
-
-
-def _join_source_text(parts: list[str]) -> str:
-    seen = set()
-    unique_parts = []
-    for part in parts:
-        if part and part not in seen:
-            seen.add(part)
-            unique_parts.append(part)
-    return " ".join(unique_parts).strip()
-
-
-def _source_text_signature(text: str) -> str:
-    return re.sub(r"[^\w]+", "", text, flags=re.UNICODE).lower()
-
-
-def _merge_duplicate_source_block(
-    blocks: list[dict[str, Any]],
-    bbox: list[int | float],
-    block_type: str,
-    text: str,
-) -> bool:
-    text_signature = _source_text_signature(text)
-    if not text_signature:
-        return False
-
-    for block in blocks:
-        if block.get("type") != block_type or block.get("bbox") != bbox:
-            continue
-
-        existing_text = str(block.get("text") or "")
-        existing_signature = _source_text_signature(existing_text)
-        if not existing_signature:
-            continue
-        if text_signature not in existing_signature and existing_signature not in text_signature:
-            continue
-
-        if len(text_signature) > len(existing_signature):
-            block["text"] = text
-        return True
-    return False
-
-
-def _extract_text(value: Any) -> str:
-    if isinstance(value, str):
-        return _clean_source_text(value)
-    if isinstance(value, list):
-        return _join_source_text([_extract_text(item) for item in value])
-    if not isinstance(value, dict):
-        return ""
-
-    parts = []
-    for key in ("text", "content"):
-        item = value.get(key)
-        if isinstance(item, str):
-            parts.append(_clean_source_text(item))
-        elif isinstance(item, dict | list):
-            parts.append(_extract_text(item))
-    if parts:
-        return _join_source_text(parts)
-
-    for key in ("spans", "lines", "blocks"):
-        item = value.get(key)
-        if isinstance(item, dict | list):
-            parts.append(_extract_text(item))
-    return _join_source_text(parts)
-
-
-def _extract_block_type(item: dict[str, Any]) -> str:
-    for key in ("type", "block_type", "category_type", "sub_type"):
-        value = item.get(key)
-        if value:
-            return str(value)
-    return "block"
-
-
-def _page_index(page_info: dict[str, Any], fallback_index: int) -> int:
-    page_idx = _coerce_number(page_info.get("page_idx"))
-    return int(page_idx) if page_idx is not None else fallback_index
-
-
-def _page_dimensions(page_info: dict[str, Any]) -> tuple[int | float | None, int | float | None]:
-    size = page_info.get("page_size") or page_info.get("size")
-    if isinstance(size, dict):
-        return _coerce_number(size.get("width")), _coerce_number(size.get("height"))
-    numbers = _flatten_numbers(size)
-    if len(numbers) >= 2:
-        return numbers[0], numbers[1]
-
-    width = (
-        _coerce_number(page_info.get("width"))
-        or _coerce_number(page_info.get("page_width"))
-        or _coerce_number(page_info.get("w"))
-    )
-    height = (
-        _coerce_number(page_info.get("height"))
-        or _coerce_number(page_info.get("page_height"))
-        or _coerce_number(page_info.get("h"))
-    )
-    return width, height
-
-
-def _collect_source_blocks(value: Any, page_number: int, blocks: list[dict[str, Any]], seen: set[tuple]) -> None:
-    if isinstance(value, list):
-        for item in value:
-            _collect_source_blocks(item, page_number, blocks, seen)
-        return
-    if not isinstance(value, dict):
-        return
-
-    bbox = _extract_bbox(value)
-    text = _extract_text(value)
-    block_type = _extract_block_type(value)
-    if bbox and text:
-        bounded_text = text[:1200]
-        if _merge_duplicate_source_block(blocks, bbox, block_type, bounded_text):
-            return
-        key = (tuple(bbox), bounded_text, block_type)
-        if key not in seen:
-            seen.add(key)
-            blocks.append(
-                {
-                    "id": f"p{page_number}-b{len(blocks) + 1}",
-                    "type": block_type,
-                    "text": bounded_text,
-                    "bbox": bbox,
-                }
-            )
-        return
-
-    for item in value.values():
-        if isinstance(item, dict | list):
-            _collect_source_blocks(item, page_number, blocks, seen)
-
-
-def _normalize_source_map(middle_json: dict[str, Any]) -> dict[str, list[dict[str, Any]]]:
-    pdf_info = middle_json.get("pdf_info")
-    if not isinstance(pdf_info, list):
-        return {"pages": []}
-
-    pages = []
-    for index, page_info in enumerate(pdf_info):
-        if not isinstance(page_info, dict):
-            continue
-        page_idx = _page_index(page_info, index)
-        page_number = page_idx + 1
-        width, height = _page_dimensions(page_info)
-        blocks: list[dict[str, Any]] = []
-        _collect_source_blocks(page_info, page_number, blocks, set())
-        pages.append(
-            {
-                "page": page_number,
-                "page_idx": page_idx,
-                "width": width,
-                "height": height,
-                "blocks": blocks,
-            }
-        )
-    return {"pages": pages}
-
-
 @router.get("/files/{file_id}/parsed_content")
 def get_parsed_content(
     file_id: int,
@@ -331,41 +150,117 @@ def get_parsed_content(
 @router.get("/files/{file_id}/source_map")
 def get_source_map(
     file_id: int,
+    pages: str | None = Query(None, description="页码范围，例如 10-20 或 3；不传返回全部页"),
+    if_none_match: str | None = Header(None),
     user_id: str = Depends(get_user_id),
     db: Session = Depends(get_db),
 ):
+    page_range = _parse_page_range(pages)
     file = db.query(FileModel).filter(FileModel.id == file_id, FileModel.user_id == user_id).first()
     if not file:
         raise HTTPException(status_code=404, detail="文件不存在")
 
     buckets = get_buckets()
     mds_bucket = buckets[0]
+    stem = _artifact_stem(file)
+    service = SourceMapService(minio_client)
+
+    # 优先使用解析完成时预计算的产物，只有 middle.json 变化或产物缺失时才重新归一化
+    try:
+        digest = service.fresh_etag(mds_bucket, stem)
+        content = None
+        if digest:
+            etag = _source_map_etag(digest, page_range)
+            if _etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=_source_map_headers(etag))
+            try:
+                if page_range:
+                    content = service.read_pages(mds_bucket, stem, digest, *page_range)
+                else:
+                    content = service.read(mds_bucket, stem)
+            except Exception as e:
+                if not _is_missing_object_error(e):
+                    raise
+        if content is None:
+            artifact = service.rebuild(mds_bucket, stem)
+            if artifact is None:
+                return {"pages": [], "page_count": 0, "block_count": 0} if page_range else {"pages": []}
+            etag = _source_map_etag(artifact.etag, page_range)
+            content = artifact.select(*page_range) if page_range else artifact.content
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return Response(content=content, media_type="application/json", headers=_source_map_headers(etag))
 
+
+def _source_lookup(file: FileModel) -> SourceLookup | None:
+    """取与当前 middle.json 一致的查找索引，按产物摘要缓存在进程内。"""
+    mds_bucket = get_buckets()[0]
+    stem = _artifact_stem(file)
+    service = SourceMapService(minio_client)
+    digest = service.fresh_etag(mds_bucket, stem)
     content = None
-    for path in _middle_json_candidates(file):
+    if digest:
+        lookup = source_lookup_cache.get(f"{mds_bucket}/{stem}:{digest}")
+        if lookup is not None:
+            return lookup
         try:
-            content = _read_minio_object(mds_bucket, path)
-            break
+            content = service.read(mds_bucket, stem)
         except Exception as e:
-            if _is_missing_object_error(e):
-                continue
-            raise HTTPException(status_code=500, detail=str(e))
-
+            if not _is_missing_object_error(e):
+                raise
     if content is None:
-        return {"pages": []}
+        artifact = service.rebuild(mds_bucket, stem)
+        if artifact is None:
+            return None
+        digest, content = artifact.etag, artifact.content
+    lookup = SourceLookup(json.loads(content))
+    source_lookup_cache.put(f"{mds_bucket}/{stem}:{digest}", lookup)
+    return lookup
+
+
+@router.get("/files/{file_id}/source_map/hit")
+def hit_source_blocks(
+    file_id: int,
+    page: int = Query(..., ge=1),
+    x: float = Query(...),
+    y: float = Query(...),
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db),
+):
+    """返回该页坐标 (x, y) 处的块，坐标与 bbox 同一坐标系，内层的块在前。"""
+    file = db.query(FileModel).filter(FileModel.id == file_id, FileModel.user_id == user_id).first()
+    if not file:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    try:
+        lookup = _source_lookup(file)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"blocks": lookup.hit(page, x, y) if lookup else []}
 
+
+@router.post("/files/{file_id}/source_map/trace")
+def trace_source_blocks(
+    file_id: int,
+    payload: SourceTracePayload,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db),
+):
+    """返回与 Markdown 片段文本对应的块，按在片段中出现的顺序排列。"""
+    file = db.query(FileModel).filter(FileModel.id == file_id, FileModel.user_id == user_id).first()
+    if not file:
+        raise HTTPException(status_code=404, detail="文件不存在")
     try:
-        middle_json = json.loads(content.decode("utf-8"))
-    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        lookup = _source_lookup(file)
+    except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if lookup is None:
+        return {"blocks": []}
+    return {"blocks": lookup.trace(payload.text, page=payload.page, limit=payload.limit)}
 
-    if not isinstance(middle_json, dict):
-        return {"pages": []}
-    return _normalize_source_map(middle_json)
 
 @router.post("/files/{file_id}/parse")
 def parse_file(
-    request: Request,
     file_id: int,
     user_id: str = Depends(get_user_id),
     db: Session = Depends(get_db)
@@ -382,12 +277,12 @@ def parse_file(
         return {"msg": "文件正在解析中"}
 
     try:
-        # 执行解析
+        # 重新解析走独立的队列，由 worker 调度
         parser = ParserService(db)
-        result = parser.parse_file(file, user_id, predictor=request.app.state.predictor)
+        result = parser.queue_parse_file(file, user_id, lane=PARSE_LANE_REPARSE)
 
         return {
-            "msg": "解析完成",
+            "msg": "解析任务已提交",
             "file_id": file_id,
             "details": result
         }
@@ -395,6 +290,7 @@ def parse_file(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+
 @router.get("/files/{file_id}/parse/status")
 def get_parse_status(
     file_id: int,
@@ -433,6 +329,7 @@ def get_parse_status(
         result["mineru_task_payload"] = payload
     return result
 
+
 @router.get("/files/{file_id}/export")
 def export_content(
     file_id: int,
@@ -474,10 +371,18 @@ def export_content(
             ParsedContent.file_id == file_id,
             ParsedContent.user_id == user_id,
         ).first()
-        if not parsed_content or not parsed_content.content:
+        if not parsed_content:
+            raise HTTPException(status_code=404, detail="导出文件不存在")
+        try:
+            markdown = ParsedContentStore(db, minio=minio_client).read(parsed_content)
+        except Exception as read_error:
+            if not _is_missing_object_error(read_error):
+                raise HTTPException(status_code=500, detail=str(read_error))
+            markdown = ""
+        if not markdown:
             raise HTTPException(status_code=404, detail="导出文件不存在")
 
-        content = parsed_content.content.encode("utf-8")
+        content = markdown.encode("utf-8")
         minio_client.put_object(
             mds_bucket,
             output_path,
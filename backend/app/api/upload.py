@@ -1,21 +1,148 @@
+import asyncio
 import traceback
 import os
 import uuid
 from datetime import datetime
 from typing import List
 from fastapi import APIRouter, UploadFile, File, Depends, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.file import File as FileModel
 from app.models.enums import FileStatus, DEFAULT_MINERU_BACKEND, normalize_backend_value
 from app.models.folder import Folder
 from app.models.settings import Settings
-from app.utils.minio_client import upload_file
+from app.models.upload_session import UploadSession
+from app.services.auth import create_upload_token, decode_upload_token
+from app.utils.minio_client import (
+    HashingReader,
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    list_uploaded_parts,
+    presigned_put_url,
+    presigned_upload_part_url,
+    remove_uploaded_object,
+    stat_uploaded_object,
+    upload_file,
+)
 from app.utils.user_dep import get_user_id
-from app.services.parser import ParserService
+from app.services.parser import PARSE_LANE_INTERACTIVE, ParserService
 
 router = APIRouter()
 
+# 分片大小，S3 协议要求除最后一片外不小于 5MiB，且最多 10000 片
+UPLOAD_PART_SIZE = max(5 * 1024 * 1024, int(os.getenv("UPLOAD_PART_SIZE", str(16 * 1024 * 1024))))
+UPLOAD_MAX_PARTS = 10000
+UPLOAD_PART_URL_EXPIRES = int(os.getenv("UPLOAD_PART_URL_EXPIRES", "3600"))
+UPLOAD_PRESIGN_EXPIRES = int(os.getenv("UPLOAD_PRESIGN_EXPIRES", "3600"))
+# 表单上传时同时写入 MinIO 的文件数
+UPLOAD_CONCURRENCY = max(1, int(os.getenv("UPLOAD_CONCURRENCY", "4")))
+
+
+class UploadSessionPayload(BaseModel):
+    filename: str
+    size: int
+    content_type: str | None = None
+    folder_id: int | None = None
+
+
+class PresignFile(BaseModel):
+    filename: str
+    size: int
+    content_type: str | None = None
+
+
+class PresignPayload(BaseModel):
+    files: List[PresignFile]
+    folder_id: int | None = None
+
+
+class CompletePayload(BaseModel):
+    upload_tokens: List[str]
+
+
+def _check_folder(db: Session, folder_id: int | None, user_id: str) -> None:
+    if folder_id is None:
+        return
+    folder = db.query(Folder).filter(Folder.id == folder_id, Folder.user_id == user_id).first()
+    if not folder:
+        raise HTTPException(status_code=404, detail="文件夹不存在")
+
+
+def _register_files(
+    db: Session,
+    user_id: str,
+    entries: list[dict],
+    lane: str = PARSE_LANE_INTERACTIVE,
+) -> list[FileModel]:
+    """批量登记已写入 MinIO 的源文件。
+
+    用户设置只查询一次，文件记录和排队状态在同一次提交中写入，提交后再写入解析 Stream。
+    复用相同内容的解析结果由 worker 完成，上传请求不复制产物。entries 为 FileModel 的字段字典。
+    """
+    if not entries:
+        return []
+    # 获取用户设置并转换后端类型
+    settings = db.query(Settings).filter(Settings.user_id == user_id).first()
+    backend = DEFAULT_MINERU_BACKEND
+    if settings and settings.backend:
+        backend = normalize_backend_value(settings.backend)
+
+    upload_time = datetime.utcnow()
+    db_files = [
+        FileModel(
+            user_id=user_id,
+            status=FileStatus.PENDING,
+            upload_time=upload_time,
+            backend=backend,
+            **entry,
+        )
+        for entry in entries
+    ]
+    db.add_all(db_files)
+    # 只 flush 取得 ID，排队状态由 queue_parse_files 写入后和文件记录一起提交，之后才写入 Stream
+    db.flush()
+    ids = [db_file.id for db_file in db_files]
+    ParserService(db).queue_parse_files(db_files, user_id, lane=lane, reuse_cache=True)
+    # 提交后属性已过期，一次查询重新加载，避免逐个刷新
+    db.query(FileModel).filter(FileModel.id.in_(ids)).all()
+    return db_files
+
+
+def _register_uploads(db: Session, user_id: str, entries: list[dict], lane: str) -> list[dict]:
+    return [db_file.to_dict() for db_file in _register_files(db, user_id, entries, lane=lane)]
+
+
+def _store_upload(file: UploadFile, folder_id: int | None) -> dict:
+    """把上传的文件写入 MinIO，同时计算内容哈希用于复用解析结果。"""
+    ext = os.path.splitext(file.filename)[1]
+    unique_filename = f"{uuid.uuid4()}{ext}"
+    reader = HashingReader(file.file)
+    upload_file(
+        reader,
+        unique_filename,
+        file.content_type
+    )
+    return {
+        "filename": file.filename,
+        "size": file.size,
+        "minio_path": unique_filename,
+        "content_type": file.content_type,
+        "content_hash": reader.hexdigest() if reader.bytes_read else None,
+        "folder_id": folder_id,
+    }
+
+
+def _failed_upload(filename: str, error: Exception) -> dict:
+    return {
+        "filename": filename,
+        "status": "failed",
+        "error_message": f"文件 {filename} 上传失败: {str(error)}",
+    }
+
+
 @router.post("/upload")
 async def upload_files(
     files: List[UploadFile] = File(...),
@@ -23,60 +150,282 @@ async def upload_files(
     user_id: str = Depends(get_user_id),
     db: Session = Depends(get_db)
 ):
-    results = []
+    """上传一批文件。文件并发写入 MinIO，单个文件失败不影响其他文件，结果按文件返回。
 
-    if folder_id is not None:
-        folder = db.query(Folder).filter(Folder.id == folder_id, Folder.user_id == user_id).first()
-        if not folder:
-            raise HTTPException(status_code=404, detail="文件夹不存在")
+    MinIO 写入和数据库操作都放到线程池执行，大文件上传不会阻塞同一进程里的其他请求。
+    """
+    await run_in_threadpool(_check_folder, db, folder_id, user_id)
 
-    for file in files:
-        try:
-            # 生成唯一文件名
-            ext = os.path.splitext(file.filename)[1]
-            unique_filename = f"{uuid.uuid4()}{ext}"
-
-            # 保存到 MinIO
-            upload_file(
-                file.file,
-                unique_filename,
-                file.content_type
-            )
-
-            # 获取用户设置并转换后端类型
-            settings = db.query(Settings).filter(Settings.user_id == user_id).first()
-            backend = DEFAULT_MINERU_BACKEND
-            if settings and settings.backend:
-                backend = normalize_backend_value(settings.backend)
-
-            # 保存到数据库
-            db_file = FileModel(
-                user_id=user_id,
-                filename=file.filename,
-                size=file.size,
-                status=FileStatus.PENDING,
-                upload_time=datetime.utcnow(),
-                minio_path=unique_filename,
-                content_type=file.content_type,
-                backend=backend,
-                folder_id=folder_id
-            )
-            db.add(db_file)
-            db.commit()
-            db.refresh(db_file)
-
-            # 将解析任务加入队列
-            parser_service = ParserService(db)
-            parser_service.queue_parse_file(db_file, user_id)
-
-            results.append(db_file.to_dict())
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
 
-        except Exception as e:
-            db.rollback()
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"文件 {file.filename} 上传失败: {str(e)}")
+    async def store(file: UploadFile) -> dict:
+        async with semaphore:
+            return await run_in_threadpool(_store_upload, file, folder_id)
+
+    stored = await asyncio.gather(*(store(file) for file in files), return_exceptions=True)
+
+    results: list[dict | None] = [None] * len(files)
+    entries = []
+    for index, (file, result) in enumerate(zip(files, stored)):
+        if isinstance(result, Exception):
+            traceback.print_exception(result)
+            results[index] = _failed_upload(file.filename, result)
+        else:
+            entries.append((index, result))
+
+    # 一次上传很多文件时进入批量队列，不阻塞其他用户的单文件上传
+    lane = ParserService.upload_lane(len(files))
+    try:
+        registered = await run_in_threadpool(_register_uploads, db, user_id, [entry for _, entry in entries], lane)
+        for (index, _), file_dict in zip(entries, registered):
+            results[index] = file_dict
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        traceback.print_exc()
+        for index, entry in entries:
+            results[index] = _failed_upload(entry["filename"], e)
+
+    failed = sum(1 for result in results if result.get("status") == "failed")
+    return {
+        "total": len(results),
+        "success": len(results) - failed,
+        "failed": failed,
+        "files": results
+    }
+
+
+@router.post("/upload/presign")
+def presign_uploads(
+    payload: PresignPayload,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """为每个文件签发预签名 PUT URL，浏览器直接上传到 MinIO，完成后调用 /upload/complete。"""
+    if not payload.files:
+        raise HTTPException(status_code=400, detail="请选择要上传的文件")
+    if any(item.size <= 0 for item in payload.files):
+        raise HTTPException(status_code=400, detail="文件大小无效")
+    _check_folder(db, payload.folder_id, user_id)
 
+    uploads = []
+    for item in payload.files:
+        ext = os.path.splitext(item.filename)[1]
+        minio_path = f"{uuid.uuid4()}{ext}"
+        upload = {
+            "path": minio_path,
+            "filename": item.filename,
+            "size": item.size,
+            "content_type": item.content_type,
+            "folder_id": payload.folder_id,
+        }
+        uploads.append(
+            {
+                "filename": item.filename,
+                "minio_path": minio_path,
+                "url": presigned_put_url(minio_path, expires=UPLOAD_PRESIGN_EXPIRES),
+                "upload_token": create_upload_token(user_id, upload, UPLOAD_PRESIGN_EXPIRES),
+            }
+        )
+    return {"uploads": uploads}
+
+
+@router.post("/upload/complete")
+def complete_uploads(
+    payload: CompletePayload,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """用 stat_object 确认直传的对象已写入且大小与签发凭证时声明的一致，再登记文件并加入解析队列。"""
+    if not payload.upload_tokens:
+        raise HTTPException(status_code=400, detail="请选择要上传的文件")
+    uploads = [decode_upload_token(token, user_id) for token in payload.upload_tokens]
+
+    stats = [stat_uploaded_object(upload["path"]) for upload in uploads]
+    missing = [upload["filename"] for upload, stat in zip(uploads, stats) if stat is None]
+    if missing:
+        raise HTTPException(status_code=409, detail={"message": "文件尚未上传完成", "files": missing})
+    mismatched = [upload for upload, stat in zip(uploads, stats) if stat.size != upload["size"]]
+    if mismatched:
+        # 实际写入的对象与声明的大小不符，删除后要求重新上传
+        for upload in mismatched:
+            try:
+                remove_uploaded_object(upload["path"])
+            except Exception:
+                traceback.print_exc()
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "上传的文件大小与声明不一致", "files": [upload["filename"] for upload in mismatched]},
+        )
+
+    # 重复调用 complete 时直接返回已登记的文件
+    paths = [upload["path"] for upload in uploads]
+    existing = {
+        db_file.minio_path: db_file
+        for db_file in db.query(FileModel).filter(FileModel.user_id == user_id, FileModel.minio_path.in_(paths))
+    }
+    entries = [
+        {
+            "filename": upload["filename"],
+            "size": stat.size,
+            "minio_path": upload["path"],
+            "content_type": upload.get("content_type") or stat.content_type,
+            "content_hash": None,
+            "folder_id": upload.get("folder_id"),
+        }
+        for upload, stat in zip(uploads, stats)
+        if upload["path"] not in existing
+    ]
+    try:
+        registered = _register_files(db, user_id, entries, lane=ParserService.upload_lane(len(uploads)))
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"文件上传失败: {str(e)}")
+    existing.update((db_file.minio_path, db_file) for db_file in registered)
+
+    results = [existing[path].to_dict() for path in paths]
     return {
         "total": len(results),
+        "success": len(results),
+        "failed": 0,
         "files": results
     }
+
+
+def _get_session(db: Session, session_id: str, user_id: str) -> UploadSession:
+    session = db.query(UploadSession).filter(UploadSession.id == session_id, UploadSession.user_id == user_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="上传会话不存在")
+    return session
+
+
+def _session_response(session: UploadSession, uploaded: list[int]) -> dict:
+    """返回会话信息和尚未上传分片的预签名 URL，客户端据此续传。"""
+    done = set(uploaded)
+    return {
+        **session.to_dict(),
+        "uploaded_parts": sorted(done),
+        "parts": [
+            {
+                "part_number": number,
+                "url": presigned_upload_part_url(
+                    session.minio_path, session.upload_id, number, expires=UPLOAD_PART_URL_EXPIRES
+                ),
+            }
+            for number in range(1, session.part_count + 1)
+            if number not in done
+        ],
+    }
+
+
+@router.post("/upload/sessions")
+def create_upload_session(
+    payload: UploadSessionPayload,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """创建分片上传会话，浏览器按返回的 URL 直接把各分片 PUT 到 MinIO。"""
+    if payload.size <= 0:
+        raise HTTPException(status_code=400, detail="文件大小无效")
+    _check_folder(db, payload.folder_id, user_id)
+
+    ext = os.path.splitext(payload.filename)[1]
+    minio_path = f"{uuid.uuid4()}{ext}"
+    part_size = max(UPLOAD_PART_SIZE, -(-payload.size // UPLOAD_MAX_PARTS))
+    try:
+        upload_id = create_multipart_upload(minio_path, payload.content_type)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"创建上传会话失败: {str(e)}")
+
+    session = UploadSession(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        folder_id=payload.folder_id,
+        filename=payload.filename,
+        size=payload.size,
+        content_type=payload.content_type,
+        minio_path=minio_path,
+        upload_id=upload_id,
+        part_size=part_size,
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return _session_response(session, [])
+
+
+@router.get("/upload/sessions/{session_id}")
+def get_upload_session(
+    session_id: str,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """查询已上传的分片，用于断线后续传。"""
+    session = _get_session(db, session_id, user_id)
+    parts = list_uploaded_parts(session.minio_path, session.upload_id)
+    return _session_response(session, [part.part_number for part in parts])
+
+
+@router.post("/upload/sessions/{session_id}/complete")
+def complete_upload_session(
+    session_id: str,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """合并分片并登记文件。分片 ETag 从 MinIO 读取，客户端无需回传。
+
+    合并成功后 MinIO 中的 upload_id 即失效；若随后登记失败，重试时通过 stat_object
+    找到已合并的对象直接登记，不再重复合并。
+    """
+    session = _get_session(db, session_id, user_id)
+    stat = stat_uploaded_object(session.minio_path)
+    if stat is None:
+        parts = sorted(list_uploaded_parts(session.minio_path, session.upload_id), key=lambda part: part.part_number)
+        missing = sorted(set(range(1, session.part_count + 1)) - {part.part_number for part in parts})
+        if missing:
+            raise HTTPException(status_code=409, detail={"message": "分片未上传完整", "missing_parts": missing})
+        uploaded_size = sum(part.size or 0 for part in parts)
+        if uploaded_size and uploaded_size != session.size:
+            raise HTTPException(status_code=409, detail="分片总大小与文件大小不一致")
+        try:
+            complete_multipart_upload(session.minio_path, session.upload_id, parts)
+        except Exception as e:
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"文件 {session.filename} 上传失败: {str(e)}")
+    elif stat.size != session.size:
+        raise HTTPException(status_code=409, detail="分片总大小与文件大小不一致")
+
+    try:
+        db.delete(session)
+        entry = {
+            "filename": session.filename,
+            "size": session.size,
+            "minio_path": session.minio_path,
+            "content_type": session.content_type,
+            "content_hash": None,
+            "folder_id": session.folder_id,
+        }
+        db_file = _register_files(db, user_id, [entry])[0]
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"文件 {session.filename} 上传失败: {str(e)}")
+    return db_file.to_dict()
+
+
+@router.delete("/upload/sessions/{session_id}")
+def abort_upload_session(
+    session_id: str,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    session = _get_session(db, session_id, user_id)
+    try:
+        abort_multipart_upload(session.minio_path, session.upload_id)
+    except Exception:
+        # MinIO 侧已清理或过期时仍删除会话记录
+        traceback.print_exc()
+    db.delete(session)
+    db.commit()
+    return {"msg": "上传已取消"}
@@ -1,5 +1,9 @@
 from .file import File, FileStatus
 from .folder import Folder
+from .parse_cache import ParseCache
 from .parsed_content import ParsedContent
+from .search_page import SearchPage
 from .settings import Settings
+from .stats import UserDailyStats, UserStats
+from .upload_session import UploadSession
 from .user import User
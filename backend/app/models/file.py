@@ -16,6 +16,8 @@ class File(Base):
     upload_time = Column(DateTime, default=datetime.utcnow, index=True)  # 添加索引用于排序
     minio_path = Column(String(512), nullable=False)
     content_type = Column(String(64), nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)
+    page_count = Column(Integer, nullable=True)  # 解析完成后从 _pages.md 统计的页数
     version = Column(String(32), nullable=True)
     backend = Column(String(64), default=DEFAULT_MINERU_BACKEND)
     error_message = Column(String(1024), nullable=True)
@@ -34,6 +36,8 @@ class File(Base):
     # 复合索引：优化按用户ID和状态的查询
     __table_args__ = (
         Index('idx_user_status', 'user_id', 'status'),
+        # 列表按 upload_time、id 倒序的游标分页
+        Index('idx_files_user_upload', 'user_id', 'upload_time', 'id'),
     )
 
     def to_dict(self):
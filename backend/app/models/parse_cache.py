@@ -0,0 +1,29 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class ParseCache(Base):
+    """源文件 SHA-256 + 解析参数 -> 已解析文件的索引，用于相同上传复用解析结果。"""
+
+    __tablename__ = 'parse_cache'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    content_hash = Column(String(64), nullable=False)
+    settings_key = Column(String(64), nullable=False)
+    file_id = Column(Integer, ForeignKey('files.id', ondelete='CASCADE'), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_parse_cache_key', 'content_hash', 'settings_key', unique=True),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'content_hash': self.content_hash,
+            'settings_key': self.settings_key,
+            'file_id': self.file_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
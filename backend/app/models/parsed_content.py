@@ -1,18 +1,70 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+import hashlib
+import zlib
+
+from sqlalchemy import Column, Integer, LargeBinary, String, Text, ForeignKey
 from app.models.base import Base
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 行内存储方式：inline 为旧版未压缩文本，zstd / zlib 为压缩后的 content_blob，object 指向 MinIO 中的 Markdown
+STORAGE_INLINE = 'inline'
+STORAGE_ZSTD = 'zstd'
+STORAGE_ZLIB = 'zlib'
+STORAGE_OBJECT = 'object'
+COMPRESSED_STORAGES = (STORAGE_ZSTD, STORAGE_ZLIB)
+
+
 class ParsedContent(Base):
+    """解析得到的整篇 Markdown。
+
+    新写入的行不再保存原文，只保存 SHA-256、字节数和压缩后的 content_blob 或 MinIO 对象指针；
+    读取统一走 ParsedContentStore，由它按 storage 解压或下载。
+    """
+
     __tablename__ = 'parsed_contents'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(String(64), nullable=False, index=True)
     file_id = Column(Integer, ForeignKey('files.id'), nullable=False, index=True)
-    content = Column(Text, nullable=False)
+    # 仅 inline 行使用
+    content = Column(Text, nullable=True)
+    storage = Column(String(16), nullable=False, default=STORAGE_INLINE, server_default=STORAGE_INLINE)
+    content_hash = Column(String(64), nullable=True)
+    content_size = Column(Integer, nullable=True)
+    content_blob = Column(LargeBinary, nullable=True)
+    # object 行的 "{bucket}/{path}"
+    object_key = Column(String(512), nullable=True)
 
     def to_dict(self):
         return {
             'id': self.id,
             'user_id': self.user_id,
             'file_id': self.file_id,
-            'content': self.content
-        } 
\ No newline at end of file
+            'storage': self.storage,
+            'content_hash': self.content_hash,
+            'content_size': self.content_size,
+        }
+
+
+def markdown_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def compress_markdown(data: bytes, level: int = 3) -> tuple[str, bytes]:
+    """优先使用 zstd，未安装 zstandard 时退回标准库 zlib；返回 (storage, blob)。"""
+    if zstandard is not None:
+        return STORAGE_ZSTD, zstandard.ZstdCompressor(level=level).compress(data)
+    return STORAGE_ZLIB, zlib.compress(data, min(max(level, 1), 9))
+
+
+def decompress_markdown(storage: str, blob: bytes) -> bytes:
+    if storage == STORAGE_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("读取 zstd 压缩的解析内容需要安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if storage == STORAGE_ZLIB:
+        return zlib.decompress(blob)
+    raise ValueError(f"未知的解析内容存储方式: {storage}")
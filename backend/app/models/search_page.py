@@ -0,0 +1,57 @@
+from sqlalchemy import DDL, Column, ForeignKey, Integer, String, Text, event
+
+from app.models.base import Base
+
+
+class SearchPage(Base):
+    """全文检索的索引单元：解析结果按页切分后的纯文本。
+
+    SQLite 下由 FTS5 外部内容表 search_pages_fts 建立 trigram 索引，Postgres 下对 text 建 tsvector GIN 索引，
+    两者都由触发器或表达式索引自动维护，应用只需增删本表的行。
+    """
+
+    __tablename__ = 'search_pages'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(64), nullable=False, index=True)
+    file_id = Column(Integer, ForeignKey('files.id', ondelete='CASCADE'), nullable=False, index=True)
+    # pages: _pages.md，popo: _popo.md，content: 没有分页产物时的整篇 Markdown
+    source = Column(String(16), nullable=False)
+    page = Column(Integer, nullable=True)
+    text = Column(Text, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'file_id': self.file_id,
+            'source': self.source,
+            'page': self.page,
+        }
+
+
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_pages_fts USING fts5("
+    "text, content='search_pages', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS search_pages_ai AFTER INSERT ON search_pages BEGIN "
+    "INSERT INTO search_pages_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS search_pages_ad AFTER DELETE ON search_pages BEGIN "
+    "INSERT INTO search_pages_fts(search_pages_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS search_pages_au AFTER UPDATE ON search_pages BEGIN "
+    "INSERT INTO search_pages_fts(search_pages_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO search_pages_fts(rowid, text) VALUES (new.id, new.text); END",
+)
+POSTGRES_TSV_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_search_pages_tsv ON search_pages "
+    "USING gin (to_tsvector('simple', text))",
+)
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(SearchPage.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_TSV_DDL:
+    event.listen(SearchPage.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+event.listen(
+    SearchPage.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS search_pages_fts").execute_if(dialect="sqlite"),
+)
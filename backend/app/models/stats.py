@@ -0,0 +1,164 @@
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Column, Date, DateTime, Float, Integer, String, event, insert, inspect, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models.base import Base
+from app.models.enums import FileStatus
+from app.models.file import File
+
+
+class UserStats(Base):
+    """按用户物化的统计计数，随文件上传、解析状态变化和删除在同一事务内增减。
+
+    file_count / total_bytes / parsed_count / failed_count 反映当前文件状态；
+    pages_parsed / parse_seconds 为累计值。批量 SQL 更新不会触发计数，由 reconcile 校正。
+    """
+
+    __tablename__ = 'user_stats'
+
+    user_id = Column(String(64), primary_key=True)
+    file_count = Column(Integer, nullable=False, default=0)
+    total_bytes = Column(BigInteger, nullable=False, default=0)
+    parsed_count = Column(Integer, nullable=False, default=0)
+    failed_count = Column(Integer, nullable=False, default=0)
+    pages_parsed = Column(Integer, nullable=False, default=0)
+    parse_seconds = Column(Float, nullable=False, default=0)
+    reconciled_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class UserDailyStats(Base):
+    """按用户、按天的事件计数：当天上传、解析成功、解析失败的数量和解析页数、耗时。"""
+
+    __tablename__ = 'user_daily_stats'
+
+    user_id = Column(String(64), primary_key=True)
+    day = Column(Date, primary_key=True)
+    uploads = Column(Integer, nullable=False, default=0)
+    upload_bytes = Column(BigInteger, nullable=False, default=0)
+    parsed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    pages_parsed = Column(Integer, nullable=False, default=0)
+    parse_seconds = Column(Float, nullable=False, default=0)
+
+
+def parse_duration_seconds(start_at: datetime | None, finish_at: datetime | None) -> float:
+    """解析耗时（从开始解析到完成），作为 GPU 占用时间的近似值。"""
+    if not start_at or not finish_at:
+        return 0.0
+    try:
+        return max(0.0, (finish_at - start_at).total_seconds())
+    except TypeError:
+        # 带时区和不带时区的时间混用时无法相减
+        return 0.0
+
+
+def _day_of(value: datetime | None) -> date:
+    return value.date() if value else date.today()
+
+
+def increment_counters(connection, table, keys: dict, deltas: dict) -> None:
+    """在当前事务内给计数行加上 deltas，行不存在时插入。"""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        upsert = (sqlite_insert if dialect == "sqlite" else postgresql_insert)(table).values(**keys, **deltas)
+        connection.execute(
+            upsert.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={name: table.c[name] + upsert.excluded[name] for name in deltas},
+            )
+        )
+        return
+    result = connection.execute(
+        update(table)
+        .where(*[table.c[name] == value for name, value in keys.items()])
+        .values({name: table.c[name] + value for name, value in deltas.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**keys, **deltas))
+
+
+def _status_deltas(status, sign: int) -> dict:
+    if status == FileStatus.PARSED:
+        return {"parsed_count": sign}
+    if status == FileStatus.PARSE_FAILED:
+        return {"failed_count": sign}
+    return {}
+
+
+def _completion_deltas(values: dict) -> dict:
+    return {
+        "pages_parsed": values.get("page_count") or 0,
+        "parse_seconds": parse_duration_seconds(values.get("start_at"), values.get("finish_at")),
+    }
+
+
+def _bump_user(connection, user_id: str, deltas: dict) -> None:
+    increment_counters(connection, UserStats.__table__, {"user_id": user_id}, deltas)
+
+
+def _bump_day(connection, user_id: str, day: date, deltas: dict) -> None:
+    increment_counters(connection, UserDailyStats.__table__, {"user_id": user_id, "day": day}, deltas)
+
+
+def _record_completion(connection, user_id: str, status, values: dict) -> None:
+    day = _day_of(values.get("finish_at"))
+    if status == FileStatus.PARSED:
+        completion = _completion_deltas(values)
+        _bump_user(connection, user_id, completion)
+        _bump_day(connection, user_id, day, {"parsed": 1, **completion})
+    elif status == FileStatus.PARSE_FAILED:
+        _bump_day(connection, user_id, day, {"failed": 1})
+
+
+# 读取 status 旧值需要在赋值前加载，否则过期对象上的状态变化没有历史记录
+@event.listens_for(File.status, "set", active_history=True)
+def _load_previous_status(target, value, oldvalue, initiator) -> None:
+    pass
+
+
+@event.listens_for(File, "after_insert")
+def _count_inserted_file(mapper, connection, target) -> None:
+    values = inspect(target).dict
+    user_id = values.get("user_id")
+    if not user_id:
+        return
+    size = values.get("size") or 0
+    status = values.get("status")
+    _bump_user(connection, user_id, {"file_count": 1, "total_bytes": size, **_status_deltas(status, 1)})
+    _bump_day(connection, user_id, _day_of(values.get("upload_time")), {"uploads": 1, "upload_bytes": size})
+    _record_completion(connection, user_id, status, values)
+
+
+@event.listens_for(File, "after_update")
+def _count_status_change(mapper, connection, target) -> None:
+    state = inspect(target)
+    history = state.attrs.status.history
+    if not history.has_changes():
+        return
+    values = state.dict
+    user_id = values.get("user_id")
+    previous = history.deleted[0] if history.deleted else None
+    status = values.get("status")
+    if not user_id or previous == status:
+        return
+    deltas = _status_deltas(previous, -1)
+    for name, value in _status_deltas(status, 1).items():
+        deltas[name] = deltas.get(name, 0) + value
+    _bump_user(connection, user_id, deltas)
+    _record_completion(connection, user_id, status, values)
+
+
+@event.listens_for(File, "after_delete")
+def _count_deleted_file(mapper, connection, target) -> None:
+    values = inspect(target).dict
+    user_id = values.get("user_id")
+    if not user_id:
+        return
+    deltas = {"file_count": -1, "total_bytes": -(values.get("size") or 0)}
+    deltas.update(_status_deltas(values.get("status"), -1))
+    _bump_user(connection, user_id, deltas)
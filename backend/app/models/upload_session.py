@@ -0,0 +1,37 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class UploadSession(Base):
+    """可续传的分片上传会话，对应一个 MinIO multipart upload。"""
+
+    __tablename__ = 'upload_sessions'
+
+    id = Column(String(36), primary_key=True)
+    user_id = Column(String(64), nullable=False, index=True)
+    folder_id = Column(Integer, ForeignKey('folders.id', ondelete='SET NULL'), nullable=True)
+    filename = Column(String(256), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(64), nullable=True)
+    minio_path = Column(String(512), nullable=False)
+    upload_id = Column(String(256), nullable=False)
+    part_size = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def part_count(self) -> int:
+        return max(1, -(-self.size // self.part_size))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'folder_id': self.folder_id,
+            'filename': self.filename,
+            'size': self.size,
+            'content_type': self.content_type,
+            'part_size': self.part_size,
+            'part_count': self.part_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
@@ -1,9 +1,13 @@
 import io
 import mimetypes
+import os
 import posixpath
 import re
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
+from typing import BinaryIO, Callable
 
 
 @dataclass
@@ -14,53 +18,81 @@ class SyncedArtifact:
 
 
 class MineruArtifactSync:
-    def __init__(self, minio, bucket: str, endpoint: str, public_endpoint: str | None = None):
+    def __init__(
+        self,
+        minio,
+        bucket: str,
+        endpoint: str,
+        public_endpoint: str | None = None,
+        upload_workers: int | None = None,
+    ):
         self.minio = minio
         self.bucket = bucket
         self.endpoint = endpoint.rstrip("/")
         self.public_endpoint = (public_endpoint or endpoint).rstrip("/")
+        self.upload_workers = max(1, upload_workers or int(os.getenv("MINERU_ARTIFACT_UPLOAD_WORKERS", "8")))
 
-    def sync_zip(self, zip_bytes: bytes, output_name: str) -> SyncedArtifact:
+    def sync_zip(self, zip_source: bytes | BinaryIO, output_name: str) -> SyncedArtifact:
         self._ensure_bucket()
-        uploaded_paths: list[str] = []
+        uploads: list[Callable[[], list[str]]] = []
         prefix = self._safe_prefix(output_name)
+        if isinstance(zip_source, bytes | bytearray):
+            zip_source = io.BytesIO(zip_source)
 
-        with zipfile.ZipFile(io.BytesIO(zip_bytes)) as archive:
-            names = [name for name in archive.namelist() if not name.endswith("/")]
+        with zipfile.ZipFile(zip_source) as archive:
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            names = [info.filename for info in members]
             markdown_name = self._find_markdown(names, prefix)
             if not markdown_name:
                 raise ValueError("Markdown artifact not found in MinerU result")
 
             markdown = ""
-            for name in names:
+            for info in members:
+                name = info.filename
                 target_path = self._artifact_path(prefix, name)
-                content = archive.read(name)
                 content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
 
                 if name.endswith(".md"):
-                    markdown_content = content.decode("utf-8")
+                    markdown_content = archive.read(name).decode("utf-8")
                     markdown_base_path = posixpath.dirname(target_path)
                     markdown_content = self._rewrite_markdown_urls(markdown_content, markdown_base_path)
                     content = markdown_content.encode("utf-8")
                     if name == markdown_name:
                         markdown = markdown_content
                         export_path = self._export_markdown_path(prefix, name)
-                        uploaded_paths.extend(self._put_object(export_path, content, content_type))
+                        uploads.append(partial(self._put_object, export_path, content, content_type))
                     elif name.endswith("_pages.md"):
                         export_path = self._export_markdown_path(prefix, name)
-                        uploaded_paths.extend(self._put_object(export_path, content, content_type))
+                        uploads.append(partial(self._put_object, export_path, content, content_type))
                     else:
                         export_path = None
 
                     if target_path != export_path:
-                        uploaded_paths.extend(self._put_object(target_path, content, content_type))
+                        uploads.append(partial(self._put_object, target_path, content, content_type))
                     continue
 
-                uploaded_paths.extend(self._put_object(target_path, content, content_type))
+                uploads.append(partial(self._put_member, archive, info, target_path, content_type))
+
+            uploaded_paths = self._run_uploads(uploads)
 
         markdown_path = self._export_markdown_path(prefix, markdown_name)
         return SyncedArtifact(markdown=markdown, markdown_path=markdown_path, uploaded_paths=uploaded_paths)
 
+    def _run_uploads(self, uploads: list[Callable[[], list[str]]]) -> list[str]:
+        """按提交顺序收集上传路径；任一上传失败时取消未开始的上传并抛出异常。"""
+        if self.upload_workers <= 1 or len(uploads) <= 1:
+            return [path for upload in uploads for path in upload()]
+
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.upload_workers, len(uploads)),
+            thread_name_prefix="artifact-upload",
+        )
+        try:
+            futures = [executor.submit(upload) for upload in uploads]
+            return [path for future in futures for path in future.result()]
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def _ensure_bucket(self) -> None:
         if not self.minio.bucket_exists(self.bucket):
             self.minio.make_bucket(self.bucket)
@@ -108,6 +140,20 @@ class MineruArtifactSync:
         )
         return [path]
 
+    def _put_member(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo, path: str, content_type: str) -> list[str]:
+        with archive.open(info) as member:
+            return self._put_stream(path, member, info.file_size, content_type)
+
+    def _put_stream(self, path: str, stream: BinaryIO, length: int, content_type: str) -> list[str]:
+        self.minio.put_object(
+            self.bucket,
+            path,
+            stream,
+            length,
+            content_type=content_type,
+        )
+        return [path]
+
     def _rewrite_markdown_urls(self, markdown: str, markdown_base_path: str) -> str:
         pattern = r"!\[([^\]]*)\]\(([^)]+)\)"
 
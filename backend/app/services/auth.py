@@ -5,10 +5,14 @@ import json
 import os
 import re
 import secrets
+import threading
 import time
-from typing import Any
+from collections import OrderedDict
+from typing import Any, Callable
 
 from fastapi import HTTPException, Response
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.models.user import User
 
@@ -17,6 +21,9 @@ AUTH_COOKIE_NAME = "mineru_session"
 AUTH_COOKIE_MAX_AGE = int(os.getenv("AUTH_COOKIE_MAX_AGE_SECONDS", "604800"))
 AUTH_SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "mineru-web-dev-secret")
 PASSWORD_ITERATIONS = 260000
+# 已验证会话的缓存时长和条目上限，设为 0 关闭缓存
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
 EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
 
@@ -72,17 +79,22 @@ def _b64decode(data: str) -> bytes:
     return base64.urlsafe_b64decode(data + padding)
 
 
-def _sign(payload: str) -> str:
+def _sign(payload: str, key: bytes | None = None) -> str:
     digest = hmac.new(
-        AUTH_SECRET_KEY.encode("utf-8"),
+        key or AUTH_SECRET_KEY.encode("utf-8"),
         payload.encode("ascii"),
         hashlib.sha256,
     ).digest()
     return _b64encode(digest)
 
 
+# 直传凭证使用单独派生的密钥，会话令牌和上传凭证不能互相冒用
+_UPLOAD_TOKEN_KEY = hmac.new(AUTH_SECRET_KEY.encode("utf-8"), b"upload-token", hashlib.sha256).digest()
+
+
 def create_session_token(user: User) -> str:
     payload = {
+        "typ": "session",
         "sub": str(user.id),
         "email": user.email,
         "exp": int(time.time()) + AUTH_COOKIE_MAX_AGE,
@@ -107,11 +119,128 @@ def decode_session_token(token: str) -> dict[str, Any]:
     except (ValueError, json.JSONDecodeError):
         raise HTTPException(status_code=401, detail="登录状态无效")
 
+    # 升级前签发的会话令牌没有 typ
+    if not isinstance(payload, dict) or payload.get("typ", "session") != "session":
+        raise HTTPException(status_code=401, detail="登录状态无效")
     if int(payload.get("exp", 0)) < int(time.time()):
         raise HTTPException(status_code=401, detail="登录已过期，请重新登录")
     return payload
 
 
+def create_upload_token(user_id: str, upload: dict[str, Any], expires_in: int) -> str:
+    """签发直传凭证，/upload/complete 据此确认对象路径属于当前用户。"""
+    payload = {**upload, "typ": "upload", "sub": str(user_id), "exp": int(time.time()) + expires_in}
+    encoded_payload = _b64encode(
+        json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    )
+    return f"{encoded_payload}.{_sign(encoded_payload, _UPLOAD_TOKEN_KEY)}"
+
+
+def decode_upload_token(token: str, user_id: str) -> dict[str, Any]:
+    try:
+        encoded_payload, signature = token.split(".", 1)
+        if not secrets.compare_digest(_sign(encoded_payload, _UPLOAD_TOKEN_KEY), signature):
+            raise ValueError("bad signature")
+        payload = json.loads(_b64decode(encoded_payload).decode("utf-8"))
+    except (ValueError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="上传凭证无效")
+
+    if not isinstance(payload, dict) or payload.get("typ") != "upload" or payload.get("sub") != str(user_id):
+        raise HTTPException(status_code=400, detail="上传凭证无效")
+    if not payload.get("path") or not payload.get("filename") or not isinstance(payload.get("size"), int):
+        raise HTTPException(status_code=400, detail="上传凭证无效")
+    if int(payload.get("exp", 0)) < int(time.time()):
+        raise HTTPException(status_code=400, detail="上传凭证已过期，请重新上传")
+    return payload
+
+
+class SessionCache:
+    """已验证会话令牌的进程内 TTL/LRU 缓存。
+
+    命中时跳过 HMAC 校验和用户查询；条目在 ttl_seconds 或令牌过期时失效，
+    退出登录和用户变更时主动清除。多进程部署时各进程独立缓存，变更最迟在 TTL 后生效。
+    需要完整用户记录的请求（get_current_user）会同时缓存一份脱离会话的 User 快照。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = AUTH_CACHE_TTL_SECONDS,
+        max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any], User | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, token: str) -> dict[str, Any] | None:
+        entry = self._entry(token)
+        return entry[1] if entry else None
+
+    def get_user(self, token: str) -> User | None:
+        """返回缓存的 User 快照，调用方需用 Session.merge(load=False) 挂到自己的会话上。"""
+        entry = self._entry(token)
+        return entry[2] if entry else None
+
+    def _entry(self, token: str) -> tuple[float, dict[str, Any], User | None] | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry
+
+    def put(self, token: str, payload: dict[str, Any], user: User | None = None) -> None:
+        if not self.enabled:
+            return
+        expires_at = min(self.clock() + self.ttl_seconds, float(payload.get("exp", 0)))
+        snapshot = None
+        if user is not None:
+            # 缓存独立的快照，不持有请求会话里的对象
+            snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+            make_transient_to_detached(snapshot)
+        with self._lock:
+            self._entries[token] = (expires_at, payload, snapshot)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_token(self, token: str | None) -> None:
+        if not token:
+            return
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def invalidate_user(self, user_id: Any) -> None:
+        user_id = str(user_id)
+        with self._lock:
+            for token in [token for token, (_, payload, _) in self._entries.items() if payload.get("sub") == user_id]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+session_cache = SessionCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_sessions(mapper, connection, target) -> None:
+    session_cache.invalidate_user(target.id)
+
+
 def set_auth_cookie(response: Response, token: str) -> None:
     response.set_cookie(
         key=AUTH_COOKIE_NAME,
@@ -0,0 +1,136 @@
+import base64
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Session
+
+from app.models.file import File as FileModel
+
+# 文件列表总数的缓存时长，设为 0 时每次请求都执行 COUNT
+FILE_LIST_TOTAL_TTL_SECONDS = float(os.getenv("FILE_LIST_TOTAL_TTL_SECONDS", "30"))
+FILE_LIST_TOTAL_MAX_ENTRIES = 10000
+
+# 列表只加载 to_dict 用到的列，mineru_task_payload 等大字段不读取
+LIST_COLUMNS = (
+    FileModel.id,
+    FileModel.user_id,
+    FileModel.folder_id,
+    FileModel.filename,
+    FileModel.size,
+    FileModel.status,
+    FileModel.upload_time,
+    FileModel.minio_path,
+    FileModel.content_type,
+    FileModel.version,
+    FileModel.backend,
+    FileModel.error_message,
+    FileModel.start_at,
+    FileModel.finish_at,
+    FileModel.parse_stage,
+    FileModel.progress_percent,
+    FileModel.progress_message,
+    FileModel.last_heartbeat_at,
+    FileModel.mineru_task_id,
+    FileModel.mineru_task_status,
+)
+
+# 与 idx_files_user_upload (user_id, upload_time, id) 对应的排序
+LIST_ORDER = (FileModel.upload_time.desc(), FileModel.id.desc())
+
+
+def encode_cursor(file: FileModel) -> str:
+    """把一页最后一条记录的 (upload_time, id) 编码为不透明的游标。"""
+    raw = json.dumps({"t": file.upload_time.isoformat(), "id": file.id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["t"]), int(data["id"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="分页游标无效")
+
+
+def after_cursor(query, cursor: str):
+    """只保留排在游标之后的记录，配合复合索引可直接定位，不需要 OFFSET 扫描前面的行。"""
+    upload_time, file_id = decode_cursor(cursor)
+    return query.filter(
+        or_(
+            FileModel.upload_time < upload_time,
+            and_(FileModel.upload_time == upload_time, FileModel.id < file_id),
+        )
+    )
+
+
+class FileCountCache:
+    """按用户和筛选条件缓存文件列表总数。
+
+    本进程内新增、修改或删除该用户的文件时清除；worker 进程中的状态变化不会通知 API 进程，
+    按状态筛选的总数最多滞后 ttl_seconds。
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = FILE_LIST_TOTAL_TTL_SECONDS,
+        max_entries: int = FILE_LIST_TOTAL_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[tuple, tuple[float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_count(self, key: tuple, count: Callable[[], int]) -> int:
+        if self.ttl_seconds <= 0:
+            return count()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                return entry[1]
+        total = count()
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total
+
+    def invalidate_user(self, user_id: Any) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+file_count_cache = FileCountCache()
+
+
+@event.listens_for(FileModel, "after_insert")
+@event.listens_for(FileModel, "after_update")
+@event.listens_for(FileModel, "after_delete")
+def _invalidate_file_counts(mapper, connection, target) -> None:
+    file_count_cache.invalidate_user(target.user_id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_on_bulk_change(orm_execute_state) -> None:
+    # query(...).update()/delete() 不触发映射事件，且无法得知涉及哪些用户，直接清空缓存
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is FileModel:
+        file_count_cache.clear()
@@ -11,16 +11,26 @@ import gc
 import uuid
 import socket
 from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
 from loguru import logger
 from sqlalchemy.orm import Session
 from app.database import get_db_context
 from app.utils.redis_client import redis_client
 from app.models.file import File as FileModel
 from app.models.enums import FileStatus
-from app.services.parser import ParserService
+from app.services.mineru_api import MineruApiClient
+from app.services.mineru_poller import MineruTaskPoller
+from app.services.parser import ParserService, PendingParse
+from app.services.parse_scheduler import FairShareScheduler, StreamMessage
+from app.services.progress_reporter import ProgressReporter
+from app.services.stream_reclaimer import StaleMessageReclaimer
 
 
 
+# run_worker 启动后设置，worker 内所有 ParserService 共用，合并进度写入
+progress_reporter: ProgressReporter | None = None
+
+
 def clean_memory():
     gc.collect()
 
@@ -37,6 +47,19 @@ def parse_worker_concurrency(raw_value=None) -> int:
         return 1
     return concurrency if concurrency >= 1 else 1
 
+
+def parse_max_pending_tasks(raw_value=None) -> int:
+    value = raw_value if raw_value is not None else os.getenv("WORKER_MAX_PENDING_TASKS", "100")
+    try:
+        max_pending = int(value)
+    except (TypeError, ValueError):
+        return 100
+    return max_pending if max_pending >= 1 else 1
+
+
+def use_shared_poller() -> bool:
+    return os.getenv("MINERU_API_USE_ASYNC_TASKS", "0") == "1"
+
 # 生成唯一的 Consumer Name
 # 优先使用环境变量 WORKER_ID，其次使用主机名，最后使用 UUID
 def get_consumer_name():
@@ -80,11 +103,13 @@ def process_task(task_data: dict, db: Session):
             return
 
         # 创建解析服务实例
-        parser_service = ParserService(db)
+        parser_service = ParserService(db, progress_reporter=progress_reporter)
 
         # 执行文件解析
         logger.info(f"Processing file {file_id} for user {user_id}")
-        result = parser_service.parse_file(file, user_id, parse_method)
+        result = parser_service.parse_file(
+            file, user_id, parse_method, reuse_cache=bool(task_data.get("reuse_cache"))
+        )
         logger.info(f"File {file_id} processed successfully: {result}")
 
     except Exception as e:
@@ -106,44 +131,162 @@ def process_stream_message(stream_id, message: dict) -> None:
         process_task(task_data, db)
 
 
+def submit_stream_message(api_client: MineruApiClient, stream_id, message: dict) -> PendingParse | None:
+    """异步任务模式的第一阶段：读取源文件并提交 MinerU 任务，返回待轮询的任务。"""
+    task_data = decode_task_message(message)
+    logger.info(f"Submitting task: {task_data}")
+    file_id = task_data.get("file_id")
+    user_id = task_data.get("user_id")
+    if not file_id or not user_id:
+        logger.error(f"Invalid task data: {task_data}")
+        return None
+
+    with get_db_context() as db:
+        file = db.query(FileModel).filter(FileModel.id == file_id).first()
+        if not file:
+            logger.error(f"File not found: {file_id}")
+            return None
+        parser_service = ParserService(db, mineru_api_client=api_client, progress_reporter=progress_reporter)
+        return parser_service.submit_parse(
+            file,
+            user_id,
+            task_data.get("parse_method", "auto"),
+            reuse_cache=bool(task_data.get("reuse_cache")),
+        )
+
+
+def record_task_progress(api_client: MineruApiClient, file_id: int, event: dict) -> None:
+    with get_db_context() as db:
+        file = db.query(FileModel).filter(FileModel.id == file_id).first()
+        if file:
+            parser_service = ParserService(db, mineru_api_client=api_client, progress_reporter=progress_reporter)
+            parser_service.record_mineru_task_progress(file, event)
+
+
+def complete_pending_parse(api_client: MineruApiClient, pending: PendingParse, poll_future: Future) -> None:
+    """异步任务模式的第二阶段：轮询结束后下载结果并同步产物。"""
+    poll_error = poll_future.exception()
+    with get_db_context() as db:
+        file = db.query(FileModel).filter(FileModel.id == pending.file_id).first()
+        if not file:
+            logger.error(f"File not found: {pending.file_id}")
+            return
+        parser_service = ParserService(db, mineru_api_client=api_client, progress_reporter=progress_reporter)
+        result = parser_service.complete_parse(file, pending, poll_error=poll_error)
+        logger.info(f"File {pending.file_id} processed successfully: {result}")
+
+
+def _message_ref(value) -> StreamMessage:
+    return value if isinstance(value, StreamMessage) else StreamMessage(PARSER_STREAM, value)
+
+
 def run_worker_loop_once(
     redis,
     executor,
-    in_flight: dict[Future, bytes],
+    in_flight: dict[Future, StreamMessage],
     concurrency: int,
     block_ms: int = 1000,
+    poller: MineruTaskPoller | None = None,
+    waiting: dict[Future, tuple[StreamMessage, PendingParse]] | None = None,
+    max_pending: int = 100,
+    scheduler: FairShareScheduler | None = None,
 ) -> None:
     for future in list(in_flight):
         if not future.done():
             continue
-        stream_id = in_flight.pop(future)
+        ref = _message_ref(in_flight.pop(future))
+        result = None
         try:
-            future.result()
+            result = future.result()
         except Exception as exc:
-            logger.error(f"Error processing message {stream_id}: {exc}")
-        redis.ack_message(PARSER_STREAM, CONSUMER_GROUP, stream_id)
-        logger.info(f"Task {stream_id} processed and acknowledged")
+            logger.error(f"Error processing message {ref.message_id}: {exc}")
+        if poller is not None and isinstance(result, PendingParse):
+            # 提交完成即释放 worker 槽位，轮询交给共享的 asyncio poller
+            poll_future = poller.watch(
+                result.task_id,
+                partial(record_task_progress, poller.api_client, result.file_id),
+            )
+            waiting[poll_future] = (ref, result)
+            logger.info(f"Task {ref.message_id} submitted as MinerU task {result.task_id}")
+            continue
+        redis.ack_message(ref.stream, CONSUMER_GROUP, ref.message_id, ref.user_id)
+        logger.info(f"Task {ref.message_id} processed and acknowledged")
+
+    if poller is not None:
+        for poll_future in list(waiting):
+            if not poll_future.done():
+                continue
+            ref, pending = waiting.pop(poll_future)
+            future = executor.submit(complete_pending_parse, poller.api_client, pending, poll_future)
+            in_flight[future] = ref
 
     free_slots = concurrency - len(in_flight)
+    if poller is not None:
+        free_slots = min(free_slots, max_pending - len(waiting) - len(in_flight))
     if free_slots <= 0:
+        time.sleep(min(block_ms, 100) / 1000)
         return
 
-    messages = redis.read_stream(
-        PARSER_STREAM,
-        CONSUMER_GROUP,
-        CONSUMER_NAME,
-        count=free_slots,
-        block=block_ms,
-    )
+    if scheduler is not None:
+        messages = scheduler.next_messages(redis, free_slots, block_ms=block_ms)
+    else:
+        messages = [
+            (StreamMessage.of(PARSER_STREAM, stream_id, message), message)
+            for stream_id, message in redis.read_stream(
+                PARSER_STREAM,
+                CONSUMER_GROUP,
+                CONSUMER_NAME,
+                count=free_slots,
+                block=block_ms,
+            )
+        ]
     if not messages:
         return
 
     logger.info(
         f"in_flight={len(in_flight)} free_slots={free_slots} received={len(messages)}"
     )
-    for stream_id, message in messages:
-        future = executor.submit(process_stream_message, stream_id, message)
-        in_flight[future] = stream_id
+    for ref, message in messages:
+        schedule_stream_message(executor, in_flight, ref, message, poller)
+
+
+def schedule_stream_message(
+    executor,
+    in_flight: dict[Future, StreamMessage],
+    ref: StreamMessage,
+    message: dict,
+    poller=None,
+) -> None:
+    if poller is None:
+        future = executor.submit(process_stream_message, ref.message_id, message)
+    else:
+        future = executor.submit(submit_stream_message, poller.api_client, ref.message_id, message)
+    in_flight[future] = ref
+
+
+def reclaim_stale_messages(
+    redis,
+    reclaimer: StaleMessageReclaimer,
+    executor,
+    in_flight: dict[Future, StreamMessage],
+    concurrency: int,
+    poller: MineruTaskPoller | None = None,
+    waiting: dict[Future, tuple[StreamMessage, PendingParse]] | None = None,
+    max_pending: int = 100,
+    scheduler: FairShareScheduler | None = None,
+) -> None:
+    """接管其他 worker 失联后遗留的消息，占用本 worker 的空闲槽位处理。"""
+    waiting = waiting or {}
+    owned = [_message_ref(ref) for ref in in_flight.values()]
+    owned += [_message_ref(ref) for ref, _ in waiting.values()]
+    if scheduler is not None:
+        owned += scheduler.buffered_refs()
+    free_slots = concurrency - len(in_flight)
+    if poller is not None:
+        free_slots = min(free_slots, max_pending - len(waiting) - len(in_flight))
+    for ref, message in reclaimer.maybe_reclaim(redis, owned, free_slots):
+        schedule_stream_message(executor, in_flight, ref, message, poller)
+
 
 def run_worker():
     """
@@ -160,12 +303,35 @@ def run_worker():
         logger.error(f"Failed to create consumer group: {e}")
         return
 
+    global progress_reporter
+    progress_reporter = ProgressReporter().start()
+
+    poller = None
+    loop_kwargs = {"scheduler": FairShareScheduler(CONSUMER_NAME)}
+    logger.info(f"Parse lane weights: {loop_kwargs['scheduler'].weights}")
+    if use_shared_poller():
+        poller = MineruTaskPoller(MineruApiClient()).start()
+        loop_kwargs.update(poller=poller, waiting={}, max_pending=parse_max_pending_tasks())
+        logger.info(f"Shared MinerU task poller enabled, WORKER_MAX_PENDING_TASKS={loop_kwargs['max_pending']}")
+
+    reclaimer = StaleMessageReclaimer(CONSUMER_NAME)
     in_flight = {}
     try:
         with ThreadPoolExecutor(max_workers=concurrency) as executor:
             while True:
                 try:
-                    run_worker_loop_once(redis_client, executor, in_flight, concurrency)
+                    reclaim_stale_messages(
+                        redis_client,
+                        reclaimer,
+                        executor,
+                        in_flight,
+                        concurrency,
+                        poller=poller,
+                        waiting=loop_kwargs.get("waiting"),
+                        max_pending=loop_kwargs.get("max_pending", 100),
+                        scheduler=loop_kwargs["scheduler"],
+                    )
+                    run_worker_loop_once(redis_client, executor, in_flight, concurrency, **loop_kwargs)
                 except Exception as e:
                     logger.error(f"Error reading from stream: {e}")
                     time.sleep(1)  # 发生错误时等待1秒再重试
@@ -176,6 +342,9 @@ def run_worker():
     finally:
         # 清理资源
         logger.info("清理资源。。。")
+        if poller is not None:
+            poller.close()
+        progress_reporter.close()
         clean_memory()
 
 if __name__ == "__main__":
@@ -0,0 +1,110 @@
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+_NUMBER_TAIL = frozenset("0123456789+-.eE")
+
+
+class _ChunkReader:
+    """把字节块增量解码成文本缓冲，按需补读，已消费的前缀在补读时丢弃。"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_chars: int = 1) -> bool:
+        """至少再读入 min_chars 个字符或读到结尾，返回是否读到了新内容。"""
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        parts = []
+        received = 0
+        while received < max(1, min_chars) and not self.eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self.eof = True
+                text = self._decoder.decode(b"", final=True)
+            else:
+                text = self._decoder.decode(chunk)
+            parts.append(text)
+            received += len(text)
+        if received:
+            self.buffer += "".join(parts)
+        return received > 0
+
+    def peek(self) -> str:
+        """跳过空白，返回下一个字符，读到结尾时返回空串。"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"JSON 格式错误：位置 {self.pos} 处应为 {char!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """解析当前位置的一个完整 JSON 值。
+
+        值被块边界截断时按剩余长度倍增补读后重新解析，总的重复解析量不超过值本身大小的常数倍。
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill(len(self.buffer) - self.pos)
+                continue
+            if not self.eof and (end == len(self.buffer) or self.buffer[end] in _NUMBER_TAIL):
+                # 数字可能被块边界截断（例如 "1.5e" 后面还有 "3"），补读后重新解析
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """从 JSON 对象的字节流中逐个产出顶层 key 对应数组的元素。
+
+    内存占用取决于单个元素和读块的大小，而不是整个文档；产出该数组后不再读取后续内容。
+    顶层不是对象、没有该键或该键不是数组时不产出任何元素。
+    """
+    reader = _ChunkReader(chunks)
+    if reader.peek() != "{":
+        return
+    reader.pos += 1
+    while reader.peek() == '"':
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            reader.pos += 1
+            yield from _array_items(reader)
+            return
+        reader.value()
+        if reader.peek() != ",":
+            return
+        reader.pos += 1
+
+
+def _array_items(reader: _ChunkReader) -> Iterator[Any]:
+    if reader.peek() == "]":
+        return
+    while True:
+        yield reader.value()
+        char = reader.peek()
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError(f"JSON 格式错误：位置 {reader.pos} 处应为 ',' 或 ']'")
+        reader.pos += 1
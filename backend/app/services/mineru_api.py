@@ -1,10 +1,17 @@
 import os
+import tempfile
 import time
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, BinaryIO, Iterator
 
 import httpx
 
+RESULT_CHUNK_BYTES = 1024 * 1024
+TASK_DONE_STATUSES = {"done", "completed", "success", "finished"}
+TASK_FAILED_STATUSES = {"failed", "error", "cancelled"}
+TASK_ETA_KEYS = ("eta_seconds", "eta", "remaining_seconds", "estimated_remaining_seconds")
+
 
 class MineruApiError(Exception):
     """Base error for MinerU API failures."""
@@ -21,25 +28,119 @@ class MineruApiTimeout(MineruApiError):
 @dataclass
 class MineruParseResult:
     filename: str
-    content: bytes
+    content: bytes | BinaryIO
     content_type: str
 
 
+def task_done_event(task_id: str, status: str, payload: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "task_id": task_id,
+        "status": status,
+        "stage": "downloading_result",
+        "message": "正在下载解析结果",
+        "payload": payload,
+    }
+
+
+def _coerce_float(value: Any) -> float | None:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_task_progress(payload: dict[str, Any]) -> int | None:
+    for key in ("progress", "percent", "percentage"):
+        progress = _coerce_float(payload.get(key))
+        if progress is None:
+            continue
+        if 0 <= progress <= 1:
+            progress *= 100
+        return max(0, min(100, int(progress)))
+    return None
+
+
+class PollSchedule:
+    """单个 MinerU 任务的轮询间隔。
+
+    状态和进度没有变化时按 backoff 指数退避到 maximum；上游返回 ETA 时以 ETA 为准，
+    只返回进度时按已用时间和进度估算剩余时间。
+    """
+
+    def __init__(self, initial: float, maximum: float, backoff: float = 1.5, clock=time.monotonic):
+        self.initial = max(0.0, initial)
+        self.maximum = max(self.initial, maximum)
+        self.backoff = max(1.0, backoff)
+        self.clock = clock
+        self.started_at = clock()
+        self.delay = self.initial
+        self._last_snapshot = None
+
+    def next_delay(self, payload: dict[str, Any]) -> float:
+        snapshot = (str(payload.get("status", "")).lower(), extract_task_progress(payload))
+        if snapshot == self._last_snapshot:
+            self.delay = min(self.maximum, self.delay * self.backoff)
+        self._last_snapshot = snapshot
+
+        eta = self._estimate_remaining(payload, snapshot[1])
+        if eta is not None:
+            return min(self.maximum, max(self.initial, eta))
+        return self.delay
+
+    def _estimate_remaining(self, payload: dict[str, Any], progress: int | None) -> float | None:
+        for key in TASK_ETA_KEYS:
+            eta = _coerce_float(payload.get(key))
+            if eta is not None and eta >= 0:
+                return eta
+        if progress is not None and 0 < progress < 100:
+            elapsed = self.clock() - self.started_at
+            return elapsed * (100 - progress) / progress
+        return None
+
+
+@contextmanager
+def mineru_http_errors() -> Iterator[None]:
+    """把 httpx 异常转换为 MineruApiError 体系，同步和异步调用共用。"""
+    try:
+        yield
+    except httpx.TimeoutException as exc:
+        raise MineruApiTimeout(f"MinerU API request timed out: {exc}") from exc
+    except httpx.ConnectError as exc:
+        raise MineruApiUnavailable(f"MinerU API unavailable: {exc}") from exc
+    except httpx.HTTPStatusError as exc:
+        raise MineruApiError(MineruApiClient._status_error_message(exc.response)) from exc
+
+
 class MineruApiClient:
     def __init__(
         self,
         base_url: str | None = None,
         timeout_seconds: float | None = None,
         poll_interval_seconds: float | None = None,
+        poll_max_interval_seconds: float | None = None,
+        poll_backoff: float | None = None,
+        batch_status_path: str | None = None,
         task_timeout_seconds: float | None = None,
         use_async_tasks: bool | None = None,
         server_url: str | None = None,
         hybrid_effort: str | None = None,
+        spool_results: bool | None = None,
+        result_spool_max_bytes: int | None = None,
         http_client: httpx.Client | None = None,
     ):
         self.base_url = (base_url or os.getenv("MINERU_API_URL", "http://mineru-router:8002")).rstrip("/")
         self.timeout_seconds = timeout_seconds or float(os.getenv("MINERU_API_TIMEOUT_SECONDS", "300"))
         self.poll_interval_seconds = poll_interval_seconds or float(os.getenv("MINERU_API_POLL_INTERVAL_SECONDS", "2"))
+        self.poll_max_interval_seconds = poll_max_interval_seconds or float(
+            os.getenv("MINERU_API_POLL_MAX_INTERVAL_SECONDS", "30")
+        )
+        self.poll_backoff = poll_backoff or float(os.getenv("MINERU_API_POLL_BACKOFF", "1.5"))
+        # mineru-router 支持批量查询时配置，例如 /tasks/status；为空时逐个 GET /tasks/{id}
+        self.batch_status_path = batch_status_path if batch_status_path is not None else os.getenv(
+            "MINERU_API_BATCH_STATUS_PATH", ""
+        )
         self.task_timeout_seconds = task_timeout_seconds or float(os.getenv("MINERU_API_TASK_TIMEOUT_SECONDS", "1800"))
         self.use_async_tasks = (
             use_async_tasks
@@ -48,6 +149,14 @@ class MineruApiClient:
         )
         self.server_url = server_url or os.getenv("SERVER_URL") or os.getenv("MINERU_API_SERVER_URL")
         self.hybrid_effort = hybrid_effort or os.getenv("MINERU_API_HYBRID_EFFORT", "high")
+        self.spool_results = (
+            spool_results
+            if spool_results is not None
+            else os.getenv("MINERU_API_SPOOL_RESULTS", "0") == "1"
+        )
+        self.result_spool_max_bytes = result_spool_max_bytes or int(
+            os.getenv("MINERU_API_RESULT_SPOOL_MAX_BYTES", str(32 * 1024 * 1024))
+        )
         self.http_client = http_client or httpx.Client(timeout=self.timeout_seconds)
 
     def health(self) -> dict[str, Any]:
@@ -64,7 +173,7 @@ class MineruApiClient:
     def parse_file(
         self,
         filename: str,
-        file_bytes: bytes,
+        file_bytes: bytes | BinaryIO,
         backend: str,
         parse_method: str,
         lang: str,
@@ -96,7 +205,7 @@ class MineruApiClient:
     def _parse_file_sync(
         self,
         filename: str,
-        file_bytes: bytes,
+        file_bytes: bytes | BinaryIO,
         backend: str,
         parse_method: str,
         lang: str,
@@ -105,17 +214,12 @@ class MineruApiClient:
     ) -> MineruParseResult:
         data = self._form_data(backend, parse_method, lang, formula_enable, table_enable)
         files = {"files": (filename, file_bytes, "application/octet-stream")}
-        response = self._request("post", "/file_parse", data=data, files=files)
-        return MineruParseResult(
-            filename=filename,
-            content=response.content,
-            content_type=response.headers.get("content-type", ""),
-        )
+        return self._fetch_result(filename, "post", "/file_parse", data=data, files=files)
 
     def _parse_file_async(
         self,
         filename: str,
-        file_bytes: bytes,
+        file_bytes: bytes | BinaryIO,
         backend: str,
         parse_method: str,
         lang: str,
@@ -123,44 +227,78 @@ class MineruApiClient:
         table_enable: bool,
         progress_callback=None,
     ) -> MineruParseResult:
-        data = self._form_data(backend, parse_method, lang, formula_enable, table_enable)
-        files = {"files": (filename, file_bytes, "application/octet-stream")}
-        submit = self._request("post", "/tasks", data=data, files=files).json()
-        task_id = submit.get("task_id") or submit.get("id")
-        if not task_id:
-            raise MineruApiError(f"MinerU API task response missing task id: {submit}")
+        task_id, submit = self.submit_task(
+            filename,
+            file_bytes,
+            backend,
+            parse_method,
+            lang,
+            formula_enable,
+            table_enable,
+        )
         if progress_callback:
             progress_callback({"task_id": task_id, "status": "submitted", "payload": submit})
 
+        schedule = self.poll_schedule()
         deadline = time.time() + self.task_timeout_seconds
         while time.time() < deadline:
             status_payload = self._request("get", f"/tasks/{task_id}").json()
             status = str(status_payload.get("status", "")).lower()
-            if status in {"done", "completed", "success", "finished"}:
+            if status in TASK_DONE_STATUSES:
                 if progress_callback:
-                    progress_callback(
-                        {
-                            "task_id": task_id,
-                            "status": status,
-                            "stage": "downloading_result",
-                            "message": "正在下载解析结果",
-                            "payload": status_payload,
-                        }
-                    )
-                result = self._request("get", f"/tasks/{task_id}/result")
-                return MineruParseResult(
-                    filename=filename,
-                    content=result.content,
-                    content_type=result.headers.get("content-type", ""),
-                )
+                    progress_callback(task_done_event(task_id, status, status_payload))
+                return self.fetch_task_result(task_id, filename)
             if progress_callback:
                 progress_callback({"task_id": task_id, "status": status, "payload": status_payload})
-            if status in {"failed", "error", "cancelled"}:
+            if status in TASK_FAILED_STATUSES:
                 raise MineruApiError(f"MinerU API task {task_id} failed: {status_payload}")
-            time.sleep(self.poll_interval_seconds)
+            time.sleep(schedule.next_delay(status_payload))
 
         raise MineruApiTimeout(f"MinerU API task {task_id} exceeded {self.task_timeout_seconds} seconds")
 
+    def poll_schedule(self) -> PollSchedule:
+        return PollSchedule(self.poll_interval_seconds, self.poll_max_interval_seconds, self.poll_backoff)
+
+    @staticmethod
+    def parse_batch_statuses(payload: Any) -> dict[str, dict[str, Any]]:
+        """解析批量状态响应，兼容 {"tasks": [...]}、任务列表和 {task_id: payload} 三种形式。"""
+        if isinstance(payload, dict) and isinstance(payload.get("tasks"), list | dict):
+            payload = payload["tasks"]
+        statuses: dict[str, dict[str, Any]] = {}
+        if isinstance(payload, list):
+            for item in payload:
+                if not isinstance(item, dict):
+                    continue
+                task_id = item.get("task_id") or item.get("id")
+                if task_id:
+                    statuses[str(task_id)] = item
+        elif isinstance(payload, dict):
+            for task_id, item in payload.items():
+                if isinstance(item, dict):
+                    statuses[str(task_id)] = item
+        return statuses
+
+    def submit_task(
+        self,
+        filename: str,
+        file_bytes: bytes | BinaryIO,
+        backend: str,
+        parse_method: str,
+        lang: str,
+        formula_enable: bool,
+        table_enable: bool,
+    ) -> tuple[str, dict[str, Any]]:
+        data = self._form_data(backend, parse_method, lang, formula_enable, table_enable)
+        files = {"files": (filename, file_bytes, "application/octet-stream")}
+        submit = self._request("post", "/tasks", data=data, files=files).json()
+        task_id = submit.get("task_id") or submit.get("id")
+        if not task_id:
+            raise MineruApiError(f"MinerU API task response missing task id: {submit}")
+        return str(task_id), submit
+
+    def fetch_task_result(self, task_id: str, filename: str) -> MineruParseResult:
+        return self._fetch_result(filename, "get", f"/tasks/{task_id}/result")
+
     def _form_data(
         self,
         backend: str,
@@ -187,17 +325,40 @@ class MineruApiClient:
             data["server_url"] = self.server_url
         return data
 
+    def _fetch_result(self, filename: str, method: str, path: str, **kwargs: Any) -> MineruParseResult:
+        if self.spool_results:
+            content, content_type = self._download(method, path, **kwargs)
+            return MineruParseResult(filename=filename, content=content, content_type=content_type)
+        response = self._request(method, path, **kwargs)
+        return MineruParseResult(
+            filename=filename,
+            content=response.content,
+            content_type=response.headers.get("content-type", ""),
+        )
+
     def _request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
-        try:
+        with mineru_http_errors():
             response = self.http_client.request(method, f"{self.base_url}{path}", **kwargs)
             response.raise_for_status()
             return response
-        except httpx.TimeoutException as exc:
-            raise MineruApiTimeout(f"MinerU API request timed out: {exc}") from exc
-        except httpx.ConnectError as exc:
-            raise MineruApiUnavailable(f"MinerU API unavailable: {exc}") from exc
-        except httpx.HTTPStatusError as exc:
-            raise MineruApiError(self._status_error_message(exc.response)) from exc
+
+    def _download(self, method: str, path: str, **kwargs: Any) -> tuple[BinaryIO, str]:
+        """把响应体分块写入有内存上限的 SpooledTemporaryFile，超过上限自动落盘。"""
+        spool = tempfile.SpooledTemporaryFile(max_size=self.result_spool_max_bytes)
+        try:
+            with mineru_http_errors():
+                with self.http_client.stream(method, f"{self.base_url}{path}", **kwargs) as response:
+                    if response.is_error:
+                        response.read()
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes(RESULT_CHUNK_BYTES):
+                        spool.write(chunk)
+                    content_type = response.headers.get("content-type", "")
+        except BaseException:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool, content_type
 
     @staticmethod
     def _status_error_message(response: httpx.Response) -> str:
@@ -0,0 +1,194 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+import httpx
+from loguru import logger
+
+from app.services.mineru_api import (
+    TASK_DONE_STATUSES,
+    TASK_FAILED_STATUSES,
+    MineruApiClient,
+    MineruApiError,
+    MineruApiTimeout,
+    mineru_http_errors,
+    task_done_event,
+)
+
+ProgressCallback = Callable[[dict[str, Any]], None]
+
+
+class MineruTaskPoller:
+    """在后台线程的 asyncio 事件循环里，用一个共享 AsyncClient 轮询所有已提交的 MinerU 任务。
+
+    worker 线程提交任务后调用 watch() 拿到 Future 即可释放槽位；进度回调在单独的线程中按顺序执行，
+    避免数据库写入阻塞事件循环。配置了 batch_status_path 时，同一时间窗口内到期的状态查询合并成一次请求。
+    """
+
+    def __init__(
+        self,
+        api_client: MineruApiClient,
+        max_concurrent_requests: int | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        batch_window_seconds: float | None = None,
+    ):
+        self.api_client = api_client
+        self.max_concurrent_requests = max(
+            1,
+            max_concurrent_requests or int(os.getenv("MINERU_API_POLL_CONCURRENCY", "32")),
+        )
+        self._http_client = http_client
+        self.batch_window_seconds = (
+            batch_window_seconds
+            if batch_window_seconds is not None
+            else float(os.getenv("MINERU_API_BATCH_WINDOW_SECONDS", "0.05"))
+        )
+        self._batch_enabled = bool(api_client.batch_status_path)
+        self._batch_waiters: dict[str, list[asyncio.Future]] = {}
+        self._batch_flush: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._lock = threading.Lock()
+        self._callback_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mineru-poll-callback")
+
+    def start(self) -> "MineruTaskPoller":
+        with self._lock:
+            if self._thread is not None:
+                return self
+            ready = threading.Event()
+
+            def run() -> None:
+                self._loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(self._loop)
+                self._semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+                if self._http_client is None:
+                    self._http_client = httpx.AsyncClient(timeout=self.api_client.timeout_seconds)
+                ready.set()
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="mineru-task-poller", daemon=True)
+            self._thread.start()
+            ready.wait()
+            return self
+
+    def watch(self, task_id: str, progress_callback: ProgressCallback | None = None) -> Future:
+        """开始轮询 task_id，返回在任务完成时以最终状态 payload 结束的 Future。"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._poll(task_id, progress_callback), self._loop)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._loop is None or self._thread is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._http_client.aclose(), self._loop).result(timeout=10)
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=10)
+                self._callback_executor.shutdown(wait=True)
+                self._loop = None
+                self._thread = None
+
+    async def _poll(self, task_id: str, progress_callback: ProgressCallback | None) -> dict[str, Any]:
+        schedule = self.api_client.poll_schedule()
+        deadline = time.monotonic() + self.api_client.task_timeout_seconds
+        while time.monotonic() < deadline:
+            status_payload = await self._get_status(task_id)
+            status = str(status_payload.get("status", "")).lower()
+            if status in TASK_DONE_STATUSES:
+                await self._notify(progress_callback, task_done_event(task_id, status, status_payload))
+                return status_payload
+            await self._notify(progress_callback, {"task_id": task_id, "status": status, "payload": status_payload})
+            if status in TASK_FAILED_STATUSES:
+                raise MineruApiError(f"MinerU API task {task_id} failed: {status_payload}")
+            delay = schedule.next_delay(status_payload)
+            await asyncio.sleep(max(0.0, min(delay, deadline - time.monotonic())))
+
+        raise MineruApiTimeout(f"MinerU API task {task_id} exceeded {self.api_client.task_timeout_seconds} seconds")
+
+    async def _get_status(self, task_id: str) -> dict[str, Any]:
+        if self._batch_enabled:
+            waiter = self._loop.create_future()
+            self._batch_waiters.setdefault(task_id, []).append(waiter)
+            if self._batch_flush is None:
+                self._batch_flush = self._loop.call_later(
+                    self.batch_window_seconds,
+                    lambda: self._loop.create_task(self._flush_batch()),
+                )
+            return await waiter
+        return await self._get_single_status(task_id)
+
+    async def _get_single_status(self, task_id: str) -> dict[str, Any]:
+        async with self._semaphore:
+            with mineru_http_errors():
+                response = await self._http_client.get(f"{self.api_client.base_url}/tasks/{task_id}")
+                response.raise_for_status()
+        return response.json()
+
+    async def _flush_batch(self) -> None:
+        self._batch_flush = None
+        waiters, self._batch_waiters = self._batch_waiters, {}
+        if not waiters:
+            return
+        try:
+            statuses = await self._get_batch_statuses(list(waiters))
+        except Exception as exc:
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            return
+
+        for task_id, futures in waiters.items():
+            payload = statuses.get(task_id)
+            if payload is None:
+                # 批量响应里缺失的任务逐个补查
+                self._loop.create_task(self._resolve_single(task_id, futures))
+                continue
+            for future in futures:
+                if not future.done():
+                    future.set_result(payload)
+
+    async def _get_batch_statuses(self, task_ids: list[str]) -> dict[str, dict[str, Any]]:
+        if not self._batch_enabled:
+            return {}
+        async with self._semaphore:
+            with mineru_http_errors():
+                response = await self._http_client.post(
+                    f"{self.api_client.base_url}{self.api_client.batch_status_path}",
+                    json={"task_ids": task_ids},
+                )
+        if response.status_code in {404, 405}:
+            logger.warning(
+                f"MinerU batch status endpoint {self.api_client.batch_status_path} is not supported, "
+                "falling back to per-task polling"
+            )
+            self._batch_enabled = False
+            return {}
+        with mineru_http_errors():
+            response.raise_for_status()
+        return self.api_client.parse_batch_statuses(response.json())
+
+    async def _resolve_single(self, task_id: str, futures: list[asyncio.Future]) -> None:
+        try:
+            payload = await self._get_single_status(task_id)
+        except Exception as exc:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future in futures:
+            if not future.done():
+                future.set_result(payload)
+
+    async def _notify(self, progress_callback: ProgressCallback | None, event: dict[str, Any]) -> None:
+        if not progress_callback:
+            return
+        try:
+            await asyncio.wrap_future(self._callback_executor.submit(progress_callback, event))
+        except Exception as exc:
+            logger.warning(f"MinerU task progress callback failed: {exc}")
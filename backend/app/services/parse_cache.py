@@ -0,0 +1,145 @@
+import hashlib
+import io
+import json
+import os
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from app.models.enums import FileStatus
+from app.models.file import File as FileModel
+from app.models.parse_cache import ParseCache
+from app.utils.minio_client import minio_client
+
+try:
+    from minio.commonconfig import CopySource
+    from minio.error import S3Error
+except ImportError:
+    CopySource = None
+    S3Error = None
+
+_MINIO_MISSING_ERROR_CODES = {"NoSuchKey", "NoSuchObject", "NoSuchBucket", "NotFound"}
+# 需要改写内部 URL 的顶层产物；{stem}/ 前缀下的目录产物整体复制
+_TOP_LEVEL_ARTIFACT_SUFFIXES = (
+    ".md",
+    "_pages.md",
+    "_popo.md",
+    "_popo.json",
+    "_popo_status.json",
+)
+
+
+def parse_cache_enabled(value: str | None = None) -> bool:
+    if value is None:
+        value = os.getenv("PARSE_CACHE_ENABLED", "1")
+    return str(value).strip().lower() in {"1", "true", "yes", "on"}
+
+
+def parse_settings_key(
+    backend: str,
+    parse_method: str,
+    lang: str,
+    formula_enable: bool,
+    table_enable: bool,
+    effort: str,
+) -> str:
+    payload = json.dumps(
+        {
+            "backend": backend,
+            "parse_method": parse_method,
+            "lang": lang,
+            "formula_enable": bool(formula_enable),
+            "table_enable": bool(table_enable),
+            "effort": effort,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _is_missing_minio_error(exc: Exception) -> bool:
+    if isinstance(exc, FileNotFoundError):
+        return True
+    if S3Error and isinstance(exc, S3Error):
+        return exc.code in _MINIO_MISSING_ERROR_CODES
+    return False
+
+
+class ParseCacheService:
+    def __init__(self, db: Session, minio: Any | None = None):
+        self.db = db
+        self.minio = minio or minio_client
+
+    def lookup(self, content_hash: str, settings_key: str) -> FileModel | None:
+        entry = self.db.query(ParseCache).filter(
+            ParseCache.content_hash == content_hash,
+            ParseCache.settings_key == settings_key,
+        ).first()
+        if not entry:
+            return None
+        return self.db.query(FileModel).filter(
+            FileModel.id == entry.file_id,
+            FileModel.status == FileStatus.PARSED,
+        ).first()
+
+    def record(self, file: FileModel, settings_key: str) -> None:
+        entry = self.db.query(ParseCache).filter(
+            ParseCache.content_hash == file.content_hash,
+            ParseCache.settings_key == settings_key,
+        ).first()
+        if entry:
+            entry.file_id = file.id
+        else:
+            self.db.add(ParseCache(content_hash=file.content_hash, settings_key=settings_key, file_id=file.id))
+        self.db.commit()
+
+    def invalidate(self, file_id: int) -> None:
+        """删除指向该文件产物的缓存条目；调用方负责提交事务。"""
+        self.db.query(ParseCache).filter(ParseCache.file_id == file_id).delete(synchronize_session=False)
+
+    @staticmethod
+    def rewrite_artifact_urls(text: str, bucket: str, source_stem: str, target_stem: str) -> str:
+        return text.replace(f"/{bucket}/{source_stem}/", f"/{bucket}/{target_stem}/")
+
+    def clone_artifacts(self, bucket: str, source_stem: str, target_stem: str) -> list[str]:
+        cloned: list[str] = []
+        for suffix in _TOP_LEVEL_ARTIFACT_SUFFIXES:
+            source_path = f"{source_stem}{suffix}"
+            target_path = f"{target_stem}{suffix}"
+            try:
+                self._copy_rewritten(bucket, source_path, target_path, source_stem, target_stem)
+            except Exception as exc:
+                if _is_missing_minio_error(exc):
+                    continue
+                raise
+            cloned.append(target_path)
+
+        prefix = f"{source_stem}/"
+        for obj in self.minio.list_objects(bucket, prefix=prefix, recursive=True):
+            # MinerU 产物文件名本身也带 stem，例如 {stem}/auto/{stem}_middle.json
+            relative_path = obj.object_name[len(prefix):].replace(source_stem, target_stem)
+            target_path = f"{target_stem}/{relative_path}"
+            if obj.object_name.endswith(".md"):
+                self._copy_rewritten(bucket, obj.object_name, target_path, source_stem, target_stem)
+            else:
+                self.minio.copy_object(bucket, target_path, CopySource(bucket, obj.object_name))
+            cloned.append(target_path)
+        return cloned
+
+    def _copy_rewritten(self, bucket: str, source_path: str, target_path: str, source_stem: str, target_stem: str) -> None:
+        response = self.minio.get_object(bucket, source_path)
+        try:
+            content = response.read()
+            content_type = getattr(response, "headers", {}).get("Content-Type") or "application/octet-stream"
+        finally:
+            close = getattr(response, "close", None)
+            if close:
+                close()
+            release_conn = getattr(response, "release_conn", None)
+            if release_conn:
+                release_conn()
+
+        text = self.rewrite_artifact_urls(content.decode("utf-8"), bucket, source_stem, target_stem)
+        data = text.encode("utf-8")
+        self.minio.put_object(bucket, target_path, io.BytesIO(data), len(data), content_type=content_type)
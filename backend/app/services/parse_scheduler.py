@@ -0,0 +1,182 @@
+import json
+import os
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from app.services.parser import (
+    CONSUMER_GROUP,
+    PARSE_LANE_BULK,
+    PARSE_LANE_INTERACTIVE,
+    PARSE_LANE_REPARSE,
+    PARSE_LANE_STREAMS,
+)
+
+DEFAULT_LANE_WEIGHTS = {PARSE_LANE_INTERACTIVE: 6, PARSE_LANE_REPARSE: 3, PARSE_LANE_BULK: 1}
+
+
+@dataclass(frozen=True)
+class StreamMessage:
+    """worker 持有的一条 Stream 消息，ACK 和接管都需要知道它来自哪条 Stream。
+
+    user_id 用于 ACK 时释放该用户的 Stream 名额，不参与比较。
+    """
+
+    stream: str
+    message_id: bytes
+    user_id: str | None = field(default=None, compare=False)
+
+    @classmethod
+    def of(cls, stream: str, message_id: bytes, message: dict) -> "StreamMessage":
+        user_id = decode_task(message).get("user_id")
+        return cls(stream, message_id, None if user_id is None else str(user_id))
+
+
+@dataclass
+class _QueuedTask:
+    ref: StreamMessage
+    message: dict
+    cost: int
+
+
+def decode_task(message: dict) -> dict:
+    try:
+        return json.loads(message[b"data"].decode("utf-8"))
+    except (KeyError, ValueError, AttributeError):
+        return {}
+
+
+def parse_lane_weights(raw_value: str | None = None) -> dict[str, int]:
+    """解析 WORKER_LANE_WEIGHTS，例如 interactive=6,reparse=3,bulk=1，未配置或无效的队列使用默认权重。"""
+    weights = dict(DEFAULT_LANE_WEIGHTS)
+    raw_value = raw_value if raw_value is not None else os.getenv("WORKER_LANE_WEIGHTS", "")
+    for item in raw_value.split(","):
+        lane, _, weight = item.partition("=")
+        lane = lane.strip()
+        if lane not in weights:
+            continue
+        try:
+            weights[lane] = max(1, int(weight))
+        except ValueError:
+            continue
+    return weights
+
+
+class FairShareScheduler:
+    """worker 端的解析任务调度。
+
+    每条队列（Stream）预读的消息不超过 prefetch 和本 worker 的空闲槽位数，按平滑加权轮询在队列之间选择，
+    预读缓冲内按用户做 deficit round-robin：轮到用户时累加 quantum，够支付任务 cost 时才派发。
+    预读但未派发的消息已进入本 worker 的 PEL，不会被其他副本接管，所以预读量按空闲槽位限制，
+    积压留在 Stream 里由空闲的副本读取。用户之间的公平主要由入队时的名额保证（RedisClient.admit_tasks）：
+    每个用户在一条 Stream 里最多有 PARSE_USER_LANE_LIMIT 条任务，大批量上传的积压留在该用户的等待列表中。
+    """
+
+    def __init__(
+        self,
+        consumer: str,
+        weights: dict[str, int] | None = None,
+        prefetch: int | None = None,
+        quantum: int = 1,
+    ):
+        self.consumer = consumer
+        self.weights = weights or parse_lane_weights()
+        self.prefetch = max(1, prefetch or int(os.getenv("WORKER_LANE_PREFETCH", "2")))
+        self.quantum = max(1, quantum)
+        self._lane_by_stream = {stream: lane for lane, stream in PARSE_LANE_STREAMS.items()}
+        self._users: dict[str, OrderedDict[str, deque[_QueuedTask]]] = {
+            lane: OrderedDict() for lane in PARSE_LANE_STREAMS
+        }
+        self._deficits: dict[str, dict[str, int]] = {lane: {} for lane in PARSE_LANE_STREAMS}
+        self._current_weights = {lane: 0 for lane in PARSE_LANE_STREAMS}
+        self._turns: dict[str, str | None] = {}
+
+    def buffered_count(self, lane: str | None = None) -> int:
+        lanes = [lane] if lane else list(self._users)
+        return sum(len(queue) for name in lanes for queue in self._users[name].values())
+
+    def buffered_refs(self) -> list[StreamMessage]:
+        return [task.ref for users in self._users.values() for queue in users.values() for task in queue]
+
+    def next_messages(self, redis, limit: int, block_ms: int = 1000) -> list[tuple[StreamMessage, dict]]:
+        """补充预读缓冲并按调度策略取出最多 limit 条消息。缓冲为空时阻塞等待新消息。"""
+        if limit <= 0:
+            return []
+        self._refill(redis, min(self.prefetch, limit), block_ms if self.buffered_count() == 0 else None)
+        picked = []
+        while len(picked) < limit:
+            lane = self._pick_lane()
+            if lane is None:
+                break
+            task = self._pick_task(lane)
+            picked.append((task.ref, task.message))
+        return picked
+
+    def add(self, stream: str, message_id: bytes, message: dict) -> None:
+        lane = self._lane_by_stream.get(stream, PARSE_LANE_INTERACTIVE)
+        task_data = decode_task(message)
+        user_id = str(task_data.get("user_id", ""))
+        try:
+            cost = max(1, int(task_data.get("cost", 1)))
+        except (TypeError, ValueError):
+            cost = 1
+        users = self._users[lane]
+        users.setdefault(user_id, deque()).append(
+            _QueuedTask(StreamMessage.of(stream, message_id, message), message, cost)
+        )
+
+    def _refill(self, redis, capacity: int, block_ms: int | None) -> None:
+        # 每条队列按各自缺口单独读取，已有缓冲的队列不会超过 capacity
+        wanted = {
+            PARSE_LANE_STREAMS[lane]: capacity - self.buffered_count(lane)
+            for lane in PARSE_LANE_STREAMS
+            if self.buffered_count(lane) < capacity
+        }
+        received = 0
+        for stream, count in wanted.items():
+            for stream_name, message_id, message in redis.read_streams(
+                [stream], CONSUMER_GROUP, self.consumer, count=count, block=None
+            ):
+                self.add(stream_name, message_id, message)
+                received += 1
+        if received or not wanted or block_ms is None:
+            return
+        # 缓冲为空且各队列都没有新消息时阻塞等待，每条队列至多读一条，不会超过 capacity
+        for stream, message_id, message in redis.read_streams(
+            list(wanted), CONSUMER_GROUP, self.consumer, count=1, block=block_ms
+        ):
+            self.add(stream, message_id, message)
+
+    def _pick_lane(self) -> str | None:
+        # 平滑加权轮询：每次给有任务的队列加上权重，选当前值最大的并减去总权重
+        candidates = [lane for lane, users in self._users.items() if users]
+        if not candidates:
+            return None
+        total = 0
+        for lane in candidates:
+            weight = self.weights.get(lane, 1)
+            self._current_weights[lane] += weight
+            total += weight
+        lane = max(candidates, key=lambda name: self._current_weights[name])
+        self._current_weights[lane] -= total
+        return lane
+
+    def _pick_task(self, lane: str) -> _QueuedTask:
+        users = self._users[lane]
+        deficits = self._deficits[lane]
+        while True:
+            user_id, queue = next(iter(users.items()))
+            if self._turns.get(lane) != user_id:
+                # 轮到该用户时补充一次额度
+                deficits[user_id] = deficits.get(user_id, 0) + self.quantum
+                self._turns[lane] = user_id
+            task = queue[0]
+            if deficits[user_id] >= task.cost:
+                queue.popleft()
+                deficits[user_id] -= task.cost
+                if not queue:
+                    del users[user_id]
+                    deficits.pop(user_id, None)
+                    self._turns[lane] = None
+                return task
+            users.move_to_end(user_id)
+            self._turns[lane] = None
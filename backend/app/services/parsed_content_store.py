@@ -0,0 +1,113 @@
+import os
+from typing import Any
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from app.models.parsed_content import (
+    COMPRESSED_STORAGES,
+    STORAGE_INLINE,
+    STORAGE_OBJECT,
+    ParsedContent,
+    compress_markdown,
+    decompress_markdown,
+    markdown_digest,
+)
+from app.utils.minio_client import minio_client
+
+# compressed：库里保存压缩后的 Markdown；object：只保存指向 MinIO {stem}.md 的指针；inline：旧版未压缩文本
+PARSED_CONTENT_STORAGE_MODES = {"compressed", "object", "inline"}
+ZSTD_LEVEL = int(os.getenv("PARSED_CONTENT_ZSTD_LEVEL", "3"))
+
+
+def parsed_content_storage(value: str | None = None) -> str:
+    if value is None:
+        value = os.getenv("PARSED_CONTENT_STORAGE", "compressed")
+    value = str(value).strip().lower()
+    return value if value in PARSED_CONTENT_STORAGE_MODES else "compressed"
+
+
+def split_object_key(object_key: str) -> tuple[str, str]:
+    bucket, _, path = object_key.partition("/")
+    return bucket, path
+
+
+class ParsedContentStore:
+    """按 PARSED_CONTENT_STORAGE 写入 ParsedContent，并透明地读出原始 Markdown。"""
+
+    def __init__(self, db: Session, minio: Any | None = None):
+        self.db = db
+        self.minio = minio or minio_client
+
+    def build(
+        self,
+        user_id: str,
+        file_id: int,
+        markdown: str,
+        bucket: str | None = None,
+        object_path: str | None = None,
+    ) -> ParsedContent:
+        """构造待写入的行，调用方负责 add 和提交事务。
+
+        object 模式需要传入 Markdown 在 MinIO 中的位置，对象不存在时退回压缩存储。
+        """
+        data = markdown.encode("utf-8")
+        row = ParsedContent(
+            user_id=user_id,
+            file_id=file_id,
+            content_hash=markdown_digest(data),
+            content_size=len(data),
+        )
+        mode = parsed_content_storage()
+        if mode == "inline":
+            row.storage = STORAGE_INLINE
+            row.content = markdown
+            return row
+        if mode == "object" and bucket and object_path and self._object_exists(bucket, object_path):
+            row.storage = STORAGE_OBJECT
+            row.object_key = f"{bucket}/{object_path}"
+            return row
+        row.storage, row.content_blob = compress_markdown(data, ZSTD_LEVEL)
+        return row
+
+    def read(self, row: ParsedContent) -> str:
+        storage = getattr(row, "storage", None) or STORAGE_INLINE
+        if storage == STORAGE_INLINE:
+            return row.content or ""
+        if storage in COMPRESSED_STORAGES:
+            return decompress_markdown(storage, row.content_blob).decode("utf-8")
+        if storage == STORAGE_OBJECT:
+            data = self._read_object(*split_object_key(row.object_key))
+            if row.content_hash and markdown_digest(data) != row.content_hash:
+                # MinIO 中的 Markdown 被覆盖过，以对象内容为准
+                logger.warning(f"Parsed content of file {row.file_id} does not match {row.object_key}")
+            return data.decode("utf-8")
+        raise ValueError(f"未知的解析内容存储方式: {storage}")
+
+    def load(self, file_id: int, user_id: str | None = None) -> str | None:
+        """读取文件的解析内容，没有解析记录时返回 None。"""
+        query = self.db.query(ParsedContent).filter(ParsedContent.file_id == file_id)
+        if user_id is not None:
+            query = query.filter(ParsedContent.user_id == user_id)
+        row = query.first()
+        return self.read(row) if row else None
+
+    def _object_exists(self, bucket: str, path: str) -> bool:
+        try:
+            self.minio.stat_object(bucket, path)
+            return True
+        except Exception as exc:
+            logger.warning(f"Markdown object {bucket}/{path} unavailable, storing compressed content: {exc}")
+            return False
+
+    def _read_object(self, bucket: str, path: str) -> bytes:
+        response = self.minio.get_object(bucket, path)
+        try:
+            return response.read()
+        finally:
+            close = getattr(response, "close", None)
+            if close:
+                close()
+            release_conn = getattr(response, "release_conn", None)
+            if release_conn:
+                release_conn()
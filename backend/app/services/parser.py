@@ -1,19 +1,32 @@
+import hashlib
+import io
 import json
 import os
+import queue
+import tempfile
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO, Iterator
 
 from loguru import logger
 from sqlalchemy.orm import Session
 
 from app.models.enums import FileStatus
 from app.models.file import File as FileModel
-from app.models.parsed_content import ParsedContent
 from app.models.settings import Settings
 from app.services.artifact_sync import MineruArtifactSync
-from app.services.mineru_api import MineruApiClient
+from app.services.mineru_api import MineruApiClient, MineruParseResult, extract_task_progress
+from app.services.parse_cache import ParseCacheService, parse_cache_enabled, parse_settings_key
+from app.services.parsed_content_store import ParsedContentStore
+from app.services.search_index import SearchIndexService, count_pages, search_index_enabled
+from app.services.source_map import SourceMapService
+from app.services.pdf_shards import count_pdf_pages, merge_shard_zips, plan_shards, split_pdf_pages
 from app.services.popo import PopoPostprocessor
+from app.services.progress_events import progress_event, publish_progress, publish_progress_event
+from app.services.progress_reporter import TERMINAL_STATUSES, ProgressReporter
 from app.utils.minio_client import MINIO_BUCKET, minio_client
 from app.utils.redis_client import redis_client
 
@@ -21,10 +34,36 @@ PDF_EXTENSIONS = [".pdf"]
 IMAGE_EXTENSIONS = [".png", ".jpeg", ".jp2", ".webp", ".gif", ".bmp", ".jpg", ".tiff"]
 OFFICE_EXTENSIONS = [".docx", ".pptx", ".xlsx"]
 
+SOURCE_SPOOL_MAX_BYTES = int(os.getenv("MINERU_SOURCE_SPOOL_MAX_BYTES", str(16 * 1024 * 1024)))
+SOURCE_READ_CHUNK_BYTES = 1024 * 1024
+# 轮询状态没有变化时，至少间隔这么久刷新一次 last_heartbeat_at
+PROGRESS_HEARTBEAT_SECONDS = float(os.getenv("MINERU_PROGRESS_HEARTBEAT_SECONDS", "30"))
+# 页数超过阈值的 PDF 按页码区间分片并行提交，0 表示不分片
+SHARD_PAGE_THRESHOLD = int(os.getenv("MINERU_SHARD_PAGE_THRESHOLD", "0"))
+SHARD_PAGES = int(os.getenv("MINERU_SHARD_PAGES", "100"))
+SHARD_CONCURRENCY = int(os.getenv("MINERU_SHARD_CONCURRENCY", "4"))
+
 PARSER_CHANNEL = "file_parser_tasks"
 PARSER_STREAM = "file_parser_stream"
+DEAD_LETTER_STREAM = f"{PARSER_STREAM}:dlq"
 CONSUMER_GROUP = "parser_workers"
 
+# 解析队列按优先级分为三条 Stream，交互式上传沿用原来的 Stream
+PARSE_LANE_INTERACTIVE = "interactive"
+PARSE_LANE_BULK = "bulk"
+PARSE_LANE_REPARSE = "reparse"
+PARSE_LANE_STREAMS = {
+    PARSE_LANE_INTERACTIVE: PARSER_STREAM,
+    PARSE_LANE_BULK: f"{PARSER_STREAM}:bulk",
+    PARSE_LANE_REPARSE: f"{PARSER_STREAM}:reparse",
+}
+# 一次上传超过该文件数时进入批量队列
+PARSE_BULK_UPLOAD_THRESHOLD = int(os.getenv("PARSE_BULK_UPLOAD_THRESHOLD", "5"))
+# 每个用户在每条队列中已写入 Stream 但未确认的任务上限，超出的任务在 Redis 等待列表中排队，0 表示不限制
+PARSE_USER_LANE_LIMIT = int(os.getenv("PARSE_USER_LANE_LIMIT", "8"))
+# 调度开销按文件大小折算，每个单位计 1
+PARSE_COST_UNIT_BYTES = int(os.getenv("PARSE_COST_UNIT_BYTES", str(5 * 1024 * 1024)))
+
 
 STAGE_PROGRESS = {
     "queued": 0,
@@ -66,6 +105,35 @@ def get_s3_config(bucket: str) -> tuple[str, str, str]:
     return values[0], values[1], values[2]
 
 
+@contextmanager
+def open_source_object(bucket: str, path: str, digest=None) -> Iterator[BinaryIO]:
+    """把 MinIO 源文件分块写入 SpooledTemporaryFile，内存占用不随文件大小增长。
+
+    传入 hashlib 对象时顺带计算源文件哈希，不需要再读一遍。
+    """
+    response = minio_client.get_object(bucket, path)
+    spool = tempfile.SpooledTemporaryFile(max_size=SOURCE_SPOOL_MAX_BYTES)
+    try:
+        try:
+            stream = getattr(response, "stream", None)
+            chunks = stream(SOURCE_READ_CHUNK_BYTES) if stream else [response.read()]
+            for chunk in chunks:
+                if digest is not None:
+                    digest.update(chunk)
+                spool.write(chunk)
+        finally:
+            close = getattr(response, "close", None)
+            if close:
+                close()
+            release_conn = getattr(response, "release_conn", None)
+            if release_conn:
+                release_conn()
+        spool.seek(0)
+        yield spool
+    finally:
+        spool.close()
+
+
 def get_buckets() -> list[str]:
     config = read_config()
     bucket_info = config.get("bucket_info", {})
@@ -74,6 +142,16 @@ def get_buckets() -> list[str]:
     return list(bucket_info.keys())
 
 
+@dataclass
+class PendingParse:
+    """已提交到 MinerU、等待轮询结果的解析任务。"""
+
+    file_id: int
+    user_id: str
+    task_id: str
+    settings_key: str
+
+
 class ParserService:
     def __init__(
         self,
@@ -81,12 +159,26 @@ class ParserService:
         mineru_api_client: MineruApiClient | None = None,
         artifact_sync_factory=None,
         popo_postprocessor: PopoPostprocessor | None = None,
+        progress_reporter: ProgressReporter | None = None,
     ):
         self.db = db
-        self.mineru_api_client = mineru_api_client or MineruApiClient()
+        # worker 中传入共享的 ProgressReporter 以合并进度写入；为空时每次更新都直接提交
+        self.progress_reporter = progress_reporter
+        self._mineru_api_client = mineru_api_client
         self.artifact_sync_factory = artifact_sync_factory or self._default_artifact_sync_factory
         self.popo_postprocessor = popo_postprocessor or PopoPostprocessor(minio=minio_client)
 
+    @property
+    def mineru_api_client(self) -> MineruApiClient:
+        # 上传、排队等 API 路径用不到 MinerU，首次调用时才创建 httpx 连接池
+        if self._mineru_api_client is None:
+            self._mineru_api_client = MineruApiClient()
+        return self._mineru_api_client
+
+    @mineru_api_client.setter
+    def mineru_api_client(self, client: MineruApiClient) -> None:
+        self._mineru_api_client = client
+
     @staticmethod
     def _default_artifact_sync_factory(bucket: str) -> MineruArtifactSync:
         _, _, endpoint = get_s3_config(bucket)
@@ -116,38 +208,41 @@ class ParserService:
         *,
         status: FileStatus | None = None,
         clear_mineru_task: bool = False,
+        mineru_task: dict[str, Any] | None = None,
     ) -> None:
-        if status is not None:
-            file.status = status
-        file.parse_stage = stage
+        values: dict[str, Any] = {"parse_stage": stage}
         progress = self._clamp_progress(percent if percent is not None else STAGE_PROGRESS.get(stage))
         if progress is not None:
             current = self._clamp_progress(getattr(file, "progress_percent", None))
             if current is not None and stage not in {"queued", "completed", "failed"}:
                 progress = max(current, progress)
-            file.progress_percent = progress
-        file.progress_message = message[:255]
-        file.last_heartbeat_at = datetime.now()
+            values["progress_percent"] = progress
+        values["progress_message"] = message[:255]
+        values["last_heartbeat_at"] = datetime.now()
         if clear_mineru_task:
-            file.mineru_task_id = None
-            file.mineru_task_status = None
-            file.mineru_task_payload = None
-        self.db.commit()
+            values.update(mineru_task_id=None, mineru_task_status=None, mineru_task_payload=None)
+        if mineru_task:
+            values.update(mineru_task)
+
+        transition = status is not None and (status != file.status or status in TERMINAL_STATUSES)
+        if status is not None:
+            file.status = status
+        for key, value in values.items():
+            setattr(file, key, value)
+
+        if self.progress_reporter is None:
+            self.db.commit()
+        elif transition:
+            # 状态切换立即提交，缓存里尚未写入的旧进度不再需要
+            self.progress_reporter.discard(file.id)
+            self.db.commit()
+        else:
+            self.progress_reporter.report(file.id, values)
+        publish_progress(file)
 
     @staticmethod
     def _extract_upstream_progress(payload: dict[str, Any]) -> int | None:
-        for key in ("progress", "percent", "percentage"):
-            value = payload.get(key)
-            if value is None:
-                continue
-            try:
-                progress = float(value)
-            except (TypeError, ValueError):
-                continue
-            if 0 <= progress <= 1:
-                progress *= 100
-            return max(0, min(100, int(progress)))
-        return None
+        return extract_task_progress(payload)
 
     @staticmethod
     def _progress_message_from_payload(status: str, payload: dict[str, Any]) -> str:
@@ -159,7 +254,33 @@ class ParserService:
             return "MinerU 任务已提交"
         return f"MinerU 状态: {status}"[:255]
 
-    def _record_mineru_task_progress(self, file: FileModel, event: dict[str, Any]) -> None:
+    @staticmethod
+    def _is_unchanged_task_progress(
+        file: FileModel,
+        task_id: str,
+        status: str | None,
+        stage: str,
+        message: str,
+        percent: int,
+    ) -> bool:
+        """轮询结果与已落库的状态一致且心跳未过期时跳过写库。"""
+        if (
+            file.status != FileStatus.PARSING
+            or file.mineru_task_id != task_id
+            or file.mineru_task_status != status
+            or file.parse_stage != stage
+            or file.progress_message != message[:255]
+            or percent > (file.progress_percent or 0)
+        ):
+            return False
+        heartbeat = file.last_heartbeat_at
+        if heartbeat is None:
+            return False
+        if heartbeat.tzinfo is not None:
+            heartbeat = heartbeat.astimezone().replace(tzinfo=None)
+        return (datetime.now() - heartbeat).total_seconds() < PROGRESS_HEARTBEAT_SECONDS
+
+    def record_mineru_task_progress(self, file: FileModel, event: dict[str, Any]) -> None:
         try:
             payload = event.get("payload") if isinstance(event.get("payload"), dict) else {}
             status = str(event.get("status") or payload.get("status") or "").lower() or None
@@ -167,15 +288,21 @@ class ParserService:
             if stage not in STAGE_PROGRESS:
                 stage = "waiting_mineru"
             message = str(event.get("message") or self._progress_message_from_payload(status or "unknown", payload))
-            file.mineru_task_id = str(event.get("task_id") or payload.get("task_id") or payload.get("id") or "")
-            file.mineru_task_status = status
-            file.mineru_task_payload = json.dumps(payload, ensure_ascii=False)
+            task_id = str(event.get("task_id") or payload.get("task_id") or payload.get("id") or "")
+            percent = self._extract_upstream_progress(payload) or STAGE_PROGRESS[stage]
+            if self._is_unchanged_task_progress(file, task_id, status, stage, message, percent):
+                return
             self._update_progress(
                 file,
                 stage,
                 message,
-                self._extract_upstream_progress(payload) or STAGE_PROGRESS[stage],
+                percent,
                 status=FileStatus.PARSING,
+                mineru_task={
+                    "mineru_task_id": task_id,
+                    "mineru_task_status": status,
+                    "mineru_task_payload": json.dumps(payload, ensure_ascii=False),
+                },
             )
         except Exception as exc:
             logger.warning(f"Failed to persist MinerU task progress: {exc}")
@@ -183,7 +310,7 @@ class ParserService:
     def process_file(
         self,
         file_name: str,
-        file_bytes: bytes,
+        file_bytes: bytes | BinaryIO,
         file_extension: str,
         parse_method: str,
         lang: str,
@@ -198,6 +325,24 @@ class ParserService:
         if file_extension not in PDF_EXTENSIONS + IMAGE_EXTENSIONS + OFFICE_EXTENSIONS:
             raise ValueError(f"不支持的文件类型: {file_extension}")
 
+        shards = self._plan_pdf_shards(file_bytes) if file_extension in PDF_EXTENSIONS else []
+        if len(shards) > 1:
+            return self._process_sharded(
+                shards,
+                file_name,
+                file_bytes,
+                file_extension,
+                parse_method,
+                lang,
+                formula_enable,
+                table_enable,
+                backend,
+                mds_bucket,
+                source_pdf_path,
+                progress_callback,
+                mineru_progress_callback,
+            )
+
         if progress_callback:
             progress_callback("submitting_mineru", "正在提交 MinerU 任务", STAGE_PROGRESS["submitting_mineru"])
         result = self.mineru_api_client.parse_file(
@@ -210,10 +355,157 @@ class ParserService:
             table_enable=table_enable,
             progress_callback=mineru_progress_callback,
         )
+        return [self._sync_artifacts(result, file_name, mds_bucket, source_pdf_path, progress_callback)]
+
+    @staticmethod
+    def _plan_pdf_shards(file_bytes: bytes | BinaryIO) -> list[tuple[int, int]]:
+        if SHARD_PAGE_THRESHOLD <= 0:
+            return []
+        page_count = count_pdf_pages(file_bytes)
+        if not page_count or page_count <= SHARD_PAGE_THRESHOLD:
+            return []
+        return plan_shards(page_count, SHARD_PAGES)
+
+    def _process_sharded(
+        self,
+        shards: list[tuple[int, int]],
+        file_name: str,
+        file_bytes: bytes | BinaryIO,
+        file_extension: str,
+        parse_method: str,
+        lang: str,
+        formula_enable: bool,
+        table_enable: bool,
+        backend: str,
+        mds_bucket: str,
+        source_pdf_path: str,
+        progress_callback=None,
+        mineru_progress_callback=None,
+    ) -> list[str]:
+        """按页码区间把 PDF 拆成子 PDF 并行提交 MinerU 任务，合并结果后按单个文件同步产物。
+
+        子 PDF 写入 SpooledTemporaryFile，每个分片只上传自己的页面。
+        分片线程只把 MinerU 进度事件放进队列，写库和进度回调都在当前线程完成。
+        """
+        source = io.BytesIO(file_bytes) if isinstance(file_bytes, bytes | bytearray) else file_bytes
+        filename = f"{file_name}{file_extension}"
+        total = len(shards)
+        logger.info(f"Splitting {filename} into {total} page-range shards")
+        if progress_callback:
+            progress_callback(
+                "submitting_mineru",
+                f"正在提交 MinerU 任务（{total} 个分片）",
+                STAGE_PROGRESS["submitting_mineru"],
+            )
+
+        events: queue.Queue = queue.Queue()
+        shard_states: list[dict[str, Any]] = [{} for _ in shards]
+        parts = split_pdf_pages(source, shards, SOURCE_SPOOL_MAX_BYTES)
+
+        def parse_shard(index: int):
+            return self.mineru_api_client.parse_file(
+                filename=filename,
+                file_bytes=parts[index],
+                backend=backend,
+                parse_method=parse_method,
+                lang=lang,
+                formula_enable=formula_enable,
+                table_enable=table_enable,
+                progress_callback=lambda event: events.put((index, event)),
+            )
+
+        results: list[MineruParseResult | None] = [None] * total
+        executor = ThreadPoolExecutor(max_workers=max(1, min(SHARD_CONCURRENCY, total)))
+        try:
+            futures = {executor.submit(parse_shard, index): index for index in range(total)}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    results[futures[future]] = future.result()
+                self._drain_shard_events(events, shard_states, results, mineru_progress_callback)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            for result in results:
+                self._close_result(result)
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for part in parts:
+                part.close()
+
+        try:
+            merged = merge_shard_zips([result.content for result in results], [start for start, _ in shards])
+        finally:
+            for result in results:
+                self._close_result(result)
+        merged_result = MineruParseResult(filename=filename, content=merged, content_type="application/zip")
+        return [self._sync_artifacts(merged_result, file_name, mds_bucket, source_pdf_path, progress_callback)]
+
+    @staticmethod
+    def _drain_shard_events(
+        events: queue.Queue,
+        shard_states: list[dict[str, Any]],
+        results: list[MineruParseResult | None],
+        mineru_progress_callback=None,
+    ) -> None:
+        changed = False
+        while True:
+            try:
+                index, event = events.get_nowait()
+            except queue.Empty:
+                break
+            payload = event.get("payload") if isinstance(event.get("payload"), dict) else {}
+            shard_states[index] = {
+                "task_id": str(event.get("task_id") or ""),
+                "status": str(event.get("status") or "").lower(),
+                "progress": extract_task_progress(payload) or 0,
+            }
+            changed = True
+        if not changed or not mineru_progress_callback:
+            return
+
+        finished = sum(result is not None for result in results)
+        progress = [100 if results[index] is not None else state.get("progress", 0) for index, state in enumerate(shard_states)]
+        task_ids = [state["task_id"] for state in shard_states if state.get("task_id")]
+        mineru_progress_callback(
+            {
+                "task_id": task_ids[0] if task_ids else "",
+                "status": "processing",
+                "stage": "waiting_mineru",
+                "message": f"MinerU 分片进度 {finished}/{len(results)}",
+                "payload": {
+                    # 小数形式表示进度，避免 1% 被当作 100%
+                    "progress": round(sum(progress) / len(progress) / 100, 4),
+                    "shards": shard_states,
+                },
+            }
+        )
+
+    @staticmethod
+    def _close_result(result: MineruParseResult | None) -> None:
+        close = getattr(getattr(result, "content", None), "close", None)
+        if close:
+            close()
+
+    def _sync_artifacts(
+        self,
+        result,
+        file_name: str,
+        mds_bucket: str,
+        source_pdf_path: str,
+        progress_callback=None,
+    ) -> str:
         if progress_callback:
             progress_callback("syncing_artifacts", "正在同步解析产物", STAGE_PROGRESS["syncing_artifacts"])
         artifact_sync = self.artifact_sync_factory(mds_bucket)
-        synced = artifact_sync.sync_zip(result.content, output_name=file_name)
+        try:
+            synced = artifact_sync.sync_zip(result.content, output_name=file_name)
+        finally:
+            close = getattr(result.content, "close", None)
+            if close:
+                close()
         try:
             if progress_callback and getattr(getattr(self.popo_postprocessor, "config", None), "enabled", False):
                 progress_callback("postprocessing_popo", "正在执行 Popo 后处理", STAGE_PROGRESS["postprocessing_popo"])
@@ -226,132 +518,427 @@ class ParserService:
             )
         except Exception as exc:
             logger.warning(f"Popo postprocess skipped for {file_name}: {exc}")
-        return [synced.markdown]
+        return synced.markdown
 
-    def parse_file(self, file: FileModel, user_id: str, parse_method: str = "auto", predictor=None) -> dict[str, Any]:
-        """同步解析文件。predictor 参数保留用于兼容旧调用方，当前通过 MinerU API sidecar 解析。"""
-        try:
+    def _resolve_parse_settings(
+        self,
+        user_id: str,
+        parse_method: str,
+        user_settings: Settings | None = None,
+    ) -> tuple[dict[str, Any], str]:
+        if user_settings is None:
             user_settings = self.db.query(Settings).filter(Settings.user_id == user_id).first()
-            if not user_settings:
-                user_settings = Settings(
-                    user_id=user_id,
-                    force_ocr=False,
-                    ocr_lang="ch",
-                    formula_recognition=True,
-                    table_recognition=True,
-                )
-            settings = user_settings.to_dict()
-            logger.info(settings)
-            if settings.get("force_ocr", False):
-                parse_method = "ocr"
-
-            backend = settings.get("backend", "pipeline")
-            file.error_message = None
-            file.start_at = datetime.now()
-            self._update_progress(
-                file,
-                "fetching_source",
-                "正在读取源文件",
-                STAGE_PROGRESS["fetching_source"],
-                status=FileStatus.PARSING,
+        if not user_settings:
+            user_settings = Settings(
+                user_id=user_id,
+                force_ocr=False,
+                ocr_lang="ch",
+                formula_recognition=True,
+                table_recognition=True,
             )
+        settings = user_settings.to_dict()
+        if settings.get("force_ocr", False):
+            parse_method = "ocr"
+        return settings, parse_method
+
+    def _parse_settings_key(self, settings: dict[str, Any], parse_method: str) -> str:
+        effort = getattr(self.mineru_api_client, "hybrid_effort", None) or os.getenv("MINERU_API_HYBRID_EFFORT", "high")
+        return parse_settings_key(
+            backend=settings.get("backend", "pipeline"),
+            parse_method=parse_method,
+            lang=settings.get("ocr_lang", "ch"),
+            formula_enable=settings.get("formula_recognition", True),
+            table_enable=settings.get("table_recognition", True),
+            effort=effort,
+        )
+
+    def _record_parse_cache(self, file: FileModel, settings_key: str) -> None:
+        try:
+            ParseCacheService(self.db).record(file, settings_key)
+        except Exception as exc:
+            self.db.rollback()
+            logger.warning(f"Failed to record parse cache for file {file.id}: {exc}")
+
+    def _read_page_artifacts(self, file: FileModel) -> dict[str, str | None]:
+        """读取分页 Markdown 产物，用于统计页数和建立全文索引；读取失败时返回空结果。"""
+        try:
+            return SearchIndexService(self.db, minio=minio_client).read_page_artifacts(file, get_buckets()[0])
+        except Exception as exc:
+            logger.warning(f"Failed to read page artifacts for file {file.id}: {exc}")
+            return {}
+
+    def _build_source_map(self, file: FileModel) -> None:
+        """解析完成后预计算溯源映射，失败时由 source_map 接口在首次访问时重建。"""
+        try:
+            SourceMapService(minio_client).rebuild(get_buckets()[0], Path(file.minio_path).stem)
+        except Exception as exc:
+            logger.warning(f"Failed to build source map for file {file.id}: {exc}")
+
+    def _index_search_content(
+        self,
+        file: FileModel,
+        user_id: str,
+        markdown: str,
+        artifacts: dict[str, str | None] | None = None,
+    ) -> None:
+        """解析完成后增量写入全文索引；失败只记录日志，不影响解析结果。"""
+        if not search_index_enabled():
+            return
+        try:
+            SearchIndexService(self.db, minio=minio_client).index_file(
+                file, user_id, markdown, get_buckets()[0], artifacts=artifacts
+            )
+            self.db.commit()
+        except Exception as exc:
+            self.db.rollback()
+            logger.warning(f"Failed to index search content for file {file.id}: {exc}")
+
+    def reuse_cached_result(
+        self,
+        file: FileModel,
+        user_id: str,
+        parse_method: str = "auto",
+        user_settings: Settings | None = None,
+    ) -> dict[str, Any] | None:
+        """命中内容哈希缓存时复制已有解析产物并直接标记为已解析，未命中返回 None。
+
+        在 worker 中执行：复制产物的耗时随结果大小增长，不能放在上传请求里。
+        """
+        content_hash = getattr(file, "content_hash", None)
+        if not content_hash or not parse_cache_enabled():
+            return None
+
+        settings, parse_method = self._resolve_parse_settings(user_id, parse_method, user_settings)
+        cache = ParseCacheService(self.db)
+        source = cache.lookup(content_hash, self._parse_settings_key(settings, parse_method))
+        if source is None or source.id == file.id:
+            return None
+        store = ParsedContentStore(self.db, minio=minio_client)
+        try:
+            source_markdown = store.load(source.id)
+        except Exception as exc:
+            logger.warning(f"Failed to read parsed content of file {source.id}: {exc}")
+            return None
+        if source_markdown is None:
+            return None
+
+        mds_bucket = get_buckets()[0]
+        source_stem = Path(source.minio_path).stem
+        target_stem = Path(file.minio_path).stem
+        try:
+            cache.clone_artifacts(mds_bucket, source_stem, target_stem)
+        except Exception as exc:
+            logger.warning(f"Failed to reuse parse result of file {source.id} for file {file.id}: {exc}")
+            return None
+        # 复制来的 middle.json 属于新文件，溯源映射同样在 worker 中预计算，不留给首次预览请求
+        self._build_source_map(file)
+
+        markdown = cache.rewrite_artifact_urls(source_markdown, mds_bucket, source_stem, target_stem)
+        self.db.add(store.build(user_id, file.id, markdown, mds_bucket, f"{target_stem}.md"))
+        file.error_message = None
+        file.start_at = datetime.now()
+        file.finish_at = file.start_at
+        file.page_count = source.page_count
+        self._update_progress(
+            file,
+            "completed",
+            "已复用相同文件的解析结果",
+            STAGE_PROGRESS["completed"],
+            status=FileStatus.PARSED,
+            clear_mineru_task=True,
+        )
+        self._index_search_content(file, user_id, markdown)
+        logger.info(f"File {file.id} reused parse result of file {source.id}")
+        return {
+            "status": "reused",
+            "message": "Parse result reused from an identical upload",
+            "file_id": file.id,
+            "source_file_id": source.id,
+        }
+
+    def _reuse_hashed_source(
+        self,
+        file: FileModel,
+        user_id: str,
+        parse_method: str,
+        digest,
+        reuse_cache: bool,
+    ) -> dict[str, Any] | None:
+        """写回读取源文件时算出的哈希，需要时再查一次缓存。
+
+        直传和分片上传的文件不经过 API，登记时没有哈希，只能在 worker 读取源文件时补上；
+        哈希随后续的进度更新一并提交。
+        """
+        if digest is None:
+            return None
+        file.content_hash = digest.hexdigest()
+        return self.reuse_cached_result(file, user_id, parse_method) if reuse_cache else None
+
+    def _begin_parse(self, file: FileModel, user_id: str, parse_method: str) -> tuple[dict[str, Any], str, str]:
+        settings, parse_method = self._resolve_parse_settings(user_id, parse_method)
+        logger.info(settings)
+        settings_key = self._parse_settings_key(settings, parse_method)
+        if getattr(file, "content_hash", None):
+            # 重新解析会覆盖产物，先让指向本文件的缓存条目失效
+            ParseCacheService(self.db).invalidate(file.id)
+
+        file.error_message = None
+        file.start_at = datetime.now()
+        self._update_progress(
+            file,
+            "fetching_source",
+            "正在读取源文件",
+            STAGE_PROGRESS["fetching_source"],
+            status=FileStatus.PARSING,
+        )
+        return settings, parse_method, settings_key
+
+    def _finish_parse(self, file: FileModel, user_id: str, markdown: str, settings_key: str) -> dict[str, Any]:
+        self.db.add(
+            ParsedContentStore(self.db, minio=minio_client).build(
+                user_id, file.id, markdown, get_buckets()[0], f"{Path(file.minio_path).stem}.md"
+            )
+        )
+
+        artifacts = self._read_page_artifacts(file)
+        self._build_source_map(file)
+        file.page_count = count_pages(artifacts.get("pages"))
+        file.error_message = None
+        file.finish_at = datetime.now()
+        self._update_progress(
+            file,
+            "completed",
+            "解析完成",
+            STAGE_PROGRESS["completed"],
+            status=FileStatus.PARSED,
+        )
+        if getattr(file, "content_hash", None) and parse_cache_enabled():
+            self._record_parse_cache(file, settings_key)
+        self._index_search_content(file, user_id, markdown, artifacts=artifacts or None)
+
+        return {"status": "success"}
+
+    def _fail_parse(self, file: FileModel, exc: Exception) -> Exception:
+        self.db.rollback()
+        file.error_message = str(exc)[:1024]
+        self._update_progress(
+            file,
+            "failed",
+            file.error_message,
+            getattr(file, "progress_percent", None) or 0,
+            status=FileStatus.PARSE_FAILED,
+        )
+        return Exception(f"解析失败: {str(exc)}")
+
+    def mark_parse_failed(self, file: FileModel, reason: str) -> None:
+        """在解析流程之外把文件标记为失败，例如任务被移入死信队列时。"""
+        self._fail_parse(file, Exception(reason))
+
+    def _progress_callback(self, file: FileModel):
+        return lambda stage, message, percent=None: self._update_progress(file, stage, message, percent)
+
+    def parse_file(
+        self,
+        file: FileModel,
+        user_id: str,
+        parse_method: str = "auto",
+        predictor=None,
+        reuse_cache: bool = False,
+    ) -> dict[str, Any]:
+        """同步解析文件。predictor 参数保留用于兼容旧调用方，当前通过 MinerU API sidecar 解析。
+
+        reuse_cache 为 True（新上传的文件）时先尝试复用相同内容的解析结果。
+        """
+        try:
+            requested_method = parse_method
+            if reuse_cache:
+                reused = self.reuse_cached_result(file, user_id, parse_method)
+                if reused:
+                    return reused
+            settings, parse_method, settings_key = self._begin_parse(file, user_id, parse_method)
+            digest = None if getattr(file, "content_hash", None) else hashlib.sha256()
 
-            response = minio_client.get_object(MINIO_BUCKET, file.minio_path)
-            file_bytes = response.read()
             file_extension = Path(file.minio_path).suffix.lower()
             file_name_stem = Path(file.minio_path).stem
 
             buckets = get_buckets()
             mds_bucket = buckets[0]
 
-            md_content_list = self.process_file(
-                file_name_stem,
-                file_bytes,
-                file_extension,
-                parse_method,
-                settings.get("ocr_lang", "ch"),
-                settings.get("formula_recognition", True),
-                settings.get("table_recognition", True),
-                backend=backend,
-                mds_bucket=mds_bucket,
-                source_pdf_path=file.minio_path,
-                progress_callback=lambda stage, message, percent=None: self._update_progress(
-                    file,
-                    stage,
-                    message,
-                    percent,
-                ),
-                mineru_progress_callback=lambda event: self._record_mineru_task_progress(file, event),
-            )
+            with open_source_object(MINIO_BUCKET, file.minio_path, digest=digest) as source:
+                reused = self._reuse_hashed_source(file, user_id, requested_method, digest, reuse_cache)
+                if reused:
+                    return reused
+                md_content_list = self.process_file(
+                    file_name_stem,
+                    source,
+                    file_extension,
+                    parse_method,
+                    settings.get("ocr_lang", "ch"),
+                    settings.get("formula_recognition", True),
+                    settings.get("table_recognition", True),
+                    backend=settings.get("backend", "pipeline"),
+                    mds_bucket=mds_bucket,
+                    source_pdf_path=file.minio_path,
+                    progress_callback=self._progress_callback(file),
+                    mineru_progress_callback=lambda event: self.record_mineru_task_progress(file, event),
+                )
 
-            parsed_content = ParsedContent(
-                user_id=user_id,
-                file_id=file.id,
-                content=md_content_list[0],
-            )
-            self.db.add(parsed_content)
+            return self._finish_parse(file, user_id, md_content_list[0], settings_key)
 
-            file.error_message = None
-            file.finish_at = datetime.now()
-            self._update_progress(
-                file,
-                "completed",
-                "解析完成",
-                STAGE_PROGRESS["completed"],
-                status=FileStatus.PARSED,
-            )
+        except Exception as e:
+            raise self._fail_parse(file, e)
 
-            return {"status": "success"}
+    def submit_parse(
+        self,
+        file: FileModel,
+        user_id: str,
+        parse_method: str = "auto",
+        reuse_cache: bool = False,
+    ) -> PendingParse | None:
+        """读取源文件并提交 MinerU /tasks 任务，不等待结果；轮询交给 MineruTaskPoller。
+
+        复用了相同内容的解析结果时不提交任务，返回 None。
+        """
+        try:
+            requested_method = parse_method
+            if reuse_cache and self.reuse_cached_result(file, user_id, parse_method):
+                return None
+            settings, parse_method, settings_key = self._begin_parse(file, user_id, parse_method)
+            digest = None if getattr(file, "content_hash", None) else hashlib.sha256()
+
+            file_extension = Path(file.minio_path).suffix.lower()
+            if file_extension not in PDF_EXTENSIONS + IMAGE_EXTENSIONS + OFFICE_EXTENSIONS:
+                raise ValueError(f"不支持的文件类型: {file_extension}")
+
+            with open_source_object(MINIO_BUCKET, file.minio_path, digest=digest) as source:
+                if self._reuse_hashed_source(file, user_id, requested_method, digest, reuse_cache):
+                    return None
+                self._update_progress(file, "submitting_mineru", "正在提交 MinerU 任务", STAGE_PROGRESS["submitting_mineru"])
+                task_id, payload = self.mineru_api_client.submit_task(
+                    filename=f"{Path(file.minio_path).stem}{file_extension}",
+                    file_bytes=source,
+                    backend=settings.get("backend", "pipeline"),
+                    parse_method=parse_method,
+                    lang=settings.get("ocr_lang", "ch"),
+                    formula_enable=settings.get("formula_recognition", True),
+                    table_enable=settings.get("table_recognition", True),
+                )
+            self.record_mineru_task_progress(file, {"task_id": task_id, "status": "submitted", "payload": payload})
+            return PendingParse(file_id=file.id, user_id=user_id, task_id=task_id, settings_key=settings_key)
 
         except Exception as e:
-            self.db.rollback()
-            file.error_message = str(e)[:1024]
-            self._update_progress(
-                file,
-                "failed",
-                file.error_message,
-                getattr(file, "progress_percent", None) or 0,
-                status=FileStatus.PARSE_FAILED,
+            raise self._fail_parse(file, e)
+
+    def complete_parse(self, file: FileModel, pending: PendingParse, poll_error: Exception | None = None) -> dict[str, Any]:
+        """轮询结束后下载结果、同步产物并写入解析内容。"""
+        try:
+            if poll_error is not None:
+                raise poll_error
+
+            file_name_stem = Path(file.minio_path).stem
+            mds_bucket = get_buckets()[0]
+            result = self.mineru_api_client.fetch_task_result(
+                pending.task_id,
+                filename=f"{file_name_stem}{Path(file.minio_path).suffix.lower()}",
+            )
+            markdown = self._sync_artifacts(
+                result,
+                file_name_stem,
+                mds_bucket,
+                file.minio_path,
+                progress_callback=self._progress_callback(file),
             )
-            raise Exception(f"解析失败: {str(e)}")
+            return self._finish_parse(file, pending.user_id, markdown, pending.settings_key)
+
+        except Exception as e:
+            raise self._fail_parse(file, e)
 
     def get_parsed_content(self, file_id: int, user_id: str):
-        query = self.db.query(ParsedContent).filter(
-            ParsedContent.file_id == file_id,
-            ParsedContent.user_id == user_id,
-        )
-        content_obj = query.first()
-        return content_obj.content if content_obj else ""
+        return ParsedContentStore(self.db, minio=minio_client).load(file_id, user_id) or ""
 
-    def queue_parse_file(self, file: FileModel, user_id: str, parse_method: str = "auto") -> dict[str, Any]:
-        try:
-            self._update_progress(
-                file,
-                "queued",
-                "队列等待中",
-                STAGE_PROGRESS["queued"],
-                status=FileStatus.PENDING,
-                clear_mineru_task=True,
-            )
+    @staticmethod
+    def upload_lane(file_count: int) -> str:
+        return PARSE_LANE_BULK if file_count > PARSE_BULK_UPLOAD_THRESHOLD else PARSE_LANE_INTERACTIVE
 
-            task_data = {
-                "file_id": file.id,
-                "user_id": user_id,
-                "parse_method": parse_method,
-            }
+    @staticmethod
+    def _parse_cost(file: FileModel) -> int:
+        size = getattr(file, "size", None) or 0
+        return max(1, -(-size // PARSE_COST_UNIT_BYTES))
 
-            logger.info(f"Publishing task to stream {PARSER_STREAM}: {task_data}")
-            redis_client.publish_task(PARSER_STREAM, task_data)
+    def queue_parse_file(
+        self,
+        file: FileModel,
+        user_id: str,
+        parse_method: str = "auto",
+        lane: str = PARSE_LANE_INTERACTIVE,
+        reuse_cache: bool = False,
+    ) -> dict[str, Any]:
+        return self.queue_parse_files([file], user_id, parse_method, lane, reuse_cache)[0]
+
+    def queue_parse_files(
+        self,
+        files: list[FileModel],
+        user_id: str,
+        parse_method: str = "auto",
+        lane: str = PARSE_LANE_INTERACTIVE,
+        reuse_cache: bool = False,
+    ) -> list[dict[str, Any]]:
+        """把一批文件标记为排队中并在一次提交内落库，再一次性写入解析 Stream。
+
+        每个用户在 Stream 中的任务数受 PARSE_USER_LANE_LIMIT 限制，超出部分由 Redis 在该用户的任务确认后依次补入。
+
+        reuse_cache 让 worker 先查内容哈希缓存，新上传的文件使用；手动重新解析不复用。
+        """
+        if not files:
+            return []
+        stream = PARSE_LANE_STREAMS.get(lane, PARSER_STREAM)
+        try:
+            queued_at = datetime.now()
+            for file in files:
+                file.status = FileStatus.PENDING
+                file.parse_stage = "queued"
+                file.progress_percent = STAGE_PROGRESS["queued"]
+                file.progress_message = "队列等待中"
+                file.last_heartbeat_at = queued_at
+                file.mineru_task_id = None
+                file.mineru_task_status = None
+                file.mineru_task_payload = None
+            if self.progress_reporter is not None:
+                for file in files:
+                    self.progress_reporter.discard(file.id)
+            # 提交后属性会过期，任务和进度事件在提交前生成，避免逐个刷新
+            tasks = [
+                {
+                    "file_id": file.id,
+                    "user_id": user_id,
+                    "parse_method": parse_method,
+                    "lane": lane,
+                    "cost": self._parse_cost(file),
+                    **({"reuse_cache": True} if reuse_cache else {}),
+                }
+                for file in files
+            ]
+            events = [(getattr(file, "user_id", None), progress_event(file)) for file in files]
+            self.db.commit()
 
-            return {
-                "status": "queued",
-                "message": "File parsing task has been queued",
-                "file_id": file.id,
-            }
+            logger.info(f"Publishing {len(tasks)} tasks to stream {stream}: {[task['file_id'] for task in tasks]}")
+            redis_client.admit_tasks(stream, str(user_id), tasks, PARSE_USER_LANE_LIMIT)
+            for event_user_id, event in events:
+                publish_progress_event(event_user_id, event)
+
+            return [
+                {
+                    "status": "queued",
+                    "message": "File parsing task has been queued",
+                    "file_id": task["file_id"],
+                }
+                for task in tasks
+            ]
 
         except Exception as e:
             self.db.rollback()
-            file.status = FileStatus.PARSE_FAILED
-            file.error_message = str(e)[:1024]
+            for file in files:
+                file.status = FileStatus.PARSE_FAILED
+                file.error_message = str(e)[:1024]
             self.db.commit()
             raise Exception(f"Failed to queue parsing task: {str(e)}")
@@ -0,0 +1,166 @@
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+from typing import Any, BinaryIO
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # pragma: no cover - requirements.txt 固定了 pypdf，缺失时不分片
+    PdfReader = None
+    PdfWriter = None
+
+MERGED_SPOOL_MAX_BYTES = int(os.getenv("MINERU_RESULT_SPOOL_MAX_BYTES", str(32 * 1024 * 1024)))
+PAGE_HEADING_PATTERN = re.compile(r"^# Page (\d+)$", re.MULTILINE)
+# 页码从 0 开始的字段，合并时加上分片起始页：middle.json 和 content_list.json 的 page_idx，
+# pipeline 后端 model.json 中 page_info 的 page_no
+PAGE_INDEX_KEYS = ("page_idx", "page_no")
+
+
+def count_pdf_pages(source: bytes | BinaryIO) -> int | None:
+    """返回 PDF 页数，无法读取或未安装 pypdf 时返回 None。"""
+    if PdfReader is None:
+        return None
+    stream = io.BytesIO(source) if isinstance(source, bytes | bytearray) else source
+    try:
+        return len(PdfReader(stream).pages)
+    except Exception:
+        return None
+    finally:
+        if stream is source:
+            source.seek(0)
+
+
+def plan_shards(page_count: int, shard_pages: int) -> list[tuple[int, int]]:
+    """按 shard_pages 切分页码区间，返回 (start_page_id, end_page_id)，从 0 开始且包含 end。"""
+    shard_pages = max(1, shard_pages)
+    return [
+        (start, min(start + shard_pages, page_count) - 1)
+        for start in range(0, page_count, shard_pages)
+    ]
+
+
+def split_pdf_pages(
+    source: BinaryIO,
+    ranges: list[tuple[int, int]],
+    max_spool_bytes: int = MERGED_SPOOL_MAX_BYTES,
+) -> list[BinaryIO]:
+    """把每个 (start, end) 页码区间写成独立的 PDF，返回定位到开头的 SpooledTemporaryFile。
+
+    每个分片只提交自己的页面，而不是整份 PDF 加页码范围；调用方负责关闭返回的文件。
+    """
+    if PdfReader is None:
+        raise RuntimeError("拆分 PDF 需要安装 pypdf")
+    reader = PdfReader(source)
+    parts: list[BinaryIO] = []
+    try:
+        for start, end in ranges:
+            writer = PdfWriter()
+            for index in range(start, end + 1):
+                writer.add_page(reader.pages[index])
+            part = tempfile.SpooledTemporaryFile(max_size=max_spool_bytes)
+            parts.append(part)
+            writer.write(part)
+            part.seek(0)
+    except Exception:
+        for part in parts:
+            part.close()
+        raise
+    return parts
+
+
+def _shift_page_indexes(value: Any, offset: int) -> Any:
+    if isinstance(value, list):
+        return [_shift_page_indexes(item, offset) for item in value]
+    if isinstance(value, dict):
+        return {
+            key: item + offset if key in PAGE_INDEX_KEYS and isinstance(item, int) else _shift_page_indexes(item, offset)
+            for key, item in value.items()
+        }
+    return value
+
+
+def _merge_json(parts: list[tuple[Any, int]]) -> Any:
+    """按页拼接各分片的 JSON，无法确定页码结构的返回 None。"""
+    first = parts[0][0]
+    if isinstance(first, list):
+        merged = []
+        for data, offset in parts:
+            merged.extend(_shift_page_indexes(data, offset) if isinstance(data, list) else [])
+        return merged
+    if isinstance(first, dict) and isinstance(first.get("pdf_info"), list):
+        # middle.json：拼接 pdf_info，其余字段沿用第一个分片
+        merged = dict(first)
+        merged["pdf_info"] = []
+        for data, offset in parts:
+            merged["pdf_info"].extend(_shift_page_indexes(data.get("pdf_info", []), offset))
+        return merged
+    return None
+
+
+def _merge_pages_markdown(parts: list[tuple[str, int]]) -> str:
+    renumbered = [
+        PAGE_HEADING_PATTERN.sub(lambda match: f"# Page {int(match.group(1)) + offset}", text).strip()
+        for text, offset in parts
+    ]
+    return "\n\n".join(text for text in renumbered if text)
+
+
+def merge_shard_zips(sources: list[bytes | BinaryIO], offsets: list[int]) -> BinaryIO:
+    """把各分片的 MinerU 结果 ZIP 合并成一个，页码按 offsets 重新编号。
+
+    各分片用同一个文件名提交，成员路径一一对应：JSON 按页拼接，Markdown 按顺序拼接，
+    图片等二进制文件按名称去重（MinerU 以内容哈希命名图片）。无法按页合并的 JSON 和只覆盖部分页面的
+    版面可视化 PDF 不保留。
+    """
+    archives = [
+        zipfile.ZipFile(io.BytesIO(source) if isinstance(source, bytes | bytearray) else source)
+        for source in sources
+    ]
+    merged = tempfile.SpooledTemporaryFile(max_size=MERGED_SPOOL_MAX_BYTES)
+    try:
+        names: list[str] = []
+        for archive in archives:
+            for info in archive.infolist():
+                if not info.is_dir() and info.filename not in names:
+                    names.append(info.filename)
+
+        with zipfile.ZipFile(merged, "w", zipfile.ZIP_DEFLATED) as output:
+            for name in names:
+                holders = [
+                    (archive, offset)
+                    for archive, offset in zip(archives, offsets)
+                    if name in archive.NameToInfo
+                ]
+                if name.endswith(".json"):
+                    try:
+                        merged_json = _merge_json([(json.loads(archive.read(name)), offset) for archive, offset in holders])
+                    except ValueError:
+                        merged_json = None
+                    if merged_json is None:
+                        # 页码仍相对于分片的 JSON 不保留，避免合并后页码错位
+                        continue
+                    output.writestr(name, json.dumps(merged_json, ensure_ascii=False))
+                elif name.endswith("_pages.md"):
+                    parts = [(archive.read(name).decode("utf-8"), offset) for archive, offset in holders]
+                    output.writestr(name, _merge_pages_markdown(parts))
+                elif name.endswith(".md"):
+                    texts = [archive.read(name).decode("utf-8").strip() for archive, _ in holders]
+                    output.writestr(name, "\n\n".join(text for text in texts if text))
+                elif name.endswith(".pdf"):
+                    # 分片的版面可视化 PDF 只覆盖部分页面，合并后不再保留
+                    continue
+                else:
+                    with holders[0][0].open(name) as member, output.open(name, "w") as target:
+                        while chunk := member.read(1024 * 1024):
+                            target.write(chunk)
+    except Exception:
+        merged.close()
+        raise
+    finally:
+        for archive in archives:
+            archive.close()
+    merged.seek(0)
+    return merged
@@ -0,0 +1,65 @@
+import json
+from typing import Any, AsyncIterator
+
+from loguru import logger
+
+from app.models.file import File as FileModel
+from app.utils.redis_client import redis_client
+
+PROGRESS_CHANNEL_PREFIX = "file_progress"
+
+
+def progress_channel(user_id: str) -> str:
+    return f"{PROGRESS_CHANNEL_PREFIX}:{user_id}"
+
+
+def progress_event(file: FileModel) -> dict[str, Any]:
+    status = getattr(file, "status", None)
+    heartbeat = getattr(file, "last_heartbeat_at", None)
+    return {
+        "file_id": file.id,
+        "status": getattr(status, "value", status),
+        "parse_stage": getattr(file, "parse_stage", None),
+        "progress_percent": getattr(file, "progress_percent", None),
+        "progress_message": getattr(file, "progress_message", None),
+        "last_heartbeat_at": heartbeat.isoformat() if heartbeat else None,
+        "mineru_task_status": getattr(file, "mineru_task_status", None),
+    }
+
+
+def publish_progress(file: FileModel) -> None:
+    """把文件的最新进度推送到所属用户的频道。推送失败不影响解析流程。"""
+    user_id = getattr(file, "user_id", None)
+    if not user_id or redis_client.client is None:
+        return
+    publish_progress_event(user_id, progress_event(file))
+
+
+def publish_progress_event(user_id: str | None, event: dict[str, Any]) -> None:
+    """推送已生成的进度事件，供提交前先取好事件、避免提交后逐个刷新对象的调用方使用。"""
+    if not user_id or redis_client.client is None:
+        return
+    try:
+        redis_client.publish_message(progress_channel(str(user_id)), event)
+    except Exception as exc:
+        logger.warning(f"Failed to publish progress of file {event.get('file_id')}: {exc}")
+
+
+async def subscribe_progress(user_id: str) -> AsyncIterator[dict[str, Any] | None]:
+    """订阅用户的进度频道。约 1 秒没有消息时产出 None，调用方借此发送心跳和检查连接。"""
+    client = redis_client.create_async_client()
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(progress_channel(user_id))
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None:
+                yield None
+                continue
+            try:
+                yield json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+    finally:
+        await pubsub.aclose()
+        await client.aclose()
@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from loguru import logger
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.enums import FileStatus
+from app.models.file import File as FileModel
+
+TERMINAL_STATUSES = (FileStatus.PARSED, FileStatus.PARSE_FAILED)
+
+
+class ProgressReporter:
+    """合并解析进度的写库操作。
+
+    report() 只把 parse_stage、progress_percent、心跳等字段缓存在内存中，每隔 flush_interval_seconds
+    在一个事务里批量写入所有有变化的文件；状态切换由 ParserService 自己立即提交，并通过 discard()
+    丢弃该文件尚未写入的进度。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] | None = None,
+        flush_interval_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.session_factory = session_factory or SessionLocal
+        self.flush_interval_seconds = (
+            flush_interval_seconds
+            if flush_interval_seconds is not None
+            else float(os.getenv("PROGRESS_FLUSH_INTERVAL_SECONDS", "2"))
+        )
+        self.clock = clock
+        self._pending: dict[int, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush_at = clock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def report(self, file_id: int, values: dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.setdefault(file_id, {}).update(values)
+            due = self.clock() - self._last_flush_at >= self.flush_interval_seconds
+        if due:
+            self.flush()
+
+    def discard(self, file_id: int) -> None:
+        with self._lock:
+            self._pending.pop(file_id, None)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """把缓存的进度写入数据库，返回写入的文件数。已进入终态的文件不会被覆盖。"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._last_flush_at = self.clock()
+            if not pending:
+                return 0
+
+            db = self.session_factory()
+            try:
+                for file_id, values in pending.items():
+                    db.query(FileModel).filter(
+                        FileModel.id == file_id,
+                        FileModel.status.notin_(TERMINAL_STATUSES),
+                    ).update(values, synchronize_session=False)
+                db.commit()
+            except Exception as exc:
+                db.rollback()
+                logger.warning(f"Failed to flush parse progress for {len(pending)} files: {exc}")
+                with self._lock:
+                    # 写入失败时放回缓存，保留期间产生的更新的值
+                    for file_id, values in pending.items():
+                        self._pending[file_id] = {**values, **self._pending.get(file_id, {})}
+                return 0
+            finally:
+                db.close()
+            return len(pending)
+
+    def start(self) -> "ProgressReporter":
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="progress-reporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval_seconds):
+            self.flush()
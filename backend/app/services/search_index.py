@@ -0,0 +1,221 @@
+import os
+import re
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.file import File as FileModel
+from app.models.search_page import SearchPage
+from app.utils.minio_client import minio_client
+
+try:
+    from minio.error import S3Error
+except ImportError:
+    S3Error = None
+
+_MINIO_MISSING_ERROR_CODES = {"NoSuchKey", "NoSuchObject", "NoSuchBucket", "NotFound"}
+PAGE_HEADING_PATTERN = re.compile(r"^# Page(?: (\d+))?[ \t]*$", re.MULTILINE)
+_IMAGE_PATTERN = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+_SPACE_PATTERN = re.compile(r"\s+")
+# SQLite FTS5 trigram 分词至少需要 3 个字符，更短的检索词退回 LIKE
+TRIGRAM_MIN_CHARS = 3
+SNIPPET_CHARS = int(os.getenv("SEARCH_SNIPPET_CHARS", "60"))
+
+
+def search_index_enabled(value: str | None = None) -> bool:
+    if value is None:
+        value = os.getenv("SEARCH_INDEX_ENABLED", "1")
+    return str(value).strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _is_missing_minio_error(exc: Exception) -> bool:
+    if isinstance(exc, FileNotFoundError):
+        return True
+    if S3Error and isinstance(exc, S3Error):
+        return exc.code in _MINIO_MISSING_ERROR_CODES
+    return False
+
+
+def plain_text(markdown: str) -> str:
+    """去掉图片链接和 HTML 标签（MinerU 的表格是 HTML），只保留可检索的文字。"""
+    stripped = _TAG_PATTERN.sub(" ", _IMAGE_PATTERN.sub(" ", markdown))
+    return _SPACE_PATTERN.sub(" ", stripped).strip()
+
+
+def split_pages(markdown: str) -> list[tuple[int | None, str]]:
+    """按 `# Page N` 标题切分 _pages.md，标题不带页码时按出现顺序从 1 编号。没有标题时整篇作为一页返回，页码为 None。"""
+    matches = list(PAGE_HEADING_PATTERN.finditer(markdown))
+    if not matches:
+        return [(None, markdown)]
+    pages = []
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(markdown)
+        page = int(match.group(1)) if match.group(1) else index + 1
+        pages.append((page, markdown[match.end():end]))
+    return pages
+
+
+def count_pages(markdown: str | None) -> int | None:
+    """统计 _pages.md 中的页数，没有分页标题时返回 None。"""
+    if not markdown:
+        return None
+    return len(PAGE_HEADING_PATTERN.findall(markdown)) or None
+
+
+def query_terms(query: str) -> list[str]:
+    return [term for term in query.split() if term]
+
+
+def make_snippet(content: str, terms: list[str], width: int = SNIPPET_CHARS) -> str:
+    """从页面文本中截取第一个命中词前后各 width 个字符。"""
+    lowered = content.casefold()
+    positions = [lowered.find(term.casefold()) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    if not positions:
+        return content[: width * 2] + ("…" if len(content) > width * 2 else "")
+    position = min(positions)
+    start = max(0, position - width)
+    end = min(len(content), position + width)
+    return ("…" if start > 0 else "") + content[start:end] + ("…" if end < len(content) else "")
+
+
+class SearchIndexService:
+    def __init__(self, db: Session, minio: Any | None = None):
+        self.db = db
+        self.minio = minio or minio_client
+
+    def read_page_artifacts(self, file: FileModel, bucket: str) -> dict[str, str | None]:
+        """读取 _pages.md 和 _popo.md，不存在的产物为 None。"""
+        stem = os.path.splitext(os.path.basename(file.minio_path))[0]
+        return {
+            source: self._read_text(bucket, f"{stem}{suffix}")
+            for source, suffix in (("pages", "_pages.md"), ("popo", "_popo.md"))
+        }
+
+    def index_file(
+        self,
+        file: FileModel,
+        user_id: str,
+        markdown: str,
+        bucket: str,
+        artifacts: dict[str, str | None] | None = None,
+    ) -> int:
+        """用 _pages.md 和 _popo.md 重建该文件的索引行，没有分页产物时退回整篇 Markdown。
+
+        已读取过产物的调用方可以传入 artifacts 避免重复下载。调用方负责提交事务。
+        """
+        self.remove(file.id)
+        if artifacts is None:
+            artifacts = self.read_page_artifacts(file, bucket)
+        rows: list[SearchPage] = []
+        for source in ("pages", "popo"):
+            if artifacts.get(source):
+                rows.extend(self._page_rows(file.id, user_id, source, artifacts[source]))
+        if not any(row.source == "pages" for row in rows) and markdown:
+            rows.extend(self._page_rows(file.id, user_id, "content", markdown))
+        self.db.add_all(rows)
+        return len(rows)
+
+    def remove(self, file_id: int) -> None:
+        """删除该文件的索引行；调用方负责提交事务。"""
+        self.db.query(SearchPage).filter(SearchPage.file_id == file_id).delete(synchronize_session=False)
+
+    def search(self, user_id: str, query: str, limit: int = 20) -> list[dict[str, Any]]:
+        """返回按相关度排序的命中页，同一文件同一页只保留得分最高的一条。"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+        dialect = self.db.get_bind().dialect.name
+        # 多取一些，去重后仍能凑满 limit
+        fetch = limit * 3
+        if dialect == "sqlite" and all(len(term) >= TRIGRAM_MIN_CHARS for term in terms):
+            rows = self._search_sqlite(user_id, terms, fetch)
+        elif dialect == "postgresql":
+            rows = self._search_postgres(user_id, query, fetch)
+        else:
+            rows = self._search_like(user_id, terms, fetch)
+
+        hits: list[dict[str, Any]] = []
+        seen: set[tuple[int, int | None]] = set()
+        for row in rows:
+            key = (row.file_id, row.page)
+            if key in seen:
+                continue
+            seen.add(key)
+            hits.append(
+                {
+                    "file_id": row.file_id,
+                    "page": row.page,
+                    "source": row.source,
+                    "snippet": make_snippet(row.text, terms),
+                }
+            )
+            if len(hits) >= limit:
+                break
+
+        filenames = dict(
+            self.db.query(FileModel.id, FileModel.filename).filter(
+                FileModel.user_id == user_id,
+                FileModel.id.in_({hit["file_id"] for hit in hits}),
+            ).all()
+        )
+        return [dict(hit, filename=filenames[hit["file_id"]]) for hit in hits if hit["file_id"] in filenames]
+
+    def _search_sqlite(self, user_id: str, terms: list[str], limit: int):
+        # 每个词加双引号作为短语，避免用户输入被当作 FTS5 查询语法
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        return self.db.execute(
+            text(
+                "SELECT p.file_id, p.page, p.source, p.text FROM search_pages_fts "
+                "JOIN search_pages p ON p.id = search_pages_fts.rowid "
+                "WHERE search_pages_fts MATCH :match AND p.user_id = :user_id "
+                "ORDER BY bm25(search_pages_fts) LIMIT :limit"
+            ),
+            {"match": match, "user_id": user_id, "limit": limit},
+        ).all()
+
+    def _search_postgres(self, user_id: str, query: str, limit: int):
+        return self.db.execute(
+            text(
+                "SELECT file_id, page, source, text FROM search_pages "
+                "WHERE user_id = :user_id AND to_tsvector('simple', text) @@ plainto_tsquery('simple', :query) "
+                "ORDER BY ts_rank(to_tsvector('simple', text), plainto_tsquery('simple', :query)) DESC LIMIT :limit"
+            ),
+            {"query": query, "user_id": user_id, "limit": limit},
+        ).all()
+
+    def _search_like(self, user_id: str, terms: list[str], limit: int):
+        query = self.db.query(SearchPage.file_id, SearchPage.page, SearchPage.source, SearchPage.text).filter(
+            SearchPage.user_id == user_id
+        )
+        for term in terms:
+            query = query.filter(SearchPage.text.ilike(f"%{term}%"))
+        return query.order_by(SearchPage.file_id.desc(), SearchPage.page).limit(limit).all()
+
+    @staticmethod
+    def _page_rows(file_id: int, user_id: str, source: str, markdown: str) -> list[SearchPage]:
+        rows = []
+        for page, content in split_pages(markdown):
+            content = plain_text(content)
+            if content:
+                rows.append(SearchPage(user_id=user_id, file_id=file_id, source=source, page=page, text=content))
+        return rows
+
+    def _read_text(self, bucket: str, path: str) -> str | None:
+        try:
+            response = self.minio.get_object(bucket, path)
+        except Exception as exc:
+            if _is_missing_minio_error(exc):
+                return None
+            raise
+        try:
+            return response.read().decode("utf-8")
+        finally:
+            close = getattr(response, "close", None)
+            if close:
+                close()
+            release_conn = getattr(response, "release_conn", None)
+            if release_conn:
+                release_conn()
@@ -0,0 +1,178 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from app.services.source_map import source_text_signature
+
+# 每页划分成 GRID_SIZE x GRID_SIZE 个网格，点选时只检查所在网格里的 bbox
+GRID_SIZE = int(os.getenv("SOURCE_LOOKUP_GRID_SIZE", "16"))
+# 文本签名按固定步长切成定长锚点建哈希索引
+SIGNATURE_ANCHOR_CHARS = 16
+# 比锚点短的块整体作为键；太短的签名（页码、序号）只在与查询完全相同时命中
+SHORT_SIGNATURE_MIN_CHARS = 6
+SOURCE_LOOKUP_CACHE_ENTRIES = int(os.getenv("SOURCE_LOOKUP_CACHE_ENTRIES", "16"))
+
+
+def _bbox_extent(blocks: list[dict[str, Any]], axis: int) -> float:
+    return max((max(block["bbox"][axis], block["bbox"][axis + 2]) for block in blocks), default=0)
+
+
+class PageGrid:
+    """单页 bbox 的均匀网格索引，点选查询只检查一个网格内的块。"""
+
+    def __init__(self, page: dict[str, Any], size: int = GRID_SIZE):
+        self.blocks = page.get("blocks") or []
+        self.size = max(1, size)
+        self.width = page.get("width") or _bbox_extent(self.blocks, 0) or 1
+        self.height = page.get("height") or _bbox_extent(self.blocks, 1) or 1
+        self.cells: dict[tuple[int, int], list[int]] = {}
+        for position, block in enumerate(self.blocks):
+            x0, y0, x1, y1 = block["bbox"]
+            col0, row0 = self._cell(min(x0, x1), min(y0, y1))
+            col1, row1 = self._cell(max(x0, x1), max(y0, y1))
+            for col in range(col0, col1 + 1):
+                for row in range(row0, row1 + 1):
+                    self.cells.setdefault((col, row), []).append(position)
+
+    def _cell(self, x: float, y: float) -> tuple[int, int]:
+        col = int(x / self.width * self.size)
+        row = int(y / self.height * self.size)
+        return min(max(col, 0), self.size - 1), min(max(row, 0), self.size - 1)
+
+    def hit(self, x: float, y: float) -> list[dict[str, Any]]:
+        """返回包含该点的块，面积小的（更内层的）在前。"""
+        hits = []
+        for position in self.cells.get(self._cell(x, y), []):
+            block = self.blocks[position]
+            x0, y0, x1, y1 = block["bbox"]
+            if min(x0, x1) <= x <= max(x0, x1) and min(y0, y1) <= y <= max(y0, y1):
+                hits.append(block)
+        return sorted(hits, key=lambda block: abs(block["bbox"][2] - block["bbox"][0]) * abs(block["bbox"][3] - block["bbox"][1]))
+
+
+class SourceLookup:
+    """由归一化的 source map 建立的点选网格和文本签名索引。"""
+
+    def __init__(self, source_map: dict[str, Any]):
+        self.grids: dict[int, PageGrid] = {}
+        self.signatures: list[str] = []
+        self.refs: list[tuple[int, dict[str, Any]]] = []
+        self.anchors: dict[str, list[tuple[int, int]]] = {}
+        self.short: dict[str, list[int]] = {}
+        self.short_lengths: set[int] = set()
+        for page in source_map.get("pages") or []:
+            self.grids[page["page"]] = PageGrid(page)
+            for block in page.get("blocks") or []:
+                self._add_signature(page["page"], block)
+
+    def _add_signature(self, page: int, block: dict[str, Any]) -> None:
+        signature = source_text_signature(str(block.get("text") or ""))
+        if not signature:
+            return
+        ref = len(self.refs)
+        self.refs.append((page, block))
+        self.signatures.append(signature)
+        if len(signature) < SIGNATURE_ANCHOR_CHARS:
+            self.short.setdefault(signature, []).append(ref)
+            self.short_lengths.add(len(signature))
+            return
+        last = len(signature) - SIGNATURE_ANCHOR_CHARS
+        offsets = list(range(0, last + 1, SIGNATURE_ANCHOR_CHARS))
+        if offsets[-1] != last:
+            offsets.append(last)
+        for offset in offsets:
+            self.anchors.setdefault(signature[offset:offset + SIGNATURE_ANCHOR_CHARS], []).append((ref, offset))
+
+    def hit(self, page: int, x: float, y: float) -> list[dict[str, Any]]:
+        grid = self.grids.get(page)
+        return [dict(block, page=page) for block in grid.hit(x, y)] if grid else []
+
+    def trace(self, text: str, page: int | None = None, limit: int = 50) -> list[dict[str, Any]]:
+        """返回文本片段对应的块，按在片段中出现的位置排序。
+
+        片段签名的每个位置查一次锚点哈希，命中后按对齐位置比较重叠部分；
+        查询代价只与片段长度有关，和文档的块数无关。
+        """
+        query = source_text_signature(text)
+        if not query:
+            return []
+        matches: dict[int, tuple[int, int]] = {}
+
+        def consider(ref: int, start: int, length: int) -> None:
+            if page is not None and self.refs[ref][0] != page:
+                return
+            current = matches.get(ref)
+            if current is None or length > current[1]:
+                matches[ref] = (start, length)
+
+        checked: set[tuple[int, int]] = set()
+        for index in range(len(query) - SIGNATURE_ANCHOR_CHARS + 1):
+            for ref, offset in self.anchors.get(query[index:index + SIGNATURE_ANCHOR_CHARS], ()):
+                shift = offset - index
+                if (ref, shift) in checked:
+                    continue
+                checked.add((ref, shift))
+                overlap = self._aligned_overlap(query, self.signatures[ref], shift)
+                if overlap:
+                    consider(ref, max(0, -shift), overlap)
+
+        for length in self.short_lengths:
+            if length < SHORT_SIGNATURE_MIN_CHARS and length != len(query):
+                continue
+            for index in range(len(query) - length + 1):
+                for ref in self.short.get(query[index:index + length], ()):
+                    consider(ref, index, length)
+
+        ordered = sorted(matches.items(), key=lambda item: (item[1][0], -item[1][1]))
+        return [
+            dict(self.refs[ref][1], page=self.refs[ref][0], matched_chars=length)
+            for ref, (_, length) in ordered[:limit]
+        ]
+
+    @staticmethod
+    def _aligned_overlap(query: str, signature: str, shift: int) -> int:
+        """signature 相对 query 偏移 shift 对齐后，重叠部分完全一致时返回重叠长度，否则返回 0。"""
+        query_start = max(0, -shift)
+        signature_start = max(0, shift)
+        length = min(len(query) - query_start, len(signature) - signature_start)
+        if length < min(SIGNATURE_ANCHOR_CHARS, len(query)):
+            return 0
+        if query[query_start:query_start + length] != signature[signature_start:signature_start + length]:
+            return 0
+        return length
+
+
+class SourceLookupCache:
+    """按 source map 产物摘要缓存 SourceLookup 的进程内 LRU。
+
+    摘要随 middle.json 变化，旧条目不会再被命中，随 LRU 淘汰。
+    """
+
+    def __init__(self, max_entries: int = SOURCE_LOOKUP_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, SourceLookup] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> SourceLookup | None:
+        with self._lock:
+            lookup = self._entries.get(key)
+            if lookup is not None:
+                self._entries.move_to_end(key)
+            return lookup
+
+    def put(self, key: str, lookup: SourceLookup) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = lookup
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+source_lookup_cache = SourceLookupCache()
@@ -0,0 +1,488 @@
+import hashlib
+import io
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator
+
+from loguru import logger
+
+from app.services.json_stream import iter_json_array
+from app.utils.minio_client import minio_client
+
+try:
+    from minio.error import S3Error
+except ImportError:
+    S3Error = None
+
+_MINIO_MISSING_ERROR_CODES = {"NoSuchKey", "NoSuchObject", "NoSuchBucket", "NotFound"}
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+_SPACE_PATTERN = re.compile(r"\s+")
+_NON_WORD_PATTERN = re.compile(r"[^\w]+", re.UNICODE)
+SOURCE_MAP_SUFFIX = "_source_map.json"
+SOURCE_MAP_INDEX_SUFFIX = "_source_map_index.json"
+MIDDLE_JSON_READ_CHUNK_BYTES = 1024 * 1024
+# 归一化规则变化时递增，旧版本的预计算产物会被重建
+SOURCE_MAP_VERSION = "1"
+_META_VERSION = "source-map-version"
+_META_DIGEST = "source-map-digest"
+_META_MIDDLE_PATH = "middle-path"
+_META_MIDDLE_ETAG = "middle-etag"
+
+
+def source_map_path(stem: str) -> str:
+    return f"{stem}{SOURCE_MAP_SUFFIX}"
+
+
+def source_map_index_path(stem: str) -> str:
+    return f"{stem}{SOURCE_MAP_INDEX_SUFFIX}"
+
+
+def middle_json_candidates(stem: str) -> list[str]:
+    return [
+        f"{stem}/{stem}_middle.json",
+        f"{stem}/auto/{stem}_middle.json",
+        f"{stem}_middle.json",
+    ]
+
+
+def is_missing_object_error(exc: Exception) -> bool:
+    if isinstance(exc, FileNotFoundError):
+        return True
+    if S3Error and isinstance(exc, S3Error):
+        return exc.code in _MINIO_MISSING_ERROR_CODES
+    return False
+
+
+def _coerce_number(value: Any) -> int | float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int | float):
+        return value
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        if number.is_integer():
+            return int(number)
+        return number
+    return None
+
+
+def _flatten_numbers(value: Any) -> list[int | float]:
+    if isinstance(value, list | tuple):
+        numbers: list[int | float] = []
+        for item in value:
+            numbers.extend(_flatten_numbers(item))
+        return numbers
+    number = _coerce_number(value)
+    return [number] if number is not None else []
+
+
+def _normalize_bbox(value: Any) -> list[int | float] | None:
+    numbers = _flatten_numbers(value)
+    if len(numbers) == 4:
+        return numbers
+    if len(numbers) >= 8 and len(numbers) % 2 == 0:
+        xs = numbers[0::2]
+        ys = numbers[1::2]
+        return [min(xs), min(ys), max(xs), max(ys)]
+    return None
+
+
+def _extract_bbox(item: dict[str, Any]) -> list[int | float] | None:
+    for key in ("bbox", "layout_bbox", "line_bbox", "span_bbox", "poly"):
+        bbox = _normalize_bbox(item.get(key))
+        if bbox:
+            return bbox
+    return None
+
+
+def _clean_source_text(value: Any) -> str:
+    text = _TAG_PATTERN.sub(" ", str(value))
+    return _SPACE_PATTERN.sub(" ", text).strip()
+
+
+def _join_source_text(parts: list[str]) -> str:
+    seen = set()
+    unique_parts = []
+    for part in parts:
+        if part and part not in seen:
+            seen.add(part)
+            unique_parts.append(part)
+    return " ".join(unique_parts).strip()
+
+
+def source_text_signature(text: str) -> str:
+    return _NON_WORD_PATTERN.sub("", text).lower()
+
+
+class _PageBlocks:
+    """单页已收集的块。
+
+    按 (type, bbox) 分组并缓存每块的文本签名，合并重复块时只比较同组的块，
+    整页的收集是线性的，而不是每个新块都扫描整页并重新计算签名。
+    """
+
+    def __init__(self, page_number: int):
+        self.page_number = page_number
+        self.blocks: list[dict[str, Any]] = []
+        self._seen: set[tuple] = set()
+        # (type, bbox) -> 按加入顺序排列的 [签名, 块]
+        self._groups: dict[tuple, list[list]] = {}
+
+    def add(self, bbox: list[int | float], block_type: str, text: str) -> None:
+        group_key = (block_type, tuple(bbox))
+        if self._merge_duplicate(group_key, text):
+            return
+        key = (tuple(bbox), text, block_type)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        block = {
+            "id": f"p{self.page_number}-b{len(self.blocks) + 1}",
+            "type": block_type,
+            "text": text,
+            "bbox": bbox,
+        }
+        self.blocks.append(block)
+        self._groups.setdefault(group_key, []).append([source_text_signature(text), block])
+
+    def _merge_duplicate(self, group_key: tuple, text: str) -> bool:
+        """同位置同类型的块文本互相包含时视为重复，保留较长的文本。"""
+        group = self._groups.get(group_key)
+        if not group:
+            return False
+        text_signature = source_text_signature(text)
+        if not text_signature:
+            return False
+        for entry in group:
+            existing_signature = entry[0]
+            if not existing_signature:
+                continue
+            if text_signature not in existing_signature and existing_signature not in text_signature:
+                continue
+            if len(text_signature) > len(existing_signature):
+                entry[0] = text_signature
+                entry[1]["text"] = text
+            return True
+        return False
+
+
+def _extract_text(value: Any) -> str:
+    if isinstance(value, str):
+        return _clean_source_text(value)
+    if isinstance(value, list):
+        return _join_source_text([_extract_text(item) for item in value])
+    if not isinstance(value, dict):
+        return ""
+
+    parts = []
+    for key in ("text", "content"):
+        item = value.get(key)
+        if isinstance(item, str):
+            parts.append(_clean_source_text(item))
+        elif isinstance(item, dict | list):
+            parts.append(_extract_text(item))
+    if parts:
+        return _join_source_text(parts)
+
+    for key in ("spans", "lines", "blocks"):
+        item = value.get(key)
+        if isinstance(item, dict | list):
+            parts.append(_extract_text(item))
+    return _join_source_text(parts)
+
+
+def _extract_block_type(item: dict[str, Any]) -> str:
+    for key in ("type", "block_type", "category_type", "sub_type"):
+        value = item.get(key)
+        if value:
+            return str(value)
+    return "block"
+
+
+def _page_index(page_info: dict[str, Any], fallback_index: int) -> int:
+    page_idx = _coerce_number(page_info.get("page_idx"))
+    return int(page_idx) if page_idx is not None else fallback_index
+
+
+def _page_dimensions(page_info: dict[str, Any]) -> tuple[int | float | None, int | float | None]:
+    size = page_info.get("page_size") or page_info.get("size")
+    if isinstance(size, dict):
+        return _coerce_number(size.get("width")), _coerce_number(size.get("height"))
+    numbers = _flatten_numbers(size)
+    if len(numbers) >= 2:
+        return numbers[0], numbers[1]
+
+    width = (
+        _coerce_number(page_info.get("width"))
+        or _coerce_number(page_info.get("page_width"))
+        or _coerce_number(page_info.get("w"))
+    )
+    height = (
+        _coerce_number(page_info.get("height"))
+        or _coerce_number(page_info.get("page_height"))
+        or _coerce_number(page_info.get("h"))
+    )
+    return width, height
+
+
+def _collect_source_blocks(value: Any, page: _PageBlocks) -> None:
+    if isinstance(value, list):
+        for item in value:
+            _collect_source_blocks(item, page)
+        return
+    if not isinstance(value, dict):
+        return
+
+    bbox = _extract_bbox(value)
+    text = _extract_text(value)
+    block_type = _extract_block_type(value)
+    if bbox and text:
+        page.add(bbox, block_type, text[:1200])
+        return
+
+    for item in value.values():
+        if isinstance(item, dict | list):
+            _collect_source_blocks(item, page)
+
+
+def normalize_source_map(middle_json: dict[str, Any]) -> dict[str, list[dict[str, Any]]]:
+    pdf_info = middle_json.get("pdf_info")
+    if not isinstance(pdf_info, list):
+        return {"pages": []}
+    return {"pages": list(normalize_source_pages(pdf_info))}
+
+
+def normalize_source_pages(pdf_info: Iterable[Any]) -> Iterator[dict[str, Any]]:
+    """逐页归一化 pdf_info，可以直接消费流式解析出的页。"""
+    for index, page_info in enumerate(pdf_info):
+        if not isinstance(page_info, dict):
+            continue
+        page_idx = _page_index(page_info, index)
+        page_number = page_idx + 1
+        width, height = _page_dimensions(page_info)
+        page_blocks = _PageBlocks(page_number)
+        _collect_source_blocks(page_info, page_blocks)
+        yield {
+            "page": page_number,
+            "page_idx": page_idx,
+            "width": width,
+            "height": height,
+            "blocks": page_blocks.blocks,
+        }
+
+
+def encode_source_map(source_map: dict[str, Any]) -> tuple[bytes, list[list[int]]]:
+    return encode_source_pages(source_map.get("pages") or [])
+
+
+def encode_source_pages(pages: Iterable[dict[str, Any]]) -> tuple[bytes, list[list[int]]]:
+    """逐页编码成紧凑 JSON，同时返回每页的 [页码, 起始字节, 结束字节, bbox 数] 索引。"""
+    content = bytearray(b'{"pages":[')
+    index: list[list[int]] = []
+    for position, page in enumerate(pages):
+        if position:
+            content += b","
+        start = len(content)
+        content += json.dumps(page, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        index.append([page["page"], start, len(content), len(page.get("blocks") or [])])
+    content += b"]}"
+    return bytes(content), index
+
+
+def paged_source_map(index: list[list[int]], first: int, last: int, read_range) -> bytes:
+    """拼出 first..last 页的响应，read_range(start, end) 返回产物中对应的字节。
+
+    索引中相邻的页在产物里也相邻，连续命中的页合并成一次读取。
+    """
+    runs: list[list[list[int]]] = []
+    previous = None
+    for position, entry in enumerate(index):
+        if not first <= entry[0] <= last:
+            continue
+        if previous is not None and position == previous + 1:
+            runs[-1].append(entry)
+        else:
+            runs.append([entry])
+        previous = position
+    parts = [read_range(run[0][1], run[-1][2]) for run in runs]
+    summary = json.dumps(
+        {"page_count": len(index), "block_count": sum(entry[3] for entry in index)},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return b'{"pages":[' + b",".join(parts) + b"]," + summary[1:]
+
+
+@dataclass
+class SourceMapArtifact:
+    content: bytes
+    etag: str
+    index: list[list[int]]
+
+    def select(self, first: int, last: int) -> bytes:
+        return paged_source_map(self.index, first, last, lambda start, end: self.content[start:end])
+
+
+class SourceMapService:
+    """维护预计算的 {stem}_source_map.json。
+
+    产物的对象元数据记录生成时 middle.json 的路径和 ETag，middle.json 变化后才重新归一化；
+    元数据中的内容摘要同时作为接口的 ETag，条件请求命中时不需要下载产物。
+    """
+
+    def __init__(self, minio: Any | None = None):
+        self.minio = minio or minio_client
+
+    def fresh_etag(self, bucket: str, stem: str) -> str | None:
+        """产物存在且与当前 middle.json 一致时返回其 ETag，否则返回 None。"""
+        stat = self._stat(bucket, source_map_path(stem))
+        if stat is None:
+            return None
+        metadata = _object_metadata(stat)
+        digest = metadata.get(_META_DIGEST)
+        middle_path = metadata.get(_META_MIDDLE_PATH)
+        if metadata.get(_META_VERSION) != SOURCE_MAP_VERSION or not digest or not middle_path:
+            return None
+        middle_stat = self._stat(bucket, middle_path)
+        middle_etag = _etag_of(middle_stat) if middle_stat is not None else None
+        if not middle_etag or middle_etag != metadata.get(_META_MIDDLE_ETAG):
+            return None
+        return digest
+
+    def read(self, bucket: str, stem: str) -> bytes:
+        return self._read_object(bucket, source_map_path(stem))
+
+    def read_pages(self, bucket: str, stem: str, digest: str, first: int, last: int) -> bytes | None:
+        """按页索引只读取 first..last 页；索引缺失或与产物不一致时返回 None。"""
+        try:
+            index = json.loads(self._read_object(bucket, source_map_index_path(stem)))
+        except Exception as exc:
+            if is_missing_object_error(exc):
+                return None
+            raise
+        if index.get("digest") != digest:
+            return None
+        path = source_map_path(stem)
+        return paged_source_map(
+            index["pages"],
+            first,
+            last,
+            lambda start, end: self._read_object(bucket, path, offset=start, length=end - start),
+        )
+
+    def rebuild(self, bucket: str, stem: str) -> SourceMapArtifact | None:
+        """从 middle.json 重新生成并写回产物，没有 middle.json 时返回 None。写回失败只记录日志。"""
+        for path in middle_json_candidates(stem):
+            # 先取 ETag 再下载，middle.json 在两者之间被覆盖时产物会在下次请求时重建，而不是缓存旧内容
+            stat = self._stat(bucket, path)
+            if stat is None:
+                continue
+            middle_etag = _etag_of(stat)
+            try:
+                response = self.minio.get_object(bucket, path)
+            except Exception as exc:
+                if is_missing_object_error(exc):
+                    continue
+                raise
+            break
+        else:
+            return None
+
+        # middle.json 可能有上百 MB，按块流式读取并逐页归一化，峰值内存随单页大小而不是整个文档增长
+        try:
+            pages = iter_json_array(_iter_chunks(response), "pdf_info")
+            content, index = encode_source_pages(normalize_source_pages(pages))
+        finally:
+            _release(response)
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        if middle_etag:
+            try:
+                self._write(bucket, stem, content, digest, index, path, middle_etag)
+            except Exception as exc:
+                logger.warning(f"Failed to store source map for {stem}: {exc}")
+        return SourceMapArtifact(content=content, etag=digest, index=index)
+
+    def _write(
+        self,
+        bucket: str,
+        stem: str,
+        content: bytes,
+        digest: str,
+        index: list[list[int]],
+        middle_path: str,
+        middle_etag: str,
+    ) -> None:
+        # 先写索引：产物元数据中的摘要更新后，索引必须已经对应新内容
+        index_content = json.dumps({"digest": digest, "pages": index}, separators=(",", ":")).encode("utf-8")
+        self.minio.put_object(
+            bucket,
+            source_map_index_path(stem),
+            io.BytesIO(index_content),
+            len(index_content),
+            content_type="application/json",
+        )
+        self.minio.put_object(
+            bucket,
+            source_map_path(stem),
+            io.BytesIO(content),
+            len(content),
+            content_type="application/json",
+            metadata={
+                _META_VERSION: SOURCE_MAP_VERSION,
+                _META_DIGEST: digest,
+                _META_MIDDLE_PATH: middle_path,
+                _META_MIDDLE_ETAG: middle_etag,
+            },
+        )
+
+    def _stat(self, bucket: str, path: str) -> Any | None:
+        """对象不存在时返回 None。"""
+        try:
+            return self.minio.stat_object(bucket, path)
+        except Exception as exc:
+            if is_missing_object_error(exc):
+                return None
+            raise
+
+    def _read_object(self, bucket: str, path: str, **kwargs) -> bytes:
+        response = self.minio.get_object(bucket, path, **kwargs)
+        try:
+            return response.read()
+        finally:
+            _release(response)
+
+
+def _iter_chunks(response: Any) -> Iterator[bytes]:
+    while True:
+        chunk = response.read(MIDDLE_JSON_READ_CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _release(response: Any) -> None:
+    close = getattr(response, "close", None)
+    if close:
+        close()
+    release_conn = getattr(response, "release_conn", None)
+    if release_conn:
+        release_conn()
+
+
+def _etag_of(stat: Any) -> str | None:
+    etag = getattr(stat, "etag", None)
+    return str(etag).strip('"') if etag else None
+
+
+def _object_metadata(stat: Any) -> dict[str, str]:
+    """MinIO 返回的用户元数据带 x-amz-meta- 前缀且大小写不定，统一成小写键。"""
+    metadata = {}
+    for key, value in (getattr(stat, "metadata", None) or {}).items():
+        key = key.lower()
+        if key.startswith("x-amz-meta-"):
+            key = key[len("x-amz-meta-"):]
+        metadata[key] = value
+    return metadata
@@ -1,32 +1,138 @@
-from datetime import datetime, date
+import os
+from datetime import datetime, date, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from ..models.enums import FileStatus
 from ..models.file import File
+from ..models.stats import UserDailyStats, UserStats, parse_duration_seconds
+
+# 首页展示的按天统计天数
+STATS_DAILY_WINDOW_DAYS = int(os.getenv("STATS_DAILY_WINDOW_DAYS", "7"))
+# reconcile 重建按天统计的天数
+STATS_RECONCILE_DAYS = int(os.getenv("STATS_RECONCILE_DAYS", "30"))
+
 
 class StatsService:
     def __init__(self, db: Session):
         self.db = db
 
     def get_stats(self, user_id: str) -> dict:
-        """获取统计数据"""
-        # 计算总文件数
-        user_files = self.db.query(File).filter(File.user_id == user_id)
-        total_files = user_files.count()
+        """获取统计数据：读取物化的用户计数和最近几天的按天计数，不扫描文件表"""
+        stats = self.db.get(UserStats, user_id)
+        if stats is None:
+            # 计数表上线前已有的数据，首次访问时补建
+            try:
+                stats = self.reconcile_user(user_id)
+            except IntegrityError:
+                # 并发请求已经补建了计数行
+                self.db.rollback()
+                stats = self.db.get(UserStats, user_id)
 
-        # 计算今日上传数
         today = date.today()
-        today_uploads = user_files.filter(
-            File.upload_time >= datetime.combine(today, datetime.min.time())
-        ).count()
-
-        # 计算已用空间（MB）
-        used_space = user_files.with_entities(
-            func.sum(File.size)
-        ).scalar() or 0
-        used_space = round(used_space / (1024 * 1024), 2)  # 转换为MB
+        first_day = today - timedelta(days=STATS_DAILY_WINDOW_DAYS - 1)
+        rows = {
+            row.day: row
+            for row in self.db.query(UserDailyStats).filter(
+                UserDailyStats.user_id == user_id,
+                UserDailyStats.day >= first_day,
+            )
+        }
+        daily = []
+        for offset in range(STATS_DAILY_WINDOW_DAYS):
+            day = first_day + timedelta(days=offset)
+            row = rows.get(day)
+            daily.append({
+                'date': day.isoformat(),
+                'uploads': row.uploads if row else 0,
+                'parsed': row.parsed if row else 0,
+                'failed': row.failed if row else 0,
+                'pagesParsed': row.pages_parsed if row else 0,
+                'parseSeconds': round(row.parse_seconds, 1) if row else 0,
+            })
 
+        finished = stats.parsed_count + stats.failed_count
         return {
-            'totalFiles': total_files,
-            'todayUploads': today_uploads,
-            'usedSpace': used_space
-        } 
+            'totalFiles': stats.file_count,
+            'todayUploads': daily[-1]['uploads'],
+            'usedSpace': round(stats.total_bytes / (1024 * 1024), 2),  # 转换为MB
+            'parsedFiles': stats.parsed_count,
+            'failedFiles': stats.failed_count,
+            'failureRate': round(stats.failed_count / finished, 4) if finished else 0,
+            'pagesParsed': stats.pages_parsed,
+            'parseSeconds': round(stats.parse_seconds, 1),
+            'daily': daily,
+        }
+
+    def reconcile_user(self, user_id: str, days: int = STATS_RECONCILE_DAYS) -> UserStats:
+        """按文件表重算该用户的计数，校正批量 SQL 更新或删除造成的偏差。
+
+        用户计数全部重算；按天计数只重建最近 days 天，且只能统计仍存在的文件。
+        """
+        totals = self.db.query(
+            func.count(File.id),
+            func.sum(File.size),
+            func.sum(case((File.status == FileStatus.PARSED, 1), else_=0)),
+            func.sum(case((File.status == FileStatus.PARSE_FAILED, 1), else_=0)),
+        ).filter(File.user_id == user_id).one()
+        parsed = self.db.query(File.page_count, File.start_at, File.finish_at).filter(
+            File.user_id == user_id,
+            File.status == FileStatus.PARSED,
+        ).all()
+
+        stats = self.db.get(UserStats, user_id) or UserStats(user_id=user_id)
+        stats.file_count = totals[0] or 0
+        stats.total_bytes = totals[1] or 0
+        stats.parsed_count = totals[2] or 0
+        stats.failed_count = totals[3] or 0
+        stats.pages_parsed = sum(page_count or 0 for page_count, _, _ in parsed)
+        stats.parse_seconds = sum(parse_duration_seconds(start_at, finish_at) for _, start_at, finish_at in parsed)
+        stats.reconciled_at = datetime.now()
+        self.db.add(stats)
+
+        first_day = date.today() - timedelta(days=max(1, days) - 1)
+        since = datetime.combine(first_day, datetime.min.time())
+        daily: dict[date, UserDailyStats] = {}
+
+        def day_row(day: date) -> UserDailyStats:
+            if day not in daily:
+                daily[day] = UserDailyStats(
+                    user_id=user_id, day=day, uploads=0, upload_bytes=0,
+                    parsed=0, failed=0, pages_parsed=0, parse_seconds=0,
+                )
+            return daily[day]
+
+        recent = self.db.query(
+            File.size, File.status, File.upload_time, File.page_count, File.start_at, File.finish_at, File.updated_at
+        ).filter(
+            File.user_id == user_id,
+            (File.upload_time >= since) | (File.finish_at >= since) | (File.updated_at >= since),
+        )
+        for size, status, upload_time, page_count, start_at, finish_at, updated_at in recent:
+            if upload_time and upload_time >= since:
+                row = day_row(upload_time.date())
+                row.uploads += 1
+                row.upload_bytes += size or 0
+            if status == FileStatus.PARSED and finish_at and finish_at.replace(tzinfo=None) >= since:
+                row = day_row(finish_at.date())
+                row.parsed += 1
+                row.pages_parsed += page_count or 0
+                row.parse_seconds += parse_duration_seconds(start_at, finish_at)
+            elif status == FileStatus.PARSE_FAILED and updated_at and updated_at.replace(tzinfo=None) >= since:
+                day_row(updated_at.date()).failed += 1
+
+        self.db.query(UserDailyStats).filter(
+            UserDailyStats.user_id == user_id,
+            UserDailyStats.day >= first_day,
+        ).delete(synchronize_session=False)
+        self.db.add_all(daily.values())
+        self.db.commit()
+        return stats
+
+    def reconcile_all(self, days: int = STATS_RECONCILE_DAYS) -> int:
+        """重算所有有文件或已有计数的用户，返回处理的用户数"""
+        user_ids = {user_id for (user_id,) in self.db.query(File.user_id).distinct()}
+        user_ids |= {user_id for (user_id,) in self.db.query(UserStats.user_id)}
+        for user_id in sorted(user_ids):
+            self.reconcile_user(user_id, days)
+        return len(user_ids)
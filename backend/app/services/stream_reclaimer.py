@@ -0,0 +1,152 @@
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Iterable
+
+from loguru import logger
+
+from app.database import get_db_context
+from app.models.enums import FileStatus
+from app.models.file import File as FileModel
+from app.services.parse_scheduler import StreamMessage, decode_task
+from app.services.parser import CONSUMER_GROUP, DEAD_LETTER_STREAM, PARSE_LANE_STREAMS, ParserService
+
+DEAD_LETTER_REASON = "解析任务多次中断，已移入死信队列"
+
+
+def _seconds_since(moment: datetime | None) -> float | None:
+    if moment is None:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return (datetime.now() - moment).total_seconds()
+
+
+class StaleMessageReclaimer:
+    """接管已失联 worker 留在消费者组 PEL 里的解析任务。
+
+    worker 定期用 XCLAIM JUSTID 刷新自己仍在处理的消息，因此空闲超过 idle_seconds 且文件心跳
+    （last_heartbeat_at）同样过期的消息可以认为持有者已经退出。投递次数达到 max_deliveries 的
+    消息不再重试，写入死信 Stream 并把文件标记为解析失败。
+    """
+
+    def __init__(
+        self,
+        consumer: str,
+        idle_seconds: float | None = None,
+        max_deliveries: int | None = None,
+        interval_seconds: float | None = None,
+        batch_size: int = 100,
+        clock: Callable[[], float] = time.monotonic,
+        session_context=None,
+    ):
+        self.consumer = consumer
+        self.idle_seconds = idle_seconds or float(os.getenv("WORKER_RECLAIM_IDLE_SECONDS", "300"))
+        self.max_deliveries = max_deliveries or int(os.getenv("WORKER_MAX_DELIVERIES", "3"))
+        self.interval_seconds = interval_seconds or float(os.getenv("WORKER_RECLAIM_INTERVAL_SECONDS", "30"))
+        self.batch_size = batch_size
+        self.clock = clock
+        self.session_context = session_context or get_db_context
+        self._last_run_at = clock()
+
+    @property
+    def idle_ms(self) -> int:
+        return int(self.idle_seconds * 1000)
+
+    def maybe_reclaim(self, redis, owned: Iterable[StreamMessage], limit: int) -> list[tuple[StreamMessage, dict]]:
+        """按 interval_seconds 节奏刷新自己持有的消息并接管失联消息，返回接管到的消息。"""
+        now = self.clock()
+        if now - self._last_run_at < self.interval_seconds:
+            return []
+        self._last_run_at = now
+        owned_by_stream: dict[str, list] = {}
+        for ref in owned:
+            owned_by_stream.setdefault(ref.stream, []).append(ref.message_id)
+        for stream, message_ids in owned_by_stream.items():
+            redis.touch_messages(stream, CONSUMER_GROUP, self.consumer, message_ids)
+        if limit <= 0:
+            return []
+        return self.reclaim(redis, limit)
+
+    def reclaim(self, redis, limit: int) -> list[tuple[StreamMessage, dict]]:
+        claimed = []
+        for stream in PARSE_LANE_STREAMS.values():
+            if len(claimed) >= limit:
+                break
+            claimed.extend(self._reclaim_stream(redis, stream, limit - len(claimed)))
+        return claimed
+
+    def _reclaim_stream(self, redis, stream: str, limit: int) -> list[tuple[StreamMessage, dict]]:
+        claimed = []
+        for entry in redis.pending_entries(stream, CONSUMER_GROUP, self.idle_ms, count=self.batch_size):
+            if len(claimed) >= limit:
+                break
+            message_id = entry["message_id"]
+            message = redis.read_message(stream, message_id)
+            if message is None:
+                # 消息已被裁剪，只能确认掉
+                redis.ack_message(stream, CONSUMER_GROUP, message_id)
+                continue
+
+            task_data = decode_task(message)
+            decision = self._check_file(task_data.get("file_id"))
+            if decision == "alive":
+                continue
+            if decision == "finished":
+                # 持有者已写入结果但没来得及 ACK
+                ref = StreamMessage.of(stream, message_id, message)
+                redis.ack_message(stream, CONSUMER_GROUP, message_id, ref.user_id)
+                continue
+            if entry["times_delivered"] >= self.max_deliveries:
+                self._dead_letter(redis, stream, entry, message, task_data)
+                continue
+
+            messages = redis.claim_messages(stream, CONSUMER_GROUP, self.consumer, self.idle_ms, [message_id])
+            for claimed_id, claimed_message in messages:
+                logger.warning(
+                    f"Reclaimed task {claimed_id} on {stream} from {entry['consumer']} "
+                    f"(delivered {entry['times_delivered']} times)"
+                )
+                claimed.append((StreamMessage.of(stream, claimed_id, claimed_message), claimed_message))
+        return claimed
+
+    def _check_file(self, file_id) -> str:
+        if not file_id:
+            return "stale"
+        with self.session_context() as db:
+            file = db.query(FileModel).filter(FileModel.id == file_id).first()
+            if file is None or file.status in (FileStatus.PARSED, FileStatus.PARSE_FAILED):
+                return "finished"
+            idle = _seconds_since(file.last_heartbeat_at)
+            if idle is not None and idle < self.idle_seconds:
+                return "alive"
+        return "stale"
+
+    def _dead_letter(self, redis, stream: str, entry: dict, message: dict, task_data: dict) -> None:
+        message_id = entry["message_id"]
+        fields = {
+            b"data": message.get(b"data", b""),
+            b"stream": stream,
+            b"original_id": message_id,
+            b"consumer": entry["consumer"],
+            b"deliveries": str(entry["times_delivered"]),
+            b"reason": DEAD_LETTER_REASON,
+            b"dead_at": datetime.now().isoformat(),
+        }
+        redis.dead_letter(
+            stream,
+            CONSUMER_GROUP,
+            DEAD_LETTER_STREAM,
+            message_id,
+            fields,
+            user_id=StreamMessage.of(stream, message_id, message).user_id,
+        )
+        logger.error(f"Moved task {message_id} to {DEAD_LETTER_STREAM} after {entry['times_delivered']} deliveries")
+
+        file_id = task_data.get("file_id")
+        if not file_id:
+            return
+        with self.session_context() as db:
+            file = db.query(FileModel).filter(FileModel.id == file_id).first()
+            if file is not None:
+                ParserService(db).mark_parse_failed(file, DEAD_LETTER_REASON)
@@ -1,4 +1,6 @@
 from minio import Minio
+from minio.error import S3Error
+import hashlib
 import os
 from datetime import timedelta
 from urllib.parse import urlparse
@@ -33,6 +35,24 @@ def ensure_bucket():
         minio_client.make_bucket(MINIO_BUCKET)
 
 
+class HashingReader:
+    """包装上传流，在 put_object 读取数据的同时计算 SHA-256。"""
+
+    def __init__(self, file_obj):
+        self.file_obj = file_obj
+        self.sha256 = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.file_obj.read(size)
+        self.sha256.update(chunk)
+        self.bytes_read += len(chunk)
+        return chunk
+
+    def hexdigest(self) -> str:
+        return self.sha256.hexdigest()
+
+
 def upload_file(file_obj, filename, content_type=None):
     ensure_bucket()
     minio_path = filename
@@ -53,3 +73,59 @@ def get_presigned_url(bucket, minio_path, expires=3600):
 
 def get_file_url(minio_path, expires=3600):
     return get_presigned_url(MINIO_BUCKET, minio_path, expires=expires)
+
+
+def presigned_put_url(minio_path, expires=3600):
+    ensure_bucket()
+    return minio_client.presigned_put_object(MINIO_BUCKET, minio_path, expires=timedelta(seconds=expires))
+
+
+def stat_uploaded_object(minio_path):
+    """返回已上传对象的元数据，对象或存储桶不存在时返回 None。"""
+    try:
+        return minio_client.stat_object(MINIO_BUCKET, minio_path)
+    except S3Error as exc:
+        if exc.code in ("NoSuchKey", "NoSuchObject", "NoSuchBucket", "NotFound"):
+            return None
+        raise
+
+
+def remove_uploaded_object(minio_path):
+    minio_client.remove_object(MINIO_BUCKET, minio_path)
+
+
+# 分片上传：浏览器用预签名 URL 直接把分片 PUT 到 MinIO，API 只处理元数据。
+# minio-py 没有公开的 multipart 接口，这里调用其私有方法，requirements.txt 因此精确固定 minio 版本
+def create_multipart_upload(minio_path, content_type=None):
+    ensure_bucket()
+    headers = {"Content-Type": content_type or "application/octet-stream"}
+    return minio_client._create_multipart_upload(MINIO_BUCKET, minio_path, headers)
+
+
+def presigned_upload_part_url(minio_path, upload_id, part_number, expires=3600):
+    return minio_client.get_presigned_url(
+        "PUT",
+        MINIO_BUCKET,
+        minio_path,
+        expires=timedelta(seconds=expires),
+        extra_query_params={"uploadId": upload_id, "partNumber": str(part_number)},
+    )
+
+
+def list_uploaded_parts(minio_path, upload_id):
+    parts = []
+    marker = None
+    while True:
+        result = minio_client._list_parts(MINIO_BUCKET, minio_path, upload_id, part_number_marker=marker)
+        parts.extend(result.parts)
+        if not result.is_truncated:
+            return parts
+        marker = result.next_part_number_marker
+
+
+def complete_multipart_upload(minio_path, upload_id, parts):
+    return minio_client._complete_multipart_upload(MINIO_BUCKET, minio_path, upload_id, parts)
+
+
+def abort_multipart_upload(minio_path, upload_id):
+    minio_client._abort_multipart_upload(MINIO_BUCKET, minio_path, upload_id)
@@ -1,9 +1,49 @@
 import os
 import redis
+import redis.asyncio
 import json
 from loguru import logger
 from typing import Dict, Any, List, Tuple
 
+# 按用户限制进入解析 Stream 的任务数：未超过上限的任务直接写入 Stream，其余按顺序进入该用户的等待列表
+_ADMIT_TASKS_SCRIPT = """
+local admitted = tonumber(redis.call('HGET', KEYS[2], ARGV[1]) or '0')
+local limit = tonumber(ARGV[2])
+local waiting = redis.call('LLEN', KEYS[3])
+local added = 0
+for i = 3, #ARGV do
+    if waiting == 0 and admitted < limit then
+        redis.call('XADD', KEYS[1], '*', 'data', ARGV[i])
+        admitted = admitted + 1
+        added = added + 1
+    else
+        redis.call('RPUSH', KEYS[3], ARGV[i])
+        waiting = waiting + 1
+    end
+end
+redis.call('HSET', KEYS[2], ARGV[1], admitted)
+return added
+"""
+
+# 确认消息后把名额交给该用户等待列表中的下一条任务，没有等待的任务时归还名额；重复确认不会重复归还
+_ACK_AND_RELEASE_SCRIPT = """
+if redis.call('XACK', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+local data = redis.call('LPOP', KEYS[3])
+if data then
+    redis.call('XADD', KEYS[1], '*', 'data', data)
+elseif redis.call('HINCRBY', KEYS[2], ARGV[3], -1) <= 0 then
+    redis.call('HDEL', KEYS[2], ARGV[3])
+end
+return 1
+"""
+
+
+def _admission_keys(stream: str, user_id: str) -> list[str]:
+    return [stream, f"{stream}:admitted", f"{stream}:waiting:{user_id}"]
+
+
 class RedisClient:
     def __init__(self):
         REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
@@ -11,13 +51,16 @@ class RedisClient:
         REDIS_DB = int(os.getenv("REDIS_DB", 0))
         REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
 
+        self.connection_kwargs = {
+            "host": REDIS_HOST,
+            "port": REDIS_PORT,
+            "db": REDIS_DB,
+            "password": REDIS_PASSWORD,
+        }
         self.client = None
         try:
             self.client = redis.Redis(
-                host=REDIS_HOST,
-                port=REDIS_PORT,
-                db=REDIS_DB,
-                password=REDIS_PASSWORD,
+                **self.connection_kwargs,
                 decode_responses=False  # 保持原始字节格式
             )
             # 测试连接
@@ -67,9 +110,87 @@ class RedisClient:
                 return self.read_stream(stream, group, consumer, count, block)
             raise
 
-    def ack_message(self, stream: str, group: str, message_id: str):
-        """确认消息已处理"""
-        self.client.xack(stream, group, message_id)
+    def read_streams(self, streams: List[str], group: str, consumer: str, count: int = 1, block: int | None = 1000) -> List[Tuple[str, str, Dict]]:
+        """一次 XREADGROUP 读取多条 Stream 的新消息，count 对每条 Stream 分别生效"""
+        try:
+            response = self.client.xreadgroup(
+                groupname=group,
+                consumername=consumer,
+                streams={stream: '>' for stream in streams},
+                count=count,
+                block=block
+            )
+        except redis.exceptions.ResponseError as e:
+            if "NOGROUP" in str(e):
+                for stream in streams:
+                    self.create_consumer_group(stream, group)
+                return self.read_streams(streams, group, consumer, count, block)
+            raise
+
+        messages = []
+        for stream_name, stream_messages in response or []:
+            if isinstance(stream_name, bytes):
+                stream_name = stream_name.decode("utf-8")
+            for message_id, message_data in stream_messages:
+                messages.append((stream_name, message_id, message_data))
+        return messages
+
+    def ack_message(self, stream: str, group: str, message_id: str, user_id: str | None = None):
+        """确认消息已处理。传入 user_id 时同时释放该用户的 Stream 名额（见 admit_tasks）"""
+        if user_id is None:
+            self.client.xack(stream, group, message_id)
+            return
+        self.client.register_script(_ACK_AND_RELEASE_SCRIPT)(
+            keys=_admission_keys(stream, user_id),
+            args=[group, message_id, user_id],
+        )
+
+    def pending_entries(self, stream: str, group: str, min_idle_ms: int, count: int = 100) -> List[Dict[str, Any]]:
+        """列出空闲超过 min_idle_ms 的待确认消息（XPENDING），包含 consumer 和投递次数"""
+        try:
+            return self.client.xpending_range(stream, group, min="-", max="+", count=count, idle=min_idle_ms)
+        except redis.exceptions.ResponseError as e:
+            if "NOGROUP" in str(e):
+                return []
+            raise
+
+    def read_message(self, stream: str, message_id) -> Dict | None:
+        """按 ID 读取单条消息，消息已被裁剪时返回 None"""
+        response = self.client.xrange(stream, min=message_id, max=message_id, count=1)
+        return response[0][1] if response else None
+
+    def claim_messages(self, stream: str, group: str, consumer: str, min_idle_ms: int, message_ids: list) -> List[Tuple[str, Dict]]:
+        """把空闲超过 min_idle_ms 的消息转移给 consumer（XCLAIM），投递次数加一"""
+        if not message_ids:
+            return []
+        return [
+            (message_id, message_data)
+            for message_id, message_data in self.client.xclaim(stream, group, consumer, min_idle_ms, message_ids)
+            if message_data
+        ]
+
+    def touch_messages(self, stream: str, group: str, consumer: str, message_ids: list):
+        """重置自己仍在处理的消息的空闲时间（XCLAIM JUSTID 不增加投递次数），避免被其他 worker 接管"""
+        if message_ids:
+            self.client.xclaim(stream, group, consumer, 0, message_ids, justid=True)
+
+    def dead_letter(
+        self,
+        stream: str,
+        group: str,
+        dead_letter_stream: str,
+        message_id,
+        fields: dict,
+        maxlen: int = 10000,
+        user_id: str | None = None,
+    ):
+        """把消息写入死信 Stream 并确认原消息"""
+        self.client.xadd(dead_letter_stream, fields, maxlen=maxlen, approximate=True)
+        self.ack_message(stream, group, message_id, user_id)
+
+    def read_dead_letters(self, dead_letter_stream: str, count: int = 100, before: str | None = None) -> List[Tuple[str, Dict]]:
+        """按时间倒序读取死信，传入 before 时只读取该 ID 之前（不含）的条目"""
+        return self.client.xrevrange(dead_letter_stream, max=f"({before}" if before else "+", count=count)
 
     def publish_task(self, stream: str, task_data: dict):
         """发布任务到 Stream"""
@@ -77,6 +198,36 @@ class RedisClient:
             'data': json.dumps(task_data)
         })
 
+    def publish_tasks(self, stream: str, tasks: list[dict]):
+        """用一次 pipeline 往 Stream 批量写入任务"""
+        pipeline = self.client.pipeline(transaction=False)
+        for task_data in tasks:
+            pipeline.xadd(stream, {'data': json.dumps(task_data)})
+        pipeline.execute()
+
+    def admit_tasks(self, stream: str, user_id: str, tasks: list[dict], limit: int) -> int:
+        """写入同一用户的一批任务，该用户在 Stream 中未确认的任务最多 limit 条，其余进入等待列表。
+
+        等待的任务在该用户的消息被确认（ack_message 传入 user_id）时依次补入 Stream，
+        所以一个用户积压再多，Stream 里也只有 limit 条，其他用户的任务不用排在整批积压之后。
+        limit 不大于 0 时不限制，直接写入 Stream。返回直接写入 Stream 的任务数。
+        """
+        if limit <= 0:
+            self.publish_tasks(stream, tasks)
+            return len(tasks)
+        return self.client.register_script(_ADMIT_TASKS_SCRIPT)(
+            keys=_admission_keys(stream, user_id),
+            args=[user_id, limit, *(json.dumps(task_data) for task_data in tasks)],
+        )
+
+    def publish_message(self, channel: str, data: dict):
+        """发布消息到 Pub/Sub 频道"""
+        self.client.publish(channel, json.dumps(data, ensure_ascii=False))
+
+    def create_async_client(self) -> redis.asyncio.Redis:
+        """创建使用相同连接配置的 asyncio 客户端，供 SSE 等长连接订阅使用"""
+        return redis.asyncio.Redis(**self.connection_kwargs, decode_responses=False)
+
     def subscribe_channel(self, channel: str):
         """
         订阅 Redis 频道
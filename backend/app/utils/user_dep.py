@@ -6,36 +6,69 @@ from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.user import User
-from app.services.auth import AUTH_COOKIE_NAME, decode_session_token
+from app.services.auth import AUTH_COOKIE_NAME, decode_session_token, session_cache
 
 
 def _legacy_header_enabled() -> bool:
     return os.getenv("AUTH_ALLOW_USER_HEADER", "false").lower() == "true"
 
 
-async def get_current_user(
-    session_token: Optional[str] = Cookie(None, alias=AUTH_COOKIE_NAME),
-    authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db),
-) -> User:
+def _request_token(session_token: Optional[str], authorization: Optional[str]) -> str:
     token = session_token
     if not token and authorization and authorization.startswith("Bearer "):
         token = authorization.removeprefix("Bearer ").strip()
     if not token:
         raise HTTPException(status_code=401, detail="未登录，请先登录")
+    return token
 
+
+def _verified_user_id(token: str) -> tuple[dict, str]:
     payload = decode_session_token(token)
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="登录状态无效")
+    return payload, user_id
+
+
+def _authenticate(token: str, db: Session) -> str:
+    """校验令牌并返回用户 ID，结果进入会话缓存，命中时不再验签和查库。"""
+    payload = session_cache.get(token)
+    if payload is not None:
+        return payload["sub"]
+
+    payload, user_id = _verified_user_id(token)
+    if not db.query(User.id).filter(User.id == int(user_id)).first():
+        raise HTTPException(status_code=401, detail="登录状态无效")
+    session_cache.put(token, payload)
+    return user_id
+
+
+# 依赖声明为同步函数，FastAPI 会在线程池中执行，数据库查询不阻塞事件循环
+def get_current_user(
+    session_token: Optional[str] = Cookie(None, alias=AUTH_COOKIE_NAME),
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+) -> User:
+    """返回当前用户。未命中缓存时只查询一次用户记录并连同快照一起缓存，命中时不查库。"""
+    token = _request_token(session_token, authorization)
+    cached = session_cache.get_user(token)
+    if cached is not None:
+        return db.merge(cached, load=False)
 
+    payload = session_cache.get(token)
+    if payload is None:
+        payload, user_id = _verified_user_id(token)
+    else:
+        user_id = payload["sub"]
     user = db.query(User).filter(User.id == int(user_id)).first()
     if not user:
+        session_cache.invalidate_token(token)
         raise HTTPException(status_code=401, detail="登录状态无效")
+    session_cache.put(token, payload, user)
     return user
 
 
-async def get_user_id(
+def get_user_id(
     x_user_id: Optional[str] = Header(None),
     session_token: Optional[str] = Cookie(None, alias=AUTH_COOKIE_NAME),
     authorization: Optional[str] = Header(None),
@@ -44,9 +77,4 @@ async def get_user_id(
     if x_user_id and _legacy_header_enabled():
         return x_user_id
 
-    current_user = await get_current_user(
-        session_token=session_token,
-        authorization=authorization,
-        db=db,
-    )
-    return str(current_user.id)
+    return _authenticate(_request_token(session_token, authorization), db)
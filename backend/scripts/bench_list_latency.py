@@ -0,0 +1,129 @@
+"""测量上传进行时 GET /api/files 的延迟分布。
+
+默认在进程内启动应用：使用临时 SQLite 数据库，MinIO 写入替换为阻塞 sleep（模拟慢速大文件上传），
+解析任务不入队。也可以用 --base-url 对已部署的服务压测，此时上传真实文件。
+
+    python scripts/bench_list_latency.py
+    python scripts/bench_list_latency.py --uploads 4 --upload-seconds 3
+    python scripts/bench_list_latency.py --base-url http://localhost:8000 --file big.pdf \\
+        --email bench@example.com --password secret123
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def build_local_app(upload_seconds: float):
+    # 数据库路径需在导入应用前设置
+    db_path = Path(tempfile.mkdtemp()) / "bench.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from app.database import init_db
+    from app.services.parser import ParserService
+    from app.api import upload as upload_api
+    from main import app
+
+    init_db()
+
+    def slow_upload(reader, filename, content_type=None):
+        while reader.read(1024 * 1024):
+            pass
+        time.sleep(upload_seconds)
+
+    upload_api.upload_file = slow_upload
+    ParserService.queue_parse_files = lambda self, *args, **kwargs: self.db.commit()
+    return app
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> None:
+    response = await client.post("/api/auth/register", json={"email": email, "password": password})
+    if response.status_code != 200:
+        response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+
+
+async def run(args) -> None:
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+        payload = Path(args.file).read_bytes() if args.file else os.urandom(args.upload_mb * 1024 * 1024)
+    else:
+        transport = httpx.ASGITransport(app=build_local_app(args.upload_seconds))
+        base_url = "http://bench"
+        payload = os.urandom(args.upload_mb * 1024 * 1024)
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=600) as client:
+        await login(client, args.email, args.password)
+
+        async def sample(latencies: list[float], stop: asyncio.Event) -> None:
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = await client.get("/api/files", params={"page": 1, "page_size": 20})
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(args.interval)
+
+        async def measure(label: str, uploads: int) -> None:
+            latencies: list[float] = []
+            stop = asyncio.Event()
+            samplers = [asyncio.create_task(sample(latencies, stop)) for _ in range(args.readers)]
+            started = time.perf_counter()
+            if uploads:
+                responses = await asyncio.gather(
+                    *(
+                        client.post("/api/upload", files={"files": (f"bench-{index}.pdf", payload, "application/pdf")})
+                        for index in range(uploads)
+                    )
+                )
+                # 上传失败时测到的是错误路径的延迟，结果没有意义
+                for response in responses:
+                    response.raise_for_status()
+                    if response.json().get("failed"):
+                        raise RuntimeError(f"上传失败: {response.json()['files']}")
+            else:
+                await asyncio.sleep(args.upload_seconds)
+            stop.set()
+            await asyncio.gather(*samplers)
+            print(
+                f"{label:<16} {len(latencies):>5} reqs  "
+                f"p50 {statistics.median(latencies):8.1f} ms  "
+                f"p95 {percentile(latencies, 95):8.1f} ms  "
+                f"p99 {percentile(latencies, 99):8.1f} ms  "
+                f"({time.perf_counter() - started:.1f}s)"
+            )
+
+        await measure("idle", 0)
+        await measure(f"{args.uploads} uploads", args.uploads)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="已部署服务的地址，不填则在进程内启动应用")
+    parser.add_argument("--file", help="--base-url 模式下上传的文件")
+    parser.add_argument("--email", default="bench@example.com")
+    parser.add_argument("--password", default="bench-secret")
+    parser.add_argument("--uploads", type=int, default=2, help="并发上传数")
+    parser.add_argument("--upload-mb", type=int, default=8, help="未指定 --file 时上传的随机数据大小")
+    parser.add_argument("--upload-seconds", type=float, default=2.0, help="进程内模式下每次 MinIO 写入的耗时")
+    parser.add_argument("--readers", type=int, default=4, help="并发请求 /api/files 的协程数")
+    parser.add_argument("--interval", type=float, default=0.01)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""测量 middle.json 归一化成 source map 的耗时。
+
+生成合成的 middle.json：每页若干个 span 级块，其中一部分与同位置的块重复（模拟 MinerU 在 para_blocks
+和 lines/spans 中重复输出同一段文字），然后多次调用 normalize_source_map 取中位数。
+
+    python scripts/bench_source_map.py
+    python scripts/bench_source_map.py --pages 20 --spans 2000 --duplicate-ratio 0.3
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.source_map import normalize_source_map  # noqa: E402
+
+WORDS = "the buyer shall pay contract price within thirty days after delivery of goods 付款 期限 违约 责任".split()
+
+
+def synthetic_page(page_idx: int, spans: int, duplicate_ratio: float, rng: random.Random) -> dict:
+    blocks = []
+    for index in range(spans):
+        # 同一行里的 span 共享 y，x 按序排开，尽量让 bbox 互不相同
+        bbox = [10 + (index % 40) * 14, 10 + (index // 40) * 16, 22 + (index % 40) * 14, 24 + (index // 40) * 16]
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+        blocks.append({"type": "text", "bbox": bbox, "lines": [{"spans": [{"content": text}]}]})
+        if rng.random() < duplicate_ratio:
+            # 同一 bbox 上截断的重复文本，归一化时应合并成更长的一条
+            blocks.append({"type": "text", "bbox": list(bbox), "text": text[: max(1, len(text) // 2)]})
+    rng.shuffle(blocks)
+    return {"page_idx": page_idx, "page_size": [612, 792], "para_blocks": blocks}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--spans", type=int, default=2000, help="每页的 span 数")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.3, help="带重复块的 span 比例")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    middle_json = {
+        "pdf_info": [synthetic_page(index, args.spans, args.duplicate_ratio, rng) for index in range(args.pages)]
+    }
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        source_map = normalize_source_map(middle_json)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    blocks = sum(len(page["blocks"]) for page in source_map["pages"])
+    print(
+        f"{args.pages} pages x {args.spans} spans -> {blocks} blocks  "
+        f"median {statistics.median(timings):8.1f} ms  "
+        f"per page {statistics.median(timings) / max(1, args.pages):8.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""按文件表重算物化的统计计数，校正批量 SQL 更新或删除造成的偏差。
+
+建议用 cron 定期运行，例如每天凌晨：
+
+    python scripts/reconcile_stats.py
+    python scripts/reconcile_stats.py --user-id 1 --days 7
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.database import get_db_context  # noqa: E402
+from app.services.stats import STATS_RECONCILE_DAYS, StatsService  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", help="只重算指定用户，不填则重算全部用户")
+    parser.add_argument("--days", type=int, default=STATS_RECONCILE_DAYS, help="重建按天统计的天数")
+    args = parser.parse_args()
+
+    with get_db_context() as db:
+        service = StatsService(db)
+        if args.user_id:
+            service.reconcile_user(args.user_id, args.days)
+            print(f"reconciled user {args.user_id}")
+        else:
+            print(f"reconciled {service.reconcile_all(args.days)} users")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,27 @@ import os
 import sys
 from pathlib import Path
 
+import pytest
+
 
 BACKEND_ROOT = Path(__file__).resolve().parents[1]
 if str(BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(BACKEND_ROOT))
 
 os.environ.setdefault("AUTH_ALLOW_USER_HEADER", "true")
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    # 各测试使用独立数据库，同一邮箱同一秒内签发的令牌会相同，用户 ID 也会重复，需要清掉进程内缓存
+    from app.services.auth import session_cache
+    from app.services.file_listing import file_count_cache
+    from app.services.source_lookup import source_lookup_cache
+
+    session_cache.clear()
+    file_count_cache.clear()
+    source_lookup_cache.clear()
+    yield
+    session_cache.clear()
+    file_count_cache.clear()
+    source_lookup_cache.clear()
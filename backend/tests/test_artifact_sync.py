@@ -1,4 +1,5 @@
 import io
+import tempfile
 import zipfile
 
 from app.services.artifact_sync import MineruArtifactSync
@@ -7,6 +8,7 @@ from app.services.artifact_sync import MineruArtifactSync
 class FakeMinioClient:
     def __init__(self):
         self.objects = {}
+        self.lengths = {}
         self.buckets = set()
 
     def bucket_exists(self, bucket):
@@ -18,6 +20,7 @@ class FakeMinioClient:
     def put_object(self, bucket, path, data, length, content_type=None):
         self.buckets.add(bucket)
         self.objects[(bucket, path)] = data.read()
+        self.lengths[(bucket, path)] = length
 
 
 def build_zip() -> bytes:
@@ -49,6 +52,26 @@ def test_sync_zip_uploads_markdown_images_and_rewrites_urls():
     assert client.objects[("mds", "sample/sample_middle.json")] == b'{"pdf_info": []}'
 
 
+def test_sync_zip_accepts_spooled_file_and_streams_members():
+    client = FakeMinioClient()
+    sync = MineruArtifactSync(
+        minio=client,
+        bucket="mds",
+        endpoint="http://minio:9000",
+        public_endpoint="http://localhost:9000",
+    )
+
+    with tempfile.SpooledTemporaryFile(max_size=64) as spool:
+        spool.write(build_zip())
+        spool.seek(0)
+        result = sync.sync_zip(spool, output_name="sample")
+
+    assert result.markdown == "# Title\n\n![](http://localhost:9000/mds/sample/images/a.png)"
+    assert client.objects[("mds", "sample/images/a.png")] == b"PNG"
+    assert client.lengths[("mds", "sample/images/a.png")] == 3
+    assert client.objects[("mds", "sample/sample_middle.json")] == b'{"pdf_info": []}'
+
+
 def test_sync_zip_rewrites_nested_mineru_image_urls_to_existing_keys():
     client = FakeMinioClient()
     buffer = io.BytesIO()
@@ -101,3 +124,59 @@ def test_sync_zip_raises_when_markdown_missing():
         assert "Markdown artifact not found" in str(exc)
     else:
         raise AssertionError("expected ValueError")
+
+
+def build_image_heavy_zip(count: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("sample/sample.md", "\n".join(f"![](images/{index}.png)" for index in range(count)))
+        for index in range(count):
+            zf.writestr(f"sample/images/{index}.png", f"PNG{index}".encode("utf-8"))
+    return buffer.getvalue()
+
+
+def test_sync_zip_parallel_uploads_keep_sequential_path_order():
+    sequential_client = FakeMinioClient()
+    parallel_client = FakeMinioClient()
+    zip_bytes = build_image_heavy_zip(40)
+
+    sequential = MineruArtifactSync(
+        minio=sequential_client,
+        bucket="mds",
+        endpoint="http://minio:9000",
+        upload_workers=1,
+    ).sync_zip(zip_bytes, output_name="sample")
+    parallel = MineruArtifactSync(
+        minio=parallel_client,
+        bucket="mds",
+        endpoint="http://minio:9000",
+        upload_workers=8,
+    ).sync_zip(zip_bytes, output_name="sample")
+
+    assert parallel.uploaded_paths == sequential.uploaded_paths
+    assert parallel.markdown == sequential.markdown
+    assert parallel_client.objects == sequential_client.objects
+    assert parallel_client.objects[("mds", "sample/images/39.png")] == b"PNG39"
+
+
+class FailingMinioClient(FakeMinioClient):
+    def put_object(self, bucket, path, data, length, content_type=None):
+        if path.endswith("/3.png"):
+            raise RuntimeError("minio write failed")
+        super().put_object(bucket, path, data, length, content_type=content_type)
+
+
+def test_sync_zip_parallel_upload_failure_propagates():
+    sync = MineruArtifactSync(
+        minio=FailingMinioClient(),
+        bucket="mds",
+        endpoint="http://minio:9000",
+        upload_workers=4,
+    )
+
+    try:
+        sync.sync_zip(build_image_heavy_zip(10), output_name="sample")
+    except RuntimeError as exc:
+        assert "minio write failed" in str(exc)
+    else:
+        raise AssertionError("expected RuntimeError")
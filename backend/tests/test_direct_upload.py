@@ -0,0 +1,170 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import upload as upload_api
+from app.database import get_db
+from app.models.base import Base
+from app.models.file import File
+from app.services.auth import create_session_token, create_upload_token
+from main import app
+
+
+class FakeObjectStore:
+    def __init__(self):
+        self.objects = {}
+        self.removed = []
+
+    def presign(self, minio_path, expires=3600):
+        return f"http://minio:9000/mineru-files/{minio_path}?X-Amz-Signature=sig"
+
+    def stat(self, minio_path):
+        size = self.objects.get(minio_path)
+        if size is None:
+            return None
+        return SimpleNamespace(size=size, content_type="application/octet-stream")
+
+    def remove(self, minio_path):
+        self.removed.append(minio_path)
+        self.objects.pop(minio_path, None)
+
+
+@pytest.fixture()
+def client_and_store(monkeypatch):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    testing_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = testing_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    store = FakeObjectStore()
+    queued = []
+    monkeypatch.setattr(upload_api, "presigned_put_url", store.presign)
+    monkeypatch.setattr(upload_api, "stat_uploaded_object", store.stat)
+    monkeypatch.setattr(upload_api, "remove_uploaded_object", store.remove)
+
+    def queue_parse_files(self, files, user_id, lane="interactive", **kwargs):
+        # 和真实实现一样，文件记录随排队状态一起提交
+        self.db.commit()
+        queued.extend((file.id, lane) for file in files)
+
+    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_files", queue_parse_files)
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        response = client.post("/api/auth/register", json={"email": "ada@example.com", "password": "secret123"})
+        client.user_id = str(response.json()["user"]["id"])
+        yield client, store, queued, testing_session
+    finally:
+        app.dependency_overrides.clear()
+
+
+def presign(client, *names):
+    response = client.post(
+        "/api/upload/presign",
+        json={"files": [{"filename": name, "size": 3, "content_type": "application/pdf"} for name in names]},
+    )
+    assert response.status_code == 200
+    return response.json()["uploads"]
+
+
+def test_presign_then_complete_registers_uploaded_files(client_and_store):
+    client, store, queued, testing_session = client_and_store
+    uploads = presign(client, "a.pdf", "b.pdf")
+    assert all(upload["url"].startswith("http://minio:9000/mineru-files/") for upload in uploads)
+    for upload in uploads:
+        store.objects[upload["minio_path"]] = 3
+
+    response = client.post("/api/upload/complete", json={"upload_tokens": [u["upload_token"] for u in uploads]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["success"], body["failed"]) == (2, 2, 0)
+    files = body["files"]
+    assert [file["filename"] for file in files] == ["a.pdf", "b.pdf"]
+    assert [file["size"] for file in files] == [3, 3]
+    assert files[0]["content_type"] == "application/pdf"
+    assert queued == [(files[0]["id"], "interactive"), (files[1]["id"], "interactive")]
+
+
+def test_complete_rejects_objects_that_were_not_uploaded(client_and_store):
+    client, store, queued, testing_session = client_and_store
+    uploads = presign(client, "a.pdf")
+
+    response = client.post("/api/upload/complete", json={"upload_tokens": [uploads[0]["upload_token"]]})
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["files"] == ["a.pdf"]
+    with testing_session() as db:
+        assert db.query(File).count() == 0
+
+
+def test_complete_is_idempotent(client_and_store):
+    client, store, queued, testing_session = client_and_store
+    upload = presign(client, "a.pdf")[0]
+    store.objects[upload["minio_path"]] = 3
+
+    first = client.post("/api/upload/complete", json={"upload_tokens": [upload["upload_token"]]}).json()
+    second = client.post("/api/upload/complete", json={"upload_tokens": [upload["upload_token"]]}).json()
+
+    assert first["files"][0]["id"] == second["files"][0]["id"]
+    assert len(queued) == 1
+
+
+def test_complete_rejects_tokens_of_other_users_or_tampered_tokens(client_and_store):
+    client, store, queued, testing_session = client_and_store
+    store.objects["x.pdf"] = 10
+    foreign = create_upload_token("someone-else", {"path": "x.pdf", "filename": "x.pdf", "size": 10}, 60)
+    own = create_upload_token(client.user_id, {"path": "x.pdf", "filename": "x.pdf", "size": 10}, 60)
+    payload, signature = own.split(".", 1)
+    tampered = f"{payload}.{signature[::-1]}"
+
+    for token in (foreign, tampered, "garbage"):
+        response = client.post("/api/upload/complete", json={"upload_tokens": [token]})
+        assert response.status_code == 400
+    assert queued == []
+
+
+def test_complete_rejects_objects_whose_size_differs_from_the_presigned_size(client_and_store):
+    client, store, queued, testing_session = client_and_store
+    upload = presign(client, "a.pdf")[0]
+    store.objects[upload["minio_path"]] = 4096
+
+    response = client.post("/api/upload/complete", json={"upload_tokens": [upload["upload_token"]]})
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["files"] == ["a.pdf"]
+    assert store.removed == [upload["minio_path"]]
+    assert queued == []
+    with testing_session() as db:
+        assert db.query(File).count() == 0
+
+
+def test_upload_tokens_and_session_tokens_are_not_interchangeable(client_and_store):
+    client, store, queued, testing_session = client_and_store
+    store.objects["x.pdf"] = 10
+    session_token = create_session_token(SimpleNamespace(id=client.user_id, email="ada@example.com"))
+    upload_token = create_upload_token(client.user_id, {"path": "x.pdf", "filename": "x.pdf", "size": 10}, 60)
+    incomplete = create_upload_token(client.user_id, {"filename": "x.pdf", "size": 10}, 60)
+
+    for token in (session_token, incomplete):
+        response = client.post("/api/upload/complete", json={"upload_tokens": [token]})
+        assert response.status_code == 400
+    assert queued == []
+
+    anonymous = TestClient(app)
+    response = anonymous.get("/api/files", headers={"Authorization": f"Bearer {upload_token}"})
+    assert response.status_code == 401
@@ -1,22 +1,27 @@
+import hashlib
 import json
 from types import SimpleNamespace
 from fastapi.testclient import TestClient
 
 from app.database import get_db
-from app.api.parsed import _normalize_source_map
 from app.models.file import File as FileModel
 from app.models.parsed_content import ParsedContent
+from app.services.source_map import normalize_source_map
 from main import app
 
 
 class FakeObject:
     def __init__(self, content):
         self.content = content
+        self.offset = 0
         self.closed = False
         self.released = False
 
-    def read(self):
-        return self.content
+    def read(self, amt=None):
+        end = len(self.content) if amt is None else self.offset + amt
+        chunk = self.content[self.offset:end]
+        self.offset += len(chunk)
+        return chunk
 
     def close(self):
         self.closed = True
@@ -65,19 +70,26 @@ class FakeMinio:
 
     def stat_object(self, bucket, path):
         self.stat_calls.append((bucket, path))
-        if (bucket, path) not in self.existing_objects and (bucket, path) not in self.objects:
-            raise FileNotFoundError(path)
+        if (bucket, path) in self.objects:
+            stored = self.objects[(bucket, path)]
+            return SimpleNamespace(etag=hashlib.md5(stored["content"]).hexdigest(), metadata=stored.get("metadata", {}))
+        if (bucket, path) in self.existing_objects:
+            return SimpleNamespace(etag=hashlib.md5(self.existing_objects[(bucket, path)]).hexdigest(), metadata={})
+        raise FileNotFoundError(path)
 
-    def put_object(self, bucket, path, data, length, content_type=None):
+    def put_object(self, bucket, path, data, length, content_type=None, metadata=None):
         self.objects[(bucket, path)] = {
             "content": data.read(),
             "content_type": content_type,
         }
+        if metadata:
+            self.objects[(bucket, path)]["metadata"] = {f"X-Amz-Meta-{key}": value for key, value in metadata.items()}
 
-    def get_object(self, bucket, path):
+    def get_object(self, bucket, path, offset=0, length=0):
         self.get_calls.append((bucket, path))
         if (bucket, path) in self.objects:
-            response = FakeObject(self.objects[(bucket, path)]["content"])
+            content = self.objects[(bucket, path)]["content"]
+            response = FakeObject(content[offset:offset + length] if length else content)
             self.get_responses.append(response)
             return response
         if (bucket, path) in self.existing_objects:
@@ -628,10 +640,13 @@ def test_source_map_returns_blocks_from_nested_middle_json(monkeypatch):
         app.dependency_overrides.clear()
 
     assert response.status_code == 200
-    assert fake_minio.get_calls == [
+    assert fake_minio.stat_calls[:3] == [
+        ("mds", "sample_source_map.json"),
         ("mds", "sample/sample_middle.json"),
         ("mds", "sample/auto/sample_middle.json"),
     ]
+    assert fake_minio.get_calls == [("mds", "sample/auto/sample_middle.json")]
+    assert response.json() == json.loads(fake_minio.objects[("mds", "sample_source_map.json")]["content"])
     assert response.json() == {
         "pages": [
             {
@@ -679,7 +694,7 @@ def test_source_map_returns_blocks_from_nested_middle_json(monkeypatch):
 
 
 def test_source_map_keeps_longest_text_for_duplicate_bbox():
-    result = _normalize_source_map(
+    result = normalize_source_map(
         {
             "pdf_info": [
                 {
@@ -712,6 +727,35 @@ def test_source_map_keeps_longest_text_for_duplicate_bbox():
     ]
 
 
+def test_source_map_merges_duplicates_only_within_same_bbox_and_type():
+    bbox = [10, 10, 200, 30]
+    result = normalize_source_map(
+        {
+            "pdf_info": [
+                {
+                    "page_idx": 0,
+                    "page_size": [600, 800],
+                    "para_blocks": [
+                        {"type": "text", "bbox": bbox, "text": "付款期限"},
+                        {"type": "title", "bbox": bbox, "text": "付款期限为三十日"},
+                        {"type": "text", "bbox": [10, 40, 200, 60], "text": "付款期限为三十日"},
+                        {"type": "text", "bbox": bbox, "text": "付款期限为三十日"},
+                        {"type": "text", "bbox": bbox, "text": "付款"},
+                        {"type": "text", "bbox": bbox, "text": "违约责任"},
+                    ],
+                }
+            ]
+        }
+    )
+
+    assert [(block["id"], block["type"], block["text"]) for block in result["pages"][0]["blocks"]] == [
+        ("p1-b1", "text", "付款期限为三十日"),
+        ("p1-b2", "title", "付款期限为三十日"),
+        ("p1-b3", "text", "付款期限为三十日"),
+        ("p1-b4", "text", "违约责任"),
+    ]
+
+
 def test_source_map_returns_empty_pages_when_middle_json_missing(monkeypatch):
     fake_file = SimpleNamespace(
         id=3,
@@ -734,9 +778,107 @@ def test_source_map_returns_empty_pages_when_middle_json_missing(monkeypatch):
         app.dependency_overrides.clear()
 
     assert response.status_code == 200
-    assert fake_minio.get_calls == [
+    assert fake_minio.stat_calls == [
+        ("mds", "sample_source_map.json"),
         ("mds", "sample/sample_middle.json"),
         ("mds", "sample/auto/sample_middle.json"),
         ("mds", "sample_middle.json"),
     ]
+    assert fake_minio.get_calls == []
     assert response.json() == {"pages": []}
+
+
+def _middle_json(text):
+    return json.dumps(
+        {"pdf_info": [{"page_idx": 0, "page_size": [600, 800], "para_blocks": [{"type": "text", "bbox": [1, 2, 3, 4], "text": text}]}]}
+    ).encode("utf-8")
+
+
+def _get_source_map(headers=None, params=None):
+    fake_file = SimpleNamespace(id=3, user_id="u1", filename="sample.pdf", minio_path="uploads/sample.pdf")
+    app.dependency_overrides[get_db] = lambda: FakeDb(fake_file)
+    try:
+        return TestClient(app).get(
+            "/api/files/3/source_map",
+            params=params,
+            headers={"X-User-Id": "u1", **(headers or {})},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_source_map_is_served_from_precomputed_artifact_with_etag(monkeypatch):
+    fake_minio = FakeMinio()
+    fake_minio.existing_objects[("mds", "sample/auto/sample_middle.json")] = _middle_json("First")
+    monkeypatch.setattr("app.api.parsed.get_buckets", lambda: ["mds"])
+    monkeypatch.setattr("app.api.parsed.minio_client", fake_minio)
+
+    first = _get_source_map()
+    fake_minio.get_calls.clear()
+    second = _get_source_map()
+    not_modified = _get_source_map({"If-None-Match": first.headers["etag"]})
+
+    assert first.json()["pages"][0]["blocks"][0]["text"] == "First"
+    assert second.json() == first.json()
+    assert second.headers["etag"] == first.headers["etag"]
+    assert not_modified.status_code == 304
+    assert fake_minio.get_calls == [("mds", "sample_source_map.json")]
+
+
+def test_source_map_is_rebuilt_when_middle_json_changes(monkeypatch):
+    fake_minio = FakeMinio()
+    fake_minio.existing_objects[("mds", "sample/auto/sample_middle.json")] = _middle_json("First")
+    monkeypatch.setattr("app.api.parsed.get_buckets", lambda: ["mds"])
+    monkeypatch.setattr("app.api.parsed.minio_client", fake_minio)
+
+    first = _get_source_map()
+    fake_minio.existing_objects[("mds", "sample/auto/sample_middle.json")] = _middle_json("Reparsed")
+    second = _get_source_map({"If-None-Match": first.headers["etag"]})
+
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.json()["pages"][0]["blocks"][0]["text"] == "Reparsed"
+
+
+def _multi_page_middle_json(page_count):
+    return json.dumps(
+        {
+            "pdf_info": [
+                {
+                    "page_idx": index,
+                    "page_size": [600, 800],
+                    "para_blocks": [{"type": "text", "bbox": [1, 2, 3, 4], "text": f"Page {index + 1} 正文"}],
+                }
+                for index in range(page_count)
+            ]
+        }
+    ).encode("utf-8")
+
+
+def test_source_map_pages_param_reads_only_requested_byte_range(monkeypatch):
+    fake_minio = FakeMinio()
+    fake_minio.existing_objects[("mds", "sample/auto/sample_middle.json")] = _multi_page_middle_json(6)
+    monkeypatch.setattr("app.api.parsed.get_buckets", lambda: ["mds"])
+    monkeypatch.setattr("app.api.parsed.minio_client", fake_minio)
+
+    full = _get_source_map().json()
+    built = _get_source_map(params={"pages": "2-4"})
+    fake_minio.get_calls.clear()
+    fake_minio.get_responses.clear()
+    cached = _get_source_map(params={"pages": "2-4"})
+
+    expected = {"pages": full["pages"][1:4], "page_count": 6, "block_count": 6}
+    assert built.json() == expected
+    assert cached.json() == expected
+    assert cached.headers["etag"] == built.headers["etag"]
+    assert fake_minio.get_calls == [("mds", "sample_source_map_index.json"), ("mds", "sample_source_map.json")]
+    assert len(fake_minio.get_responses[-1].content) < len(fake_minio.objects[("mds", "sample_source_map.json")]["content"]) // 2
+    assert _get_source_map(params={"pages": "9-12"}).json() == {"pages": [], "page_count": 6, "block_count": 6}
+
+
+def test_source_map_rejects_invalid_page_range(monkeypatch):
+    monkeypatch.setattr("app.api.parsed.get_buckets", lambda: ["mds"])
+    monkeypatch.setattr("app.api.parsed.minio_client", FakeMinio())
+
+    assert _get_source_map(params={"pages": "5-2"}).status_code == 400
+    assert _get_source_map(params={"pages": "a-b"}).status_code == 400
@@ -119,6 +119,8 @@ def test_delete_file_removes_original_and_parsed_minio_artifacts(monkeypatch):
         ("mds", "sample_popo.md"),
         ("mds", "sample_popo_status.json"),
         ("mds", "sample_middle.json"),
+        ("mds", "sample_source_map.json"),
+        ("mds", "sample_source_map_index.json"),
         ("mds", "sample/auto/sample_middle.json"),
         ("mds", "sample/images/page-1.png"),
     ]
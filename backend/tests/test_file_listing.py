@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+from app.models.base import Base
+from app.models.enums import FileStatus
+from app.models.file import File
+from main import app
+
+
+@pytest.fixture()
+def listing_env():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    testing_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def override_get_db():
+        db = testing_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield TestClient(app, headers={"X-User-Id": "u1"}), testing_session, statements
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+def add_files(testing_session, count: int, user_id="u1", upload_time=None) -> list[int]:
+    upload_time = upload_time or datetime(2026, 10, 18, 8, 0, 0)
+    with testing_session() as db:
+        files = [
+            File(
+                user_id=user_id,
+                filename=f"doc-{index}.pdf",
+                size=1,
+                status=FileStatus.PENDING,
+                # 同一批上传共用时间戳，游标需要用 id 区分
+                upload_time=upload_time - timedelta(minutes=index // 3),
+                minio_path=f"doc-{index}.pdf",
+                mineru_task_payload="x" * 1000,
+            )
+            for index in range(count)
+        ]
+        db.add_all(files)
+        db.commit()
+        return [file.id for file in files]
+
+
+def test_cursor_pages_cover_every_file_once_in_listing_order(listing_env):
+    client, testing_session, _ = listing_env
+    add_files(testing_session, 10)
+
+    offset_ids = [item["id"] for item in client.get("/api/files", params={"page_size": 100}).json()["files"]]
+    cursor_ids = []
+    cursor = ""
+    while True:
+        body = client.get("/api/files", params={"page_size": 4, "cursor": cursor, "with_total": False}).json()
+        assert body["total"] is None
+        cursor_ids.extend(item["id"] for item in body["files"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert cursor_ids == offset_ids
+    assert len(set(cursor_ids)) == 10
+
+
+def test_listing_does_not_load_task_payload(listing_env):
+    client, testing_session, statements = listing_env
+    add_files(testing_session, 2)
+    statements.clear()
+
+    client.get("/api/files")
+
+    selects = [statement for statement in statements if "FROM files" in statement]
+    assert selects
+    assert all("mineru_task_payload" not in statement for statement in selects)
+
+
+def test_total_is_cached_until_user_files_change(listing_env):
+    client, testing_session, statements = listing_env
+    add_files(testing_session, 3)
+
+    assert client.get("/api/files").json()["total"] == 3
+    statements.clear()
+    assert client.get("/api/files").json()["total"] == 3
+    assert not [statement for statement in statements if "count(" in statement]
+
+    add_files(testing_session, 2)
+
+    assert client.get("/api/files").json()["total"] == 5
+
+
+def test_invalid_cursor_is_rejected(listing_env):
+    client, _, _ = listing_env
+
+    response = client.get("/api/files", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+def test_cursor_query_uses_composite_index(listing_env):
+    _, testing_session, _ = listing_env
+    with testing_session() as db:
+        plan = db.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id FROM files WHERE user_id = 'u1' "
+                "AND (upload_time < '2026-10-18' OR (upload_time = '2026-10-18' AND id < 5)) "
+                "ORDER BY upload_time DESC, id DESC LIMIT 21"
+            )
+        ).fetchall()
+
+    assert any("idx_files_user_upload" in row[-1] for row in plan)
@@ -77,7 +77,7 @@ class FakeRedis:
         self.messages = self.messages[count:]
         return batch
 
-    def ack_message(self, stream, group, message_id):
+    def ack_message(self, stream, group, message_id, user_id=None):
         self.acked.append(message_id)
 
 
@@ -179,7 +179,7 @@ def test_run_worker_uses_configured_concurrency_and_creates_group(monkeypatch):
         def __exit__(self, exc_type, exc, tb):
             return False
 
-    def loop_once(redis, executor, in_flight, concurrency, block_ms=1000):
+    def loop_once(redis, executor, in_flight, concurrency, block_ms=1000, **kwargs):
         calls.append(("loop", redis, executor, concurrency, block_ms))
         raise KeyboardInterrupt
 
@@ -194,3 +194,71 @@ def test_run_worker_uses_configured_concurrency_and_creates_group(monkeypatch):
     assert calls[0] == ("executor", 4)
     assert calls[1][0] == "loop"
     assert calls[1][3] == 4
+
+
+class FakePoller:
+    def __init__(self):
+        self.api_client = object()
+        self.watched = []
+        self.futures = []
+
+    def watch(self, task_id, progress_callback=None):
+        future = Future()
+        self.watched.append(task_id)
+        self.futures.append(future)
+        return future
+
+
+def test_run_worker_loop_once_frees_slot_while_mineru_task_is_polled(monkeypatch):
+    fake_redis = FakeRedis([make_message(1), make_message(2)])
+    executor = CapturingExecutor()
+    poller = FakePoller()
+    waiting = {}
+    in_flight = {}
+
+    worker.run_worker_loop_once(
+        fake_redis, executor, in_flight, concurrency=1, block_ms=0, poller=poller, waiting=waiting
+    )
+    assert executor.submitted[0][0] is worker.submit_stream_message
+    executor.futures[0].set_result(
+        worker.PendingParse(file_id=1, user_id="u1", task_id="task-1", settings_key="key")
+    )
+
+    worker.run_worker_loop_once(
+        fake_redis, executor, in_flight, concurrency=1, block_ms=0, poller=poller, waiting=waiting
+    )
+
+    assert poller.watched == ["task-1"]
+    assert fake_redis.acked == []
+    assert len(waiting) == 1
+    assert fake_redis.read_counts == [1, 1]
+    assert executor.submitted[1][0] is worker.submit_stream_message
+
+    poller.futures[0].set_result({"status": "success"})
+    executor.futures[1].set_result(None)
+    worker.run_worker_loop_once(
+        fake_redis, executor, in_flight, concurrency=1, block_ms=0, poller=poller, waiting=waiting
+    )
+
+    assert fake_redis.acked == [b"2-0"]
+    assert waiting == {}
+    assert executor.submitted[2][0] is worker.complete_pending_parse
+
+    executor.futures[2].set_result(None)
+    worker.run_worker_loop_once(
+        fake_redis, executor, in_flight, concurrency=1, block_ms=0, poller=poller, waiting=waiting
+    )
+
+    assert fake_redis.acked == [b"2-0", b"1-0"]
+
+
+def test_run_worker_loop_once_caps_pending_mineru_tasks(monkeypatch):
+    fake_redis = FakeRedis([make_message(1)])
+    executor = CapturingExecutor()
+    waiting = {Future(): (b"0-0", None), Future(): (b"0-1", None)}
+
+    worker.run_worker_loop_once(
+        fake_redis, executor, {}, concurrency=4, block_ms=0, poller=FakePoller(), waiting=waiting, max_pending=2
+    )
+
+    assert fake_redis.read_counts == []
@@ -142,7 +142,7 @@ def test_upload_can_assign_file_to_folder(client_and_session, monkeypatch):
         db.close()
 
     monkeypatch.setattr("app.api.upload.upload_file", lambda *args, **kwargs: None)
-    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_file", lambda *args, **kwargs: None)
+    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_files", lambda self, *args, **kwargs: self.db.commit())
 
     response = client.post(
         "/api/upload",
@@ -177,7 +177,7 @@ def test_upload_rejects_other_users_folder(client_and_session, monkeypatch):
         db.close()
 
     monkeypatch.setattr("app.api.upload.upload_file", lambda *args, **kwargs: None)
-    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_file", lambda *args, **kwargs: None)
+    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_files", lambda self, *args, **kwargs: self.db.commit())
 
     response = client.post(
         "/api/upload",
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from app.services.json_stream import iter_json_array
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[index:index + size] for index in range(0, len(data), size)]
+
+
+def test_yields_array_items_across_any_chunk_boundary():
+    document = {
+        "_backend": "pipeline",
+        "pdf_info": [{"page_idx": 0, "text": "甲方 \"引号\" \\ 反斜杠"}, 123456, -1.5e3, None, True, [], "é" * 5],
+        "_version_name": "2.0",
+    }
+    data = json.dumps(document, ensure_ascii=False).encode("utf-8")
+
+    for size in range(1, 24):
+        assert list(iter_json_array(chunked(data, size), "pdf_info")) == document["pdf_info"]
+
+
+def test_stops_reading_after_the_array():
+    chunks = iter(chunked(b'{"pdf_info": [{"page_idx": 0}], "tail": ' + b"0" * 1000 + b"}", 16))
+
+    assert list(iter_json_array(chunks, "pdf_info")) == [{"page_idx": 0}]
+    assert len(list(chunks)) > 50
+
+
+@pytest.mark.parametrize("data", [b"[1, 2]", b'{"pdf_info": {"page_idx": 0}}', b'{"other": [1]}', b"{}", b""])
+def test_yields_nothing_without_top_level_array(data):
+    assert list(iter_json_array([data], "pdf_info")) == []
+
+
+def test_truncated_document_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(b'{"pdf_info": [{"page_idx": 0}, {"page_', 4), "pdf_info"))
@@ -4,7 +4,7 @@ import zipfile
 import httpx
 import pytest
 
-from app.services.mineru_api import MineruApiClient, MineruApiError
+from app.services.mineru_api import MineruApiClient, MineruApiError, PollSchedule
 
 
 def make_zip_bytes() -> bytes:
@@ -83,6 +83,35 @@ def test_parse_file_posts_zip_request_and_returns_bytes():
     assert result.content.startswith(b"PK")
 
 
+def test_parse_file_streams_file_object_into_multipart_body():
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        assert b'name="files"; filename="sample.pdf"' in body
+        assert b"%PDF-streamed" in body
+        return httpx.Response(
+            200,
+            content=make_zip_bytes(),
+            headers={"content-type": "application/zip"},
+        )
+
+    client = MineruApiClient(
+        base_url="http://mineru-router:8002",
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    result = client.parse_file(
+        filename="sample.pdf",
+        file_bytes=io.BytesIO(b"%PDF-streamed"),
+        backend="pipeline",
+        parse_method="auto",
+        lang="ch",
+        formula_enable=True,
+        table_enable=True,
+    )
+
+    assert result.content.startswith(b"PK")
+
+
 def test_parse_file_includes_server_url_when_configured():
     def handler(request: httpx.Request) -> httpx.Response:
         body = request.read()
@@ -216,3 +245,99 @@ def test_async_parse_reports_task_progress_callback():
             "payload": {"status": "success", "progress": 100, "message": "done"},
         },
     ]
+
+
+def test_async_parse_spools_result_download_to_file_object():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/tasks" and request.method == "POST":
+            return httpx.Response(200, json={"task_id": "task-123"})
+        if request.url.path == "/tasks/task-123":
+            return httpx.Response(200, json={"status": "success"})
+        if request.url.path == "/tasks/task-123/result":
+            return httpx.Response(
+                200,
+                content=make_zip_bytes(),
+                headers={"content-type": "application/zip"},
+            )
+        raise AssertionError(f"unexpected path {request.url.path}")
+
+    client = MineruApiClient(
+        base_url="http://mineru-router:8002",
+        use_async_tasks=True,
+        poll_interval_seconds=0,
+        spool_results=True,
+        result_spool_max_bytes=16,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    result = client.parse_file(
+        filename="sample.pdf",
+        file_bytes=b"%PDF",
+        backend="pipeline",
+        parse_method="auto",
+        lang="ch",
+        formula_enable=True,
+        table_enable=True,
+    )
+
+    try:
+        assert not isinstance(result.content, bytes)
+        assert result.content_type == "application/zip"
+        assert result.content.read() == make_zip_bytes()
+    finally:
+        result.content.close()
+
+
+def test_spooled_download_raises_with_error_body():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(500, json={"detail": "boom"})
+
+    client = MineruApiClient(
+        base_url="http://mineru-router:8002",
+        spool_results=True,
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    with pytest.raises(MineruApiError) as exc:
+        client.parse_file(
+            filename="sample.pdf",
+            file_bytes=b"%PDF",
+            backend="pipeline",
+            parse_method="auto",
+            lang="ch",
+            formula_enable=True,
+            table_enable=True,
+        )
+
+    assert "boom" in str(exc.value)
+
+
+def test_poll_schedule_backs_off_while_task_is_unchanged():
+    schedule = PollSchedule(1, 8, backoff=2, clock=lambda: 0)
+
+    assert schedule.next_delay({"status": "pending"}) == 1
+    assert schedule.next_delay({"status": "pending"}) == 2
+    assert schedule.next_delay({"status": "pending"}) == 4
+    assert schedule.next_delay({"status": "pending"}) == 8
+    assert schedule.next_delay({"status": "pending"}) == 8
+
+
+def test_poll_schedule_follows_eta_and_progress_rate():
+    now = [0.0]
+    schedule = PollSchedule(1, 30, clock=lambda: now[0])
+
+    assert schedule.next_delay({"status": "running", "eta_seconds": 12}) == 12
+    assert schedule.next_delay({"status": "running", "eta_seconds": 600}) == 30
+
+    now[0] = 20.0
+    # 20 秒完成 80%，预计还需 5 秒
+    assert schedule.next_delay({"status": "running", "progress": 80}) == 5
+
+
+def test_parse_batch_statuses_accepts_list_and_mapping_payloads():
+    assert MineruApiClient.parse_batch_statuses(
+        {"tasks": [{"task_id": "a", "status": "running"}, {"id": "b", "status": "success"}]}
+    ) == {"a": {"task_id": "a", "status": "running"}, "b": {"id": "b", "status": "success"}}
+    assert MineruApiClient.parse_batch_statuses({"a": {"status": "pending"}, "b": "bad"}) == {
+        "a": {"status": "pending"}
+    }
@@ -0,0 +1,130 @@
+import json
+
+import httpx
+import pytest
+
+from app.services.mineru_api import MineruApiClient, MineruApiError, MineruApiTimeout
+from app.services.mineru_poller import MineruTaskPoller
+
+
+def make_poller(handler, **client_kwargs):
+    api_client = MineruApiClient(
+        base_url="http://mineru-router:8002",
+        poll_interval_seconds=client_kwargs.pop("poll_interval_seconds", 0.001),
+        **client_kwargs,
+    )
+    return MineruTaskPoller(
+        api_client,
+        max_concurrent_requests=4,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+
+def test_poller_multiplexes_many_tasks_and_reports_progress():
+    polls = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        task_id = request.url.path.rsplit("/", 1)[-1]
+        polls[task_id] = polls.get(task_id, 0) + 1
+        if polls[task_id] < 3:
+            return httpx.Response(200, json={"status": "running", "progress": polls[task_id] * 30})
+        return httpx.Response(200, json={"status": "success", "progress": 100})
+
+    poller = make_poller(handler).start()
+    events = {f"task-{index}": [] for index in range(20)}
+    try:
+        futures = {
+            task_id: poller.watch(task_id, progress_callback=task_events.append)
+            for task_id, task_events in events.items()
+        }
+        results = {task_id: future.result(timeout=10) for task_id, future in futures.items()}
+    finally:
+        poller.close()
+
+    assert all(payload["status"] == "success" for payload in results.values())
+    assert all(count == 3 for count in polls.values())
+    assert events["task-7"] == [
+        {"task_id": "task-7", "status": "running", "payload": {"status": "running", "progress": 30}},
+        {"task_id": "task-7", "status": "running", "payload": {"status": "running", "progress": 60}},
+        {
+            "task_id": "task-7",
+            "status": "success",
+            "stage": "downloading_result",
+            "message": "正在下载解析结果",
+            "payload": {"status": "success", "progress": 100},
+        },
+    ]
+
+
+def test_poller_raises_for_failed_task():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"status": "failed", "error": "oom"})
+
+    poller = make_poller(handler).start()
+    try:
+        with pytest.raises(MineruApiError, match="oom"):
+            poller.watch("task-1").result(timeout=10)
+    finally:
+        poller.close()
+
+
+def test_poller_times_out_long_running_task():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"status": "running"})
+
+    poller = make_poller(handler, task_timeout_seconds=0.05).start()
+    try:
+        with pytest.raises(MineruApiTimeout):
+            poller.watch("task-1").result(timeout=10)
+    finally:
+        poller.close()
+
+
+def test_poller_batches_status_queries_when_endpoint_configured():
+    batch_requests = []
+    polls = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/tasks/status"
+        task_ids = json.loads(request.content)["task_ids"]
+        batch_requests.append(task_ids)
+        tasks = []
+        for task_id in task_ids:
+            polls[task_id] = polls.get(task_id, 0) + 1
+            status = "success" if polls[task_id] >= 2 else "running"
+            tasks.append({"task_id": task_id, "status": status})
+        return httpx.Response(200, json={"tasks": tasks})
+
+    poller = make_poller(handler, batch_status_path="/tasks/status")
+    poller.batch_window_seconds = 0.02
+    poller.start()
+    try:
+        futures = [poller.watch(f"task-{index}") for index in range(10)]
+        results = [future.result(timeout=10) for future in futures]
+    finally:
+        poller.close()
+
+    assert all(payload["status"] == "success" for payload in results)
+    assert len(batch_requests) < 10 * 2
+    assert sorted(task_id for ids in batch_requests for task_id in ids) == sorted(
+        f"task-{index}" for index in range(10) for _ in range(2)
+    )
+
+
+def test_poller_falls_back_to_single_status_when_batch_unsupported():
+    paths = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        if request.url.path == "/tasks/status":
+            return httpx.Response(404, json={"detail": "Not Found"})
+        return httpx.Response(200, json={"status": "success"})
+
+    poller = make_poller(handler, batch_status_path="/tasks/status").start()
+    try:
+        assert poller.watch("task-1").result(timeout=10) == {"status": "success"}
+        assert poller.watch("task-2").result(timeout=10) == {"status": "success"}
+    finally:
+        poller.close()
+
+    assert paths == ["/tasks/status", "/tasks/task-1", "/tasks/task-2"]
@@ -0,0 +1,338 @@
+import hashlib
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+from app.models.base import Base
+from app.models.enums import FileStatus
+from app.models.file import File
+from app.models.parse_cache import ParseCache
+from app.models.parsed_content import ParsedContent
+from app.services.parse_cache import parse_settings_key
+from app.services.parsed_content_store import ParsedContentStore
+from app.services.parser import ParserService
+from main import app
+
+
+SOURCE_BYTES = b"%PDF-1.7 contract"
+
+
+class FakeObject:
+    def __init__(self, object_name=None, content=b""):
+        self.object_name = object_name
+        self.content = content
+        self.headers = {"Content-Type": "text/markdown"}
+
+    def read(self):
+        return self.content
+
+
+class FakeMinio:
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.copies = []
+
+    def get_object(self, bucket, path):
+        if (bucket, path) not in self.objects:
+            raise FileNotFoundError(path)
+        return FakeObject(path, self.objects[(bucket, path)])
+
+    def put_object(self, bucket, path, data, length, content_type=None):
+        self.objects[(bucket, path)] = data.read()
+
+    def list_objects(self, bucket, prefix, recursive):
+        return [FakeObject(path) for (item_bucket, path) in list(self.objects) if item_bucket == bucket and path.startswith(prefix)]
+
+    def copy_object(self, bucket, path, source):
+        self.copies.append((source.object_name, path))
+        self.objects[(bucket, path)] = self.objects[(source.bucket_name, source.object_name)]
+
+    def remove_object(self, bucket, path):
+        self.objects.pop((bucket, path), None)
+
+
+@pytest.fixture()
+def client_and_session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    testing_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = testing_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield TestClient(app), testing_session
+    finally:
+        app.dependency_overrides.clear()
+
+
+def register(client: TestClient) -> str:
+    response = client.post(
+        "/api/auth/register",
+        json={"email": "ada@example.com", "password": "secret123"},
+    )
+    return str(response.json()["user"]["id"])
+
+
+def default_settings_key() -> str:
+    return parse_settings_key(
+        backend="pipeline",
+        parse_method="auto",
+        lang="ch",
+        formula_enable=True,
+        table_enable=True,
+        effort="high",
+    )
+
+
+def add_parsed_source(testing_session, user_id: str) -> int:
+    db = testing_session()
+    try:
+        source = File(
+            user_id=user_id,
+            filename="contract.pdf",
+            size=len(SOURCE_BYTES),
+            status=FileStatus.PARSED,
+            upload_time=datetime.utcnow(),
+            minio_path="source.pdf",
+            content_hash=hashlib.sha256(SOURCE_BYTES).hexdigest(),
+        )
+        db.add(source)
+        db.commit()
+        db.add(
+            ParsedContent(
+                user_id=user_id,
+                file_id=source.id,
+                content="![](http://minio:9000/mds/source/images/a.png)",
+            )
+        )
+        db.add(ParseCache(content_hash=source.content_hash, settings_key=default_settings_key(), file_id=source.id))
+        db.commit()
+        return source.id
+    finally:
+        db.close()
+
+
+def test_parse_settings_key_changes_with_effective_settings():
+    base = default_settings_key()
+
+    assert base == default_settings_key()
+    assert base != parse_settings_key("pipeline", "ocr", "ch", True, True, "high")
+    assert base != parse_settings_key("pipeline", "auto", "ch", True, True, "medium")
+    assert base != parse_settings_key("hybrid-engine", "auto", "ch", True, True, "high")
+
+
+def test_worker_reuses_parse_result_of_identical_upload(client_and_session, monkeypatch):
+    client, testing_session = client_and_session
+    user_id = register(client)
+    source_id = add_parsed_source(testing_session, user_id)
+    fake_minio = FakeMinio(
+        {
+            ("mds", "source.md"): b"![](http://minio:9000/mds/source/images/a.png)",
+            ("mds", "source/auto/source.md"): b"![](http://minio:9000/mds/source/images/a.png)",
+            ("mds", "source/auto/source_middle.json"): b'{"pdf_info": []}',
+            ("mds", "source/images/a.png"): b"PNG",
+        }
+    )
+    queued = []
+
+    monkeypatch.setenv("MINERU_API_HYBRID_EFFORT", "high")
+    monkeypatch.setattr("app.api.upload.upload_file", lambda reader, *args, **kwargs: reader.read())
+    monkeypatch.setattr("app.services.parse_cache.minio_client", fake_minio)
+    monkeypatch.setattr("app.services.parser.get_buckets", lambda: ["mds"])
+    source_maps = []
+    monkeypatch.setattr(ParserService, "_build_source_map", lambda self, file: source_maps.append(file.id))
+
+    def queue_parse_files(self, files, user_id, lane="interactive", reuse_cache=False):
+        self.db.commit()
+        queued.extend((file.id, reuse_cache) for file in files)
+
+    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_files", queue_parse_files)
+
+    response = client.post(
+        "/api/upload",
+        files={"files": ("copy.pdf", SOURCE_BYTES, "application/pdf")},
+    )
+
+    # 上传请求只登记并排队，不复制产物
+    assert response.status_code == 200
+    uploaded = response.json()["files"][0]
+    assert queued == [(uploaded["id"], True)]
+    assert uploaded["status"] == "pending"
+    assert fake_minio.copies == []
+
+    db = testing_session()
+    try:
+        file = db.get(File, uploaded["id"])
+        result = ParserService(db, mineru_api_client=FakeApiClient()).parse_file(file, user_id, reuse_cache=True)
+        assert result["status"] == "reused"
+        assert file.status == FileStatus.PARSED
+        assert file.progress_percent == 100
+        # 复用的文件同样预计算溯源映射，首次预览不用在请求里处理 middle.json
+        assert source_maps == [file.id]
+    finally:
+        db.close()
+
+    stem = uploaded["minio_path"].rsplit(".", 1)[0]
+    assert fake_minio.objects[("mds", f"{stem}.md")] == f"![](http://minio:9000/mds/{stem}/images/a.png)".encode("utf-8")
+    assert fake_minio.objects[("mds", f"{stem}/auto/{stem}.md")].endswith(f"/mds/{stem}/images/a.png)".encode("utf-8"))
+    assert fake_minio.objects[("mds", f"{stem}/auto/{stem}_middle.json")] == b'{"pdf_info": []}'
+    assert fake_minio.objects[("mds", f"{stem}/images/a.png")] == b"PNG"
+    assert ("source/images/a.png", f"{stem}/images/a.png") in fake_minio.copies
+
+    db = testing_session()
+    try:
+        parsed = db.query(ParsedContent).filter(ParsedContent.file_id == uploaded["id"]).first()
+        assert ParsedContentStore(db).read(parsed) == f"![](http://minio:9000/mds/{stem}/images/a.png)"
+        assert db.query(File).filter(File.id == uploaded["id"]).first().content_hash == (
+            hashlib.sha256(SOURCE_BYTES).hexdigest()
+        )
+        assert db.query(ParseCache).one().file_id == source_id
+    finally:
+        db.close()
+
+
+def test_upload_with_different_settings_is_not_reused(client_and_session, monkeypatch):
+    client, testing_session = client_and_session
+    user_id = register(client)
+    add_parsed_source(testing_session, user_id)
+
+    monkeypatch.setenv("MINERU_API_HYBRID_EFFORT", "medium")
+    monkeypatch.setattr("app.api.upload.upload_file", lambda reader, *args, **kwargs: reader.read())
+    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_files", lambda self, *args, **kwargs: self.db.commit())
+
+    response = client.post(
+        "/api/upload",
+        files={"files": ("copy.pdf", SOURCE_BYTES, "application/pdf")},
+    )
+
+    assert response.status_code == 200
+    db = testing_session()
+    try:
+        file = db.get(File, response.json()["files"][0]["id"])
+        service = ParserService(db, mineru_api_client=SimpleNamespace(hybrid_effort="medium"))
+        assert service.reuse_cached_result(file, user_id) is None
+    finally:
+        db.close()
+
+
+def test_delete_file_invalidates_parse_cache(client_and_session, monkeypatch):
+    client, testing_session = client_and_session
+    user_id = register(client)
+    source_id = add_parsed_source(testing_session, user_id)
+
+    monkeypatch.setattr("app.api.files.minio_client", FakeMinio())
+
+    response = client.delete(f"/api/files/{source_id}")
+
+    assert response.status_code == 200
+    db = testing_session()
+    try:
+        assert db.query(ParseCache).count() == 0
+    finally:
+        db.close()
+
+
+class FakeApiClient:
+    hybrid_effort = "high"
+
+    def parse_file(self, **kwargs):
+        return SimpleNamespace(content=b"zip", content_type="application/zip")
+
+
+class FakeArtifactSync:
+    def sync_zip(self, content, output_name):
+        return SimpleNamespace(markdown="# parsed", markdown_path=f"{output_name}.md", uploaded_paths=[])
+
+
+class FakePopo:
+    def postprocess(self, *args, **kwargs):
+        pass
+
+
+def test_parse_file_records_parse_cache_entry(client_and_session, monkeypatch):
+    _, testing_session = client_and_session
+    db = testing_session()
+    try:
+        file = File(
+            user_id="u1",
+            filename="contract.pdf",
+            size=len(SOURCE_BYTES),
+            status=FileStatus.PENDING,
+            upload_time=datetime.utcnow(),
+            minio_path="fresh.pdf",
+            content_hash="a" * 64,
+        )
+        db.add(file)
+        db.commit()
+
+        monkeypatch.setattr("app.services.parser.minio_client", FakeMinio({("mineru-files", "fresh.pdf"): SOURCE_BYTES}))
+        monkeypatch.setattr("app.services.parser.get_buckets", lambda: ["mds"])
+        service = ParserService(
+            db,
+            mineru_api_client=FakeApiClient(),
+            artifact_sync_factory=lambda bucket: FakeArtifactSync(),
+            popo_postprocessor=FakePopo(),
+        )
+
+        assert service.parse_file(file, user_id="u1") == {"status": "success"}
+
+        entry = db.query(ParseCache).one()
+        assert entry.file_id == file.id
+        assert entry.content_hash == "a" * 64
+        assert entry.settings_key == default_settings_key()
+    finally:
+        db.close()
+
+
+def test_worker_hashes_direct_upload_and_reuses_cached_result(client_and_session, monkeypatch):
+    _, testing_session = client_and_session
+    source_id = add_parsed_source(testing_session, "u1")
+    fake_minio = FakeMinio(
+        {
+            ("mineru-files", "direct.pdf"): SOURCE_BYTES,
+            ("mds", "source.md"): b"![](http://minio:9000/mds/source/images/a.png)",
+            ("mds", "source/images/a.png"): b"PNG",
+        }
+    )
+    monkeypatch.setenv("MINERU_API_HYBRID_EFFORT", "high")
+    monkeypatch.setattr("app.services.parser.minio_client", fake_minio)
+    monkeypatch.setattr("app.services.parse_cache.minio_client", fake_minio)
+    monkeypatch.setattr("app.services.parser.get_buckets", lambda: ["mds"])
+    db = testing_session()
+    try:
+        # 直传登记的文件没有哈希，由 worker 读取源文件时补上
+        file = File(
+            user_id="u1",
+            filename="contract.pdf",
+            size=len(SOURCE_BYTES),
+            status=FileStatus.PENDING,
+            upload_time=datetime.utcnow(),
+            minio_path="direct.pdf",
+        )
+        db.add(file)
+        db.commit()
+
+        result = ParserService(db, mineru_api_client=FakeApiClient()).parse_file(file, "u1", reuse_cache=True)
+
+        assert result["status"] == "reused"
+        assert file.content_hash == hashlib.sha256(SOURCE_BYTES).hexdigest()
+        assert fake_minio.objects[("mds", "direct/images/a.png")] == b"PNG"
+        assert db.query(ParseCache).one().file_id == source_id
+    finally:
+        db.close()
@@ -0,0 +1,220 @@
+import json
+from collections import Counter
+from concurrent.futures import Future
+
+from app.services import file_parser_worker as worker
+from app.services.parse_scheduler import FairShareScheduler, StreamMessage, parse_lane_weights
+from app.services.parser import PARSE_LANE_STREAMS
+
+INTERACTIVE = PARSE_LANE_STREAMS["interactive"]
+BULK = PARSE_LANE_STREAMS["bulk"]
+REPARSE = PARSE_LANE_STREAMS["reparse"]
+
+
+def make_message(file_id, user_id="u1", cost=1):
+    return {b"data": json.dumps({"file_id": file_id, "user_id": user_id, "cost": cost}).encode("utf-8")}
+
+
+class FakeLaneRedis:
+    def __init__(self, streams):
+        self.streams = {name: list(messages) for name, messages in streams.items()}
+        self.reads = []
+        self.acked = []
+
+    def read_streams(self, streams, group, consumer, count=1, block=1000):
+        self.reads.append((list(streams), count, block))
+        batch = []
+        for stream in streams:
+            messages = self.streams.get(stream, [])
+            taken, self.streams[stream] = messages[:count], messages[count:]
+            batch.extend((stream, message_id, message) for message_id, message in taken)
+        return batch
+
+    def ack_message(self, stream, group, message_id, user_id=None):
+        self.acked.append((stream, message_id))
+
+
+def file_ids(picked):
+    return [json.loads(message[b"data"])["file_id"] for _, message in picked]
+
+
+def test_parse_lane_weights_reads_overrides_and_ignores_invalid_values():
+    assert parse_lane_weights("interactive=10,bulk=x,unknown=4") == {"interactive": 10, "reparse": 3, "bulk": 1}
+
+
+def test_weighted_round_robin_favors_interactive_lane_without_starving_bulk():
+    redis = FakeLaneRedis(
+        {
+            INTERACTIVE: [(f"i{index}".encode(), make_message(index, "alice")) for index in range(20)],
+            BULK: [(f"b{index}".encode(), make_message(100 + index, "bob")) for index in range(20)],
+        }
+    )
+    scheduler = FairShareScheduler("worker_me", weights={"interactive": 3, "reparse": 1, "bulk": 1}, prefetch=20)
+
+    picked = scheduler.next_messages(redis, limit=8)
+
+    lanes = Counter(ref.stream for ref, _ in picked)
+    assert lanes == {INTERACTIVE: 6, BULK: 2}
+
+
+def buffered_scheduler(messages, **kwargs) -> FairShareScheduler:
+    scheduler = FairShareScheduler("worker_me", **kwargs)
+    for stream, message_id, message in messages:
+        scheduler.add(stream, message_id, message)
+    return scheduler
+
+
+def test_deficit_round_robin_shares_a_lane_between_users():
+    bulk = [(BULK, f"a{index}".encode(), make_message(index, "alice")) for index in range(10)]
+    bulk.append((BULK, b"c0", make_message(50, "carol")))
+    bulk.append((BULK, b"c1", make_message(51, "carol")))
+    scheduler = buffered_scheduler(bulk)
+
+    picked = scheduler.next_messages(FakeLaneRedis({}), limit=4)
+
+    assert file_ids(picked) == [0, 50, 1, 51]
+
+
+def test_deficit_round_robin_charges_large_files_more():
+    bulk = [(BULK, f"a{index}".encode(), make_message(index, "alice", cost=3)) for index in range(3)]
+    bulk += [(BULK, f"c{index}".encode(), make_message(50 + index, "carol")) for index in range(6)]
+    scheduler = buffered_scheduler(bulk)
+
+    picked = scheduler.next_messages(FakeLaneRedis({}), limit=5)
+
+    users = [json.loads(message[b"data"])["user_id"] for _, message in picked]
+    assert users.count("carol") == 4
+    assert users.count("alice") == 1
+
+
+def test_scheduler_blocks_only_when_buffer_and_streams_are_empty():
+    redis = FakeLaneRedis({INTERACTIVE: [(b"1-0", make_message(1))], BULK: [(b"2-0", make_message(2))]})
+    scheduler = FairShareScheduler("worker_me", prefetch=4)
+
+    assert len(scheduler.next_messages(redis, limit=1, block_ms=500)) == 1
+    assert scheduler.buffered_refs() == [StreamMessage(BULK, b"2-0")]
+    assert all(block is None for _, _, block in redis.reads)
+
+    redis.reads.clear()
+    scheduler.next_messages(redis, limit=1, block_ms=500)
+    assert all(block is None for _, _, block in redis.reads)
+
+    redis.reads.clear()
+    assert scheduler.next_messages(redis, limit=1, block_ms=500) == []
+    assert redis.reads[-1] == ([INTERACTIVE, BULK, REPARSE], 1, 500)
+
+
+def test_refill_reads_each_lane_up_to_its_own_capacity():
+    scheduler = buffered_scheduler([(BULK, b"b0", make_message(0)), (BULK, b"b1", make_message(1))], prefetch=4)
+    redis = FakeLaneRedis(
+        {
+            INTERACTIVE: [(f"i{index}".encode(), make_message(10 + index)) for index in range(10)],
+            BULK: [(f"b{index}".encode(), make_message(20 + index)) for index in range(2, 10)],
+        }
+    )
+
+    scheduler._refill(redis, capacity=3, block_ms=None)
+
+    assert {tuple(streams): count for streams, count, _ in redis.reads} == {
+        (INTERACTIVE,): 3,
+        (BULK,): 1,
+        (REPARSE,): 3,
+    }
+    assert scheduler.buffered_count("bulk") == 3
+
+
+def test_prefetch_is_limited_by_free_slots_so_backlog_stays_claimable():
+    redis = FakeLaneRedis({INTERACTIVE: [(f"{index}-0".encode(), make_message(index)) for index in range(10)]})
+    scheduler = FairShareScheduler("worker_me", prefetch=4)
+
+    assert len(scheduler.next_messages(redis, limit=1)) == 1
+
+    # 只读取一条，其余消息留在 Stream 里给其他副本
+    assert redis.reads[0][1] == 1
+    assert scheduler.buffered_refs() == []
+    assert len(redis.streams[INTERACTIVE]) == 9
+
+
+class CapturingExecutor:
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append((fn, args, future))
+        return future
+
+
+def test_run_worker_loop_once_acks_scheduled_message_on_its_lane(monkeypatch):
+    redis = FakeLaneRedis({BULK: [(b"7-0", make_message(7))]})
+    executor = CapturingExecutor()
+    in_flight = {}
+    scheduler = FairShareScheduler("worker_me", prefetch=4)
+
+    worker.run_worker_loop_once(redis, executor, in_flight, concurrency=1, block_ms=0, scheduler=scheduler)
+
+    fn, args, future = executor.futures[0]
+    assert fn is worker.process_stream_message
+    assert args[0] == b"7-0"
+    future.set_result(None)
+
+    worker.run_worker_loop_once(redis, executor, in_flight, concurrency=1, block_ms=0, scheduler=scheduler)
+
+    assert redis.acked == [(BULK, b"7-0")]
+
+
+class AdmissionRedis(FakeLaneRedis):
+    """按 RedisClient.admit_tasks / ack_message 的语义模拟每个用户的 Stream 名额。"""
+
+    def __init__(self):
+        super().__init__({})
+        self.admitted = {}
+        self.waiting = {}
+        self.next_id = 0
+
+    def _xadd(self, stream, task_data):
+        self.next_id += 1
+        message = {b"data": json.dumps(task_data).encode("utf-8")}
+        self.streams.setdefault(stream, []).append((f"{self.next_id}-0".encode(), message))
+
+    def admit_tasks(self, stream, user_id, tasks, limit):
+        waiting = self.waiting.setdefault((stream, user_id), [])
+        added = 0
+        for task_data in tasks:
+            if not waiting and self.admitted.get((stream, user_id), 0) < limit:
+                self._xadd(stream, task_data)
+                self.admitted[(stream, user_id)] = self.admitted.get((stream, user_id), 0) + 1
+                added += 1
+            else:
+                waiting.append(task_data)
+        return added
+
+    def ack_message(self, stream, group, message_id, user_id=None):
+        super().ack_message(stream, group, message_id, user_id)
+        waiting = self.waiting.get((stream, user_id))
+        if waiting:
+            self._xadd(stream, waiting.pop(0))
+        elif user_id is not None:
+            self.admitted[(stream, user_id)] -= 1
+
+
+def test_user_with_deep_backlog_does_not_block_other_users_in_the_same_lane():
+    redis = AdmissionRedis()
+    redis.admit_tasks(BULK, "alice", [{"file_id": index, "user_id": "alice"} for index in range(2000)], limit=2)
+    redis.admit_tasks(BULK, "carol", [{"file_id": 9000, "user_id": "carol"}], limit=2)
+    executor = CapturingExecutor()
+    in_flight = {}
+    scheduler = FairShareScheduler("worker_me", prefetch=2)
+    processed = []
+
+    while 9000 not in processed:
+        worker.run_worker_loop_once(redis, executor, in_flight, concurrency=1, block_ms=0, scheduler=scheduler)
+        fn, args, future = executor.futures[-1]
+        processed.append(json.loads(args[1][b"data"])["file_id"])
+        future.set_result(None)
+        worker.run_worker_loop_once(redis, executor, in_flight, concurrency=0, block_ms=0, scheduler=scheduler)
+
+    # alice 的积压留在她的等待列表里，carol 的任务在前几条内就被处理
+    assert len(processed) <= 3
+    assert len(redis.waiting[(BULK, "alice")]) >= 1995
+    assert redis.admitted[(BULK, "alice")] == 2
@@ -0,0 +1,138 @@
+from datetime import datetime
+import io
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+from app.models.base import Base
+from app.models.enums import FileStatus
+from app.models.file import File
+from app.models.parsed_content import ParsedContent, markdown_digest
+from app.services.parsed_content_store import ParsedContentStore
+from app.services.parser import ParserService
+from main import app
+
+MARKDOWN = "# 采购合同\n\n" + "甲方与乙方就设备采购达成如下协议。\n" * 200
+
+
+class FakeMinio:
+    def __init__(self, objects=None):
+        self.objects = objects or {}
+
+    def stat_object(self, bucket, path):
+        if (bucket, path) not in self.objects:
+            raise FileNotFoundError(path)
+        return object()
+
+    def get_object(self, bucket, path):
+        if (bucket, path) not in self.objects:
+            raise FileNotFoundError(path)
+        return io.BytesIO(self.objects[(bucket, path)])
+
+
+@pytest.fixture()
+def session_factory(monkeypatch):
+    monkeypatch.setenv("SEARCH_INDEX_ENABLED", "0")
+    monkeypatch.setattr("app.services.parser.get_buckets", lambda: ["mds"])
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def add_file(session_factory) -> int:
+    with session_factory() as db:
+        file = File(
+            user_id="u1",
+            filename="contract.pdf",
+            size=1,
+            status=FileStatus.PARSING,
+            upload_time=datetime.utcnow(),
+            minio_path="u1-contract.pdf",
+        )
+        db.add(file)
+        db.commit()
+        return file.id
+
+
+def finish_parse(session_factory, file_id) -> None:
+    with session_factory() as db:
+        ParserService(db)._finish_parse(db.get(File, file_id), "u1", MARKDOWN, "settings")
+
+
+def test_compressed_row_keeps_only_hash_size_and_blob(session_factory, monkeypatch):
+    monkeypatch.setattr("app.models.parsed_content.zstandard", None)
+    monkeypatch.setattr("app.services.parser.minio_client", FakeMinio())
+    file_id = add_file(session_factory)
+
+    finish_parse(session_factory, file_id)
+
+    with session_factory() as db:
+        row = db.query(ParsedContent).one()
+        data = MARKDOWN.encode("utf-8")
+        assert row.storage == "zlib"
+        assert row.content is None
+        assert row.content_hash == markdown_digest(data)
+        assert row.content_size == len(data)
+        assert len(row.content_blob) < len(data) // 10
+        assert ParserService(db).get_parsed_content(file_id, "u1") == MARKDOWN
+        assert ParserService(db).get_parsed_content(file_id, "u2") == ""
+
+
+def test_object_mode_stores_pointer_to_markdown_artifact(session_factory, monkeypatch):
+    minio = FakeMinio({("mds", "u1-contract.md"): MARKDOWN.encode("utf-8")})
+    monkeypatch.setenv("PARSED_CONTENT_STORAGE", "object")
+    monkeypatch.setattr("app.services.parser.minio_client", minio)
+    file_id = add_file(session_factory)
+
+    finish_parse(session_factory, file_id)
+
+    with session_factory() as db:
+        row = db.query(ParsedContent).one()
+        assert (row.storage, row.object_key, row.content, row.content_blob) == ("object", "mds/u1-contract.md", None, None)
+        assert ParserService(db).get_parsed_content(file_id, "u1") == MARKDOWN
+
+
+def test_object_mode_falls_back_to_compression_when_artifact_is_missing(session_factory, monkeypatch):
+    monkeypatch.setenv("PARSED_CONTENT_STORAGE", "object")
+    monkeypatch.setattr("app.services.parser.minio_client", FakeMinio())
+    file_id = add_file(session_factory)
+
+    finish_parse(session_factory, file_id)
+
+    with session_factory() as db:
+        row = db.query(ParsedContent).one()
+        assert row.storage in ("zstd", "zlib")
+        assert row.object_key is None
+        assert ParsedContentStore(db).read(row) == MARKDOWN
+
+
+def test_legacy_inline_rows_are_still_served(session_factory):
+    file_id = add_file(session_factory)
+    with session_factory() as db:
+        db.add(ParsedContent(user_id="u1", file_id=file_id, content="# 旧数据"))
+        db.commit()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        response = TestClient(app).get(f"/api/files/{file_id}/parsed_content", headers={"X-User-Id": "u1"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json() == "# 旧数据"
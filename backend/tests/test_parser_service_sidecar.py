@@ -3,6 +3,7 @@ from types import SimpleNamespace
 import pytest
 
 from app.models.enums import FileStatus
+from app.services.parsed_content_store import ParsedContentStore
 from app.services.parser import ParserService
 
 
@@ -135,6 +136,10 @@ class FakeRedis:
     def publish_task(self, stream, task_data):
         self.published.append((stream, task_data))
 
+    def admit_tasks(self, stream, user_id, tasks, limit):
+        self.published.extend((stream, task_data) for task_data in tasks)
+        return len(tasks)
+
 
 def test_parse_file_uses_mineru_api_and_artifact_sync(monkeypatch):
     fake_client = FakeApiClient()
@@ -163,7 +168,7 @@ def test_parse_file_uses_mineru_api_and_artifact_sync(monkeypatch):
     assert fake_client.kwargs["backend"] == "pipeline"
     assert file.status == FileStatus.PARSED
     assert file.error_message is None
-    assert db.added[0].content == "# parsed"
+    assert ParsedContentStore(db).read(db.added[0]) == "# parsed"
 
 
 @pytest.mark.parametrize("extension", [".docx", ".pptx", ".xlsx"])
@@ -309,7 +314,10 @@ def test_queue_parse_file_initializes_progress_and_clears_mineru_task(monkeypatc
     assert file.mineru_task_status is None
     assert file.mineru_task_payload is None
     assert fake_redis.published == [
-        ("file_parser_stream", {"file_id": 1, "user_id": "u1", "parse_method": "auto"})
+        (
+            "file_parser_stream",
+            {"file_id": 1, "user_id": "u1", "parse_method": "auto", "lane": "interactive", "cost": 1},
+        )
     ]
 
 
@@ -340,6 +348,8 @@ def test_parse_file_records_local_progress_stages(monkeypatch):
 
     monkeypatch.setattr("app.services.parser.minio_client", FakeMinio())
     monkeypatch.setattr("app.services.parser.get_buckets", lambda: ["mds"])
+    # 只关心进度阶段，关掉缓存登记带来的额外提交
+    monkeypatch.setenv("PARSE_CACHE_ENABLED", "0")
 
     result = service.parse_file(file, user_id="u1")
 
@@ -425,3 +435,175 @@ def test_parse_file_persists_mineru_task_progress_callback(monkeypatch):
     assert '"done"' in file.mineru_task_payload
     assert file.progress_percent == 100
     assert file.parse_stage == "completed"
+
+
+class StreamingResponse:
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+        self.released = False
+
+    def stream(self, amt):
+        yield from self.chunks
+
+    def close(self):
+        self.closed = True
+
+    def release_conn(self):
+        self.released = True
+
+
+class StreamingMinio:
+    def __init__(self, chunks):
+        self.response = StreamingResponse(chunks)
+
+    def get_object(self, bucket, path):
+        return self.response
+
+
+class ReadingApiClient:
+    def parse_file(self, **kwargs):
+        self.kwargs = kwargs
+        self.body = kwargs["file_bytes"].read()
+        return SimpleNamespace(content=b"zip", content_type="application/zip")
+
+
+def test_parse_file_streams_source_object_and_releases_connection(monkeypatch):
+    fake_client = ReadingApiClient()
+    fake_minio = StreamingMinio([b"%PDF-", b"1.7", b"\n%%EOF"])
+    service = ParserService(
+        FakeDb(),
+        mineru_api_client=fake_client,
+        artifact_sync_factory=lambda bucket: FakeArtifactSync(),
+    )
+    file = SimpleNamespace(
+        id=1,
+        minio_path="uploads/sample.pdf",
+        status=FileStatus.PENDING,
+        start_at=None,
+        finish_at=None,
+        error_message=None,
+    )
+
+    monkeypatch.setattr("app.services.parser.minio_client", fake_minio)
+    monkeypatch.setattr("app.services.parser.get_buckets", lambda: ["mds"])
+
+    assert service.parse_file(file, user_id="u1") == {"status": "success"}
+    assert not isinstance(fake_client.kwargs["file_bytes"], bytes)
+    assert fake_client.body == b"%PDF-1.7\n%%EOF"
+    assert fake_minio.response.closed is True
+    assert fake_minio.response.released is True
+
+
+class TaskApiClient:
+    hybrid_effort = "high"
+
+    def __init__(self):
+        self.fetched = []
+
+    def submit_task(self, **kwargs):
+        self.submit_kwargs = kwargs
+        self.body = kwargs["file_bytes"].read()
+        return "task-9", {"task_id": "task-9"}
+
+    def fetch_task_result(self, task_id, filename):
+        self.fetched.append((task_id, filename))
+        return SimpleNamespace(content=b"zip", content_type="application/zip")
+
+
+def make_progress_file():
+    return SimpleNamespace(
+        id=1,
+        minio_path="uploads/sample.pdf",
+        status=FileStatus.PENDING,
+        start_at=None,
+        finish_at=None,
+        error_message=None,
+        parse_stage=None,
+        progress_percent=None,
+        progress_message=None,
+        last_heartbeat_at=None,
+        mineru_task_id=None,
+        mineru_task_status=None,
+        mineru_task_payload=None,
+    )
+
+
+def test_submit_and_complete_parse_split_mineru_task_lifecycle(monkeypatch):
+    api_client = TaskApiClient()
+    db = FakeDb()
+    service = ParserService(
+        db,
+        mineru_api_client=api_client,
+        artifact_sync_factory=lambda bucket: FakeArtifactSync(),
+    )
+    file = make_progress_file()
+
+    monkeypatch.setattr("app.services.parser.minio_client", FakeMinio())
+    monkeypatch.setattr("app.services.parser.get_buckets", lambda: ["mds"])
+
+    pending = service.submit_parse(file, user_id="u1")
+
+    assert pending.task_id == "task-9"
+    assert pending.file_id == 1
+    assert api_client.body == b"%PDF"
+    assert api_client.submit_kwargs["filename"] == "sample.pdf"
+    assert file.status == FileStatus.PARSING
+    assert file.mineru_task_id == "task-9"
+    assert file.parse_stage == "waiting_mineru"
+
+    assert service.complete_parse(file, pending) == {"status": "success"}
+    assert api_client.fetched == [("task-9", "sample.pdf")]
+    assert file.status == FileStatus.PARSED
+    assert ParsedContentStore(db).read(db.added[0]) == "# parsed"
+
+
+def test_complete_parse_marks_file_failed_on_poll_error(monkeypatch):
+    api_client = TaskApiClient()
+    service = ParserService(
+        FakeDb(),
+        mineru_api_client=api_client,
+        artifact_sync_factory=lambda bucket: FakeArtifactSync(),
+    )
+    file = make_progress_file()
+    pending = SimpleNamespace(file_id=1, user_id="u1", task_id="task-9", settings_key="key")
+
+    with pytest.raises(Exception, match="task exploded"):
+        service.complete_parse(file, pending, poll_error=RuntimeError("task exploded"))
+
+    assert api_client.fetched == []
+    assert file.status == FileStatus.PARSE_FAILED
+    assert file.parse_stage == "failed"
+
+
+def test_record_task_progress_skips_unchanged_poll_until_heartbeat_expires(monkeypatch):
+    db = FakeDb()
+    service = ParserService(db, mineru_api_client=FakeApiClient(), artifact_sync_factory=lambda bucket: None)
+    file = SimpleNamespace(
+        id=1,
+        status=FileStatus.PARSING,
+        parse_stage=None,
+        progress_percent=None,
+        progress_message=None,
+        last_heartbeat_at=None,
+        mineru_task_id=None,
+        mineru_task_status=None,
+        mineru_task_payload=None,
+    )
+    event = {"task_id": "task-1", "status": "running", "payload": {"status": "running", "progress": 40}}
+
+    service.record_mineru_task_progress(file, event)
+    service.record_mineru_task_progress(file, event)
+    assert db.commits == 1
+
+    service.record_mineru_task_progress(
+        file, {"task_id": "task-1", "status": "running", "payload": {"status": "running", "progress": 55}}
+    )
+    assert db.commits == 2
+    assert file.progress_percent == 55
+
+    monkeypatch.setattr("app.services.parser.PROGRESS_HEARTBEAT_SECONDS", 0)
+    service.record_mineru_task_progress(
+        file, {"task_id": "task-1", "status": "running", "payload": {"status": "running", "progress": 55}}
+    )
+    assert db.commits == 3
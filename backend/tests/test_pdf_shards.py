@@ -0,0 +1,235 @@
+import io
+import json
+import threading
+import zipfile
+from types import SimpleNamespace
+
+import pypdf
+import pytest
+
+from app.services import parser
+from app.services.parser import ParserService
+from app.services.pdf_shards import merge_shard_zips, plan_shards, split_pdf_pages
+
+
+def make_shard_zip(pages: int, tag: str) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("big/auto/big.md", f"# {tag}")
+        archive.writestr(
+            "big/auto/big_pages.md",
+            "\n\n".join(f"# Page {index + 1}\n\n{tag}-{index}" for index in range(pages)),
+        )
+        archive.writestr(
+            "big/auto/big_middle.json",
+            json.dumps({"pdf_info": [{"page_idx": index} for index in range(pages)], "_backend": "pipeline"}),
+        )
+        archive.writestr(
+            "big/auto/big_content_list.json",
+            json.dumps([{"type": "text", "text": f"{tag}-{index}", "page_idx": index} for index in range(pages)]),
+        )
+        archive.writestr(
+            "big/auto/big_model.json",
+            json.dumps([{"layout_dets": [], "page_info": {"page_no": index}} for index in range(pages)]),
+        )
+        archive.writestr("big/auto/big_summary.json", json.dumps({"pages": pages}))
+        archive.writestr("big/auto/images/same.jpg", b"jpg")
+        archive.writestr("big/auto/big_layout.pdf", b"%PDF")
+    return buffer.getvalue()
+
+
+def test_plan_shards_covers_all_pages_with_inclusive_ranges():
+    assert plan_shards(250, 100) == [(0, 99), (100, 199), (200, 249)]
+    assert plan_shards(100, 100) == [(0, 99)]
+
+
+def test_merge_shard_zips_renumbers_pages():
+    merged = merge_shard_zips([make_shard_zip(2, "a"), make_shard_zip(1, "b")], [0, 2])
+
+    with zipfile.ZipFile(merged) as archive:
+        names = archive.namelist()
+        middle = json.loads(archive.read("big/auto/big_middle.json"))
+        content_list = json.loads(archive.read("big/auto/big_content_list.json"))
+        model = json.loads(archive.read("big/auto/big_model.json"))
+        pages = archive.read("big/auto/big_pages.md").decode("utf-8")
+        markdown = archive.read("big/auto/big.md").decode("utf-8")
+
+    assert [page["page_idx"] for page in middle["pdf_info"]] == [0, 1, 2]
+    assert middle["_backend"] == "pipeline"
+    assert [(item["text"], item["page_idx"]) for item in content_list] == [("a-0", 0), ("a-1", 1), ("b-0", 2)]
+    assert pages == "# Page 1\n\na-0\n\n# Page 2\n\na-1\n\n# Page 3\n\nb-0"
+    assert markdown == "# a\n\n# b"
+    assert "big/auto/images/same.jpg" in names
+    assert "big/auto/big_layout.pdf" not in names
+    assert [page["page_info"]["page_no"] for page in model] == [0, 1, 2]
+    # 结构未知、页码无法重排的 JSON 不保留
+    assert "big/auto/big_summary.json" not in names
+
+
+class ShardApiClient:
+    def __init__(self, fail_range=None):
+        self.fail_range = fail_range
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def parse_file(self, **kwargs):
+        # 每个分片上传的是只含自己页面的子 PDF，不再传 page_range
+        assert "page_range" not in kwargs
+        page_range = tuple(int(page) for page in kwargs["file_bytes"].read().decode("ascii").split("-"))
+        with self.lock:
+            self.calls.append(page_range)
+        if page_range == self.fail_range:
+            raise RuntimeError("shard failed")
+        start, end = page_range
+        task_id = f"task-{start}"
+        kwargs["progress_callback"]({"task_id": task_id, "status": "processing", "payload": {"progress": 50}})
+        return SimpleNamespace(content=make_shard_zip(end - start + 1, task_id), content_type="application/zip")
+
+
+class CapturingArtifactSync:
+    def sync_zip(self, zip_source, output_name):
+        with zipfile.ZipFile(zip_source) as archive:
+            self.middle = json.loads(archive.read("big/auto/big_middle.json"))
+        return SimpleNamespace(markdown="merged", uploaded_paths=[])
+
+
+def run_sharded(monkeypatch, api_client, artifact_sync, events):
+    monkeypatch.setattr(parser, "SHARD_PAGE_THRESHOLD", 100)
+    monkeypatch.setattr(parser, "SHARD_PAGES", 100)
+    monkeypatch.setattr(parser, "count_pdf_pages", lambda source: 250)
+    monkeypatch.setattr(
+        parser,
+        "split_pdf_pages",
+        lambda source, ranges, max_spool_bytes: [io.BytesIO(f"{start}-{end}".encode("ascii")) for start, end in ranges],
+    )
+    service = ParserService(
+        SimpleNamespace(commit=lambda: None),
+        mineru_api_client=api_client,
+        artifact_sync_factory=lambda bucket: artifact_sync,
+        popo_postprocessor=SimpleNamespace(postprocess=lambda *args, **kwargs: None),
+    )
+    return service.process_file(
+        "big",
+        io.BytesIO(b"%PDF"),
+        ".pdf",
+        "auto",
+        "ch",
+        True,
+        True,
+        backend="pipeline",
+        mds_bucket="mds",
+        source_pdf_path="big.pdf",
+        mineru_progress_callback=events.append,
+    )
+
+
+def test_process_file_shards_large_pdf_and_merges_results(monkeypatch):
+    api_client = ShardApiClient()
+    artifact_sync = CapturingArtifactSync()
+    events = []
+
+    assert run_sharded(monkeypatch, api_client, artifact_sync, events) == ["merged"]
+
+    assert sorted(api_client.calls) == [(0, 99), (100, 199), (200, 249)]
+    assert [page["page_idx"] for page in artifact_sync.middle["pdf_info"]] == list(range(250))
+    assert events
+    assert all(event["stage"] == "waiting_mineru" for event in events)
+    assert all(0 < event["payload"]["progress"] <= 1 for event in events)
+
+
+def test_process_file_raises_when_a_shard_fails(monkeypatch):
+    with pytest.raises(RuntimeError, match="shard failed"):
+        run_sharded(monkeypatch, ShardApiClient(fail_range=(100, 199)), CapturingArtifactSync(), [])
+
+
+def test_process_file_skips_sharding_below_threshold(monkeypatch):
+    monkeypatch.setattr(parser, "SHARD_PAGE_THRESHOLD", 100)
+    monkeypatch.setattr(parser, "count_pdf_pages", lambda source: 40)
+
+    assert ParserService._plan_pdf_shards(b"%PDF") == []
+
+
+def make_pdf(widths) -> io.BytesIO:
+    writer = pypdf.PdfWriter()
+    for width in widths:
+        writer.add_blank_page(width=width, height=200)
+    source = io.BytesIO()
+    writer.write(source)
+    source.seek(0)
+    return source
+
+
+def test_split_pdf_pages_writes_each_range_as_its_own_pdf():
+    source = make_pdf(range(100, 105))
+
+    parts = split_pdf_pages(source, [(0, 1), (2, 4)])
+
+    widths = [[int(page.mediabox.width) for page in pypdf.PdfReader(part).pages] for part in parts]
+    assert widths == [[100, 101], [102, 103, 104]]
+
+
+class PdfShardApiClient:
+    """读取真实上传的子 PDF，按页宽生成分片结果，用来核对每页落在合并结果的哪个位置。"""
+
+    def __init__(self):
+        self.page_counts = []
+        self.lock = threading.Lock()
+
+    def parse_file(self, **kwargs):
+        widths = [int(page.mediabox.width) for page in pypdf.PdfReader(kwargs["file_bytes"]).pages]
+        with self.lock:
+            self.page_counts.append(len(widths))
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr(
+                "big/auto/big_middle.json",
+                json.dumps({"pdf_info": [{"page_idx": index, "width": width} for index, width in enumerate(widths)]}),
+            )
+            archive.writestr(
+                "big/auto/big_model.json",
+                json.dumps([{"page_info": {"page_no": index, "width": width}} for index, width in enumerate(widths)]),
+            )
+        return SimpleNamespace(content=buffer.getvalue(), content_type="application/zip")
+
+
+class CapturingMergedZip:
+    def sync_zip(self, zip_source, output_name):
+        with zipfile.ZipFile(zip_source) as archive:
+            self.middle = json.loads(archive.read("big/auto/big_middle.json"))
+            self.model = json.loads(archive.read("big/auto/big_model.json"))
+        return SimpleNamespace(markdown="merged", uploaded_paths=[])
+
+
+def test_process_file_shards_a_real_pdf_end_to_end(monkeypatch):
+    monkeypatch.setattr(parser, "SHARD_PAGE_THRESHOLD", 4)
+    monkeypatch.setattr(parser, "SHARD_PAGES", 4)
+    api_client = PdfShardApiClient()
+    artifact_sync = CapturingMergedZip()
+    service = ParserService(
+        SimpleNamespace(commit=lambda: None),
+        mineru_api_client=api_client,
+        artifact_sync_factory=lambda bucket: artifact_sync,
+        popo_postprocessor=SimpleNamespace(postprocess=lambda *args, **kwargs: None),
+    )
+
+    result = service.process_file(
+        "big",
+        make_pdf(range(100, 110)),
+        ".pdf",
+        "auto",
+        "ch",
+        True,
+        True,
+        backend="pipeline",
+        mds_bucket="mds",
+        source_pdf_path="big.pdf",
+    )
+
+    assert result == ["merged"]
+    assert sorted(api_client.page_counts) == [2, 4, 4]
+    assert [(page["page_idx"], page["width"]) for page in artifact_sync.middle["pdf_info"]] == [
+        (index, 100 + index) for index in range(10)
+    ]
+    assert [(page["page_info"]["page_no"], page["page_info"]["width"]) for page in artifact_sync.model] == [
+        (index, 100 + index) for index in range(10)
+    ]
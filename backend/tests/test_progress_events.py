@@ -0,0 +1,129 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+from app.models.base import Base
+from app.models.enums import FileStatus
+from app.models.file import File
+from app.services import progress_events
+from app.services.parser import ParserService
+from main import app
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    testing_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = testing_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield testing_session
+    finally:
+        app.dependency_overrides.clear()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.client = object()
+        self.published = []
+
+    def publish_message(self, channel, data):
+        self.published.append((channel, data))
+
+
+def add_file(session_factory, user_id: str, status: FileStatus) -> int:
+    with session_factory() as db:
+        file = File(
+            user_id=user_id,
+            filename=f"{status.value}.pdf",
+            size=1,
+            status=status,
+            upload_time=datetime.utcnow(),
+            minio_path=f"{status.value}.pdf",
+            parse_stage="waiting_mineru" if status == FileStatus.PARSING else None,
+            progress_percent=40 if status == FileStatus.PARSING else None,
+        )
+        db.add(file)
+        db.commit()
+        return file.id
+
+
+def read_events(body: str) -> list[dict]:
+    return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+
+def test_file_events_streams_snapshot_then_published_updates(session_factory, monkeypatch):
+    client = TestClient(app)
+    response = client.post("/api/auth/register", json={"email": "ada@example.com", "password": "secret123"})
+    user_id = str(response.json()["user"]["id"])
+    parsing_id = add_file(session_factory, user_id, FileStatus.PARSING)
+    add_file(session_factory, user_id, FileStatus.PARSED)
+    add_file(session_factory, "someone-else", FileStatus.PARSING)
+    subscribed = []
+
+    async def fake_subscribe(subscribe_user_id):
+        subscribed.append(subscribe_user_id)
+        yield None
+        yield {"file_id": parsing_id, "status": "parsed", "progress_percent": 100}
+
+    monkeypatch.setattr(progress_events, "subscribe_progress", fake_subscribe)
+
+    with client.stream("GET", "/api/files/events") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = read_events(body)
+    assert subscribed == [user_id]
+    assert [event["file_id"] for event in events] == [parsing_id, parsing_id]
+    assert events[0]["status"] == "parsing"
+    assert events[0]["progress_percent"] == 40
+    assert events[1]["status"] == "parsed"
+
+
+def test_file_events_requires_login(session_factory):
+    response = TestClient(app).get("/api/files/events")
+
+    assert response.status_code == 401
+
+
+def test_update_progress_publishes_to_user_channel(monkeypatch):
+    fake_redis = FakeRedis()
+    monkeypatch.setattr(progress_events, "redis_client", fake_redis)
+    db = SimpleNamespace(commit=lambda: None)
+    service = ParserService(db, mineru_api_client=object(), popo_postprocessor=object())
+    file = SimpleNamespace(
+        id=7,
+        user_id="u1",
+        status=FileStatus.PARSING,
+        progress_percent=None,
+        last_heartbeat_at=None,
+        mineru_task_status=None,
+    )
+
+    service._update_progress(file, "syncing_artifacts", "正在同步解析产物", 80)
+
+    channel, event = fake_redis.published[0]
+    assert channel == "file_progress:u1"
+    assert event["file_id"] == 7
+    assert event["status"] == "parsing"
+    assert event["parse_stage"] == "syncing_artifacts"
+    assert event["progress_percent"] == 80
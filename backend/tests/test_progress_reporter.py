@@ -0,0 +1,122 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.base import Base
+from app.models.enums import FileStatus
+from app.models.file import File
+from app.services.parser import ParserService
+from app.services.progress_reporter import ProgressReporter
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    factory.commits = []
+    event.listen(engine, "commit", lambda conn: factory.commits.append(conn))
+    yield factory
+    engine.dispose()
+
+
+def add_file(factory, name: str, status=FileStatus.PARSING) -> int:
+    with factory() as db:
+        file = File(
+            user_id="u1",
+            filename=name,
+            size=1,
+            status=status,
+            upload_time=datetime.utcnow(),
+            minio_path=name,
+        )
+        db.add(file)
+        db.commit()
+        return file.id
+
+
+def load(factory, file_id: int) -> File:
+    with factory() as db:
+        return db.get(File, file_id)
+
+
+def make_reporter(factory, now):
+    return ProgressReporter(session_factory=factory, flush_interval_seconds=5, clock=lambda: now[0])
+
+
+def test_progress_updates_are_buffered_until_interval(session_factory):
+    now = [0.0]
+    reporter = make_reporter(session_factory, now)
+    file_id = add_file(session_factory, "a.pdf")
+    db = session_factory()
+    file = db.get(File, file_id)
+    service = ParserService(db, mineru_api_client=object(), popo_postprocessor=object(), progress_reporter=reporter)
+    progress = service._progress_callback(file)
+
+    session_factory.commits.clear()
+    progress("syncing_artifacts", "正在同步解析产物", 60)
+    progress("syncing_artifacts", "正在同步解析产物", 70)
+
+    assert session_factory.commits == []
+    assert load(session_factory, file_id).progress_percent is None
+
+    now[0] = 6.0
+    progress("syncing_artifacts", "正在同步解析产物", 80)
+
+    assert len(session_factory.commits) == 1
+    stored = load(session_factory, file_id)
+    assert stored.progress_percent == 80
+    assert stored.parse_stage == "syncing_artifacts"
+    db.close()
+
+
+def test_flush_writes_many_files_in_one_transaction(session_factory):
+    reporter = make_reporter(session_factory, [0.0])
+    file_ids = [add_file(session_factory, f"{index}.pdf") for index in range(5)]
+    for file_id in file_ids:
+        reporter.report(file_id, {"parse_stage": "waiting_mineru", "progress_percent": 40})
+
+    session_factory.commits.clear()
+    assert reporter.flush() == 5
+
+    assert len(session_factory.commits) == 1
+    assert all(load(session_factory, file_id).progress_percent == 40 for file_id in file_ids)
+    assert reporter.pending_count() == 0
+
+
+def test_terminal_status_commits_immediately_and_drops_buffered_progress(session_factory):
+    reporter = make_reporter(session_factory, [0.0])
+    file_id = add_file(session_factory, "a.pdf")
+    db = session_factory()
+    file = db.get(File, file_id)
+    service = ParserService(db, mineru_api_client=object(), popo_postprocessor=object(), progress_reporter=reporter)
+
+    service._update_progress(file, "waiting_mineru", "等待 MinerU", 40)
+    assert reporter.pending_count() == 1
+
+    service._update_progress(file, "completed", "解析完成", 100, status=FileStatus.PARSED)
+
+    assert reporter.pending_count() == 0
+    stored = load(session_factory, file_id)
+    assert stored.status == FileStatus.PARSED
+    assert stored.progress_percent == 100
+    db.close()
+
+
+def test_flush_never_overwrites_terminal_status(session_factory):
+    reporter = make_reporter(session_factory, [0.0])
+    file_id = add_file(session_factory, "a.pdf", status=FileStatus.PARSE_FAILED)
+
+    reporter.report(file_id, {"parse_stage": "waiting_mineru", "progress_percent": 40})
+    reporter.flush()
+
+    stored = load(session_factory, file_id)
+    assert stored.status == FileStatus.PARSE_FAILED
+    assert stored.progress_percent is None
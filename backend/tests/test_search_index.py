@@ -0,0 +1,162 @@
+from datetime import datetime
+import io
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+from app.models.base import Base
+from app.models.enums import FileStatus
+from app.models.file import File
+from app.models.search_page import SearchPage
+from app.services.parser import ParserService
+from app.services.search_index import SearchIndexService, plain_text, split_pages
+from main import app
+
+PAGES_MD = """# Page 1
+
+采购合同的签订双方为甲方和乙方。
+
+![](http://minio/mds/contract/images/a.png)
+
+# Page 2
+
+<table><tr><td>付款期限</td><td>三十日</td></tr></table>
+
+违约责任由违约方承担。
+"""
+
+
+class FakeMinio:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_object(self, bucket, path):
+        if (bucket, path) not in self.objects:
+            raise FileNotFoundError(path)
+        return io.BytesIO(self.objects[(bucket, path)])
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def add_file(session_factory, user_id="u1", filename="contract.pdf") -> File:
+    with session_factory() as db:
+        file = File(
+            user_id=user_id,
+            filename=filename,
+            size=1,
+            status=FileStatus.PARSED,
+            upload_time=datetime.utcnow(),
+            minio_path=f"{user_id}-{filename}",
+        )
+        db.add(file)
+        db.commit()
+        db.refresh(file)
+        db.expunge(file)
+        return file
+
+
+def index(session_factory, file, objects, markdown="") -> None:
+    with session_factory() as db:
+        SearchIndexService(db, minio=FakeMinio(objects)).index_file(file, file.user_id, markdown, "mds")
+        db.commit()
+
+
+def search(session_factory, query, user_id="u1"):
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        return TestClient(app).get("/api/files/search", params={"q": query}, headers={"X-User-Id": user_id})
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_split_pages_and_plain_text_strip_images_and_tables():
+    pages = split_pages(PAGES_MD)
+
+    assert [page for page, _ in pages] == [1, 2]
+    assert plain_text(pages[0][1]) == "采购合同的签订双方为甲方和乙方。"
+    assert plain_text(pages[1][1]) == "付款期限 三十日 违约责任由违约方承担。"
+    assert split_pages("no headings") == [(None, "no headings")]
+
+
+def test_search_returns_page_numbers_and_snippets(session_factory):
+    file = add_file(session_factory)
+    index(session_factory, file, {("mds", "u1-contract_pages.md"): PAGES_MD.encode("utf-8")})
+
+    response = search(session_factory, "违约责任")
+
+    assert response.status_code == 200
+    hits = response.json()["hits"]
+    assert len(hits) == 1
+    assert hits[0]["file_id"] == file.id
+    assert hits[0]["filename"] == "contract.pdf"
+    assert hits[0]["page"] == 2
+    assert hits[0]["source"] == "pages"
+    assert "违约责任由违约方承担" in hits[0]["snippet"]
+
+
+def test_short_terms_fall_back_to_substring_match(session_factory):
+    file = add_file(session_factory)
+    index(session_factory, file, {("mds", "u1-contract_pages.md"): PAGES_MD.encode("utf-8")})
+
+    hits = search(session_factory, "甲方").json()["hits"]
+
+    assert [(hit["file_id"], hit["page"]) for hit in hits] == [(file.id, 1)]
+
+
+def test_search_is_scoped_to_user_and_falls_back_to_markdown(session_factory):
+    mine = add_file(session_factory, "u1", "mine.docx")
+    theirs = add_file(session_factory, "u2", "theirs.docx")
+    index(session_factory, mine, {}, markdown="季度财务报告摘要")
+    index(session_factory, theirs, {}, markdown="季度财务报告全文")
+
+    hits = search(session_factory, "财务报告").json()["hits"]
+
+    assert [(hit["file_id"], hit["page"], hit["source"]) for hit in hits] == [(mine.id, None, "content")]
+
+
+def test_reindex_replaces_rows_and_keeps_fts_in_sync(session_factory):
+    file = add_file(session_factory)
+    index(session_factory, file, {("mds", "u1-contract_pages.md"): PAGES_MD.encode("utf-8")})
+    index(session_factory, file, {}, markdown="重新解析后的内容")
+
+    assert search(session_factory, "违约责任").json()["hits"] == []
+    assert [hit["source"] for hit in search(session_factory, "重新解析").json()["hits"]] == ["content"]
+
+
+def test_finish_parse_indexes_pages_and_popo(session_factory, monkeypatch):
+    file = add_file(session_factory)
+    objects = {
+        ("mds", "u1-contract_pages.md"): PAGES_MD.encode("utf-8"),
+        ("mds", "u1-contract_popo.md"): "# Page 3\n\n附件清单与签章页".encode("utf-8"),
+    }
+    monkeypatch.setattr("app.services.parser.minio_client", FakeMinio(objects))
+    monkeypatch.setattr("app.services.parser.get_buckets", lambda: ["mds"])
+
+    with session_factory() as db:
+        db_file = db.get(File, file.id)
+        ParserService(db)._finish_parse(db_file, "u1", "# 采购合同", "settings")
+        sources = sorted((row.source, row.page) for row in db.query(SearchPage).all())
+
+    assert sources == [("pages", 1), ("pages", 2), ("popo", 3)]
+    assert search(session_factory, "签章页").json()["hits"][0]["page"] == 3
@@ -0,0 +1,147 @@
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+from app.models.base import Base
+from app.models.user import User
+from app.services.auth import SessionCache, session_cache
+from main import app
+
+
+@pytest.fixture()
+def auth_env():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    testing_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def override_get_db():
+        db = testing_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        response = client.post("/api/auth/register", json={"email": "ada@example.com", "password": "secret123"})
+        assert response.status_code == 200
+        yield client, testing_session, statements
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+def user_queries(statements):
+    return [statement for statement in statements if "FROM users" in statement]
+
+
+def test_cached_session_skips_user_lookup(auth_env):
+    client, _, statements = auth_env
+
+    assert client.get("/api/files").status_code == 200
+    statements.clear()
+    assert client.get("/api/files").status_code == 200
+
+    assert user_queries(statements) == []
+
+
+def test_get_user_id_checks_user_once_then_uses_cache(auth_env):
+    client, _, statements = auth_env
+    session_cache.clear()
+    statements.clear()
+
+    assert client.get("/api/files").status_code == 200
+    assert len(user_queries(statements)) == 1
+    statements.clear()
+    assert client.get("/api/files").status_code == 200
+    assert user_queries(statements) == []
+
+
+def test_get_current_user_selects_user_once_then_uses_cache(auth_env):
+    client, _, statements = auth_env
+    session_cache.clear()
+    statements.clear()
+
+    first = client.get("/api/auth/me")
+    assert first.status_code == 200
+    assert len(user_queries(statements)) == 1
+    statements.clear()
+
+    second = client.get("/api/auth/me")
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert user_queries(statements) == []
+
+
+def test_logout_evicts_cached_session(auth_env):
+    client, _, _ = auth_env
+    token = client.cookies.get("mineru_session")
+    client.get("/api/files")
+    assert session_cache.get(token) is not None
+
+    client.post("/api/auth/logout")
+
+    assert session_cache.get(token) is None
+
+
+def test_deleting_user_evicts_cached_sessions(auth_env):
+    client, testing_session, _ = auth_env
+    token = client.cookies.get("mineru_session")
+    assert client.get("/api/files").status_code == 200
+
+    with testing_session() as db:
+        db.delete(db.query(User).one())
+        db.commit()
+
+    assert session_cache.get(token) is None
+    assert client.get("/api/files").status_code == 401
+
+
+def test_updating_user_evicts_cached_sessions(auth_env):
+    client, testing_session, _ = auth_env
+    token = client.cookies.get("mineru_session")
+    client.get("/api/files")
+
+    with testing_session() as db:
+        db.query(User).one().password_hash = "changed"
+        db.commit()
+
+    assert session_cache.get(token) is None
+
+
+def test_session_cache_expires_entries_and_evicts_least_recent():
+    now = [1000.0]
+    cache = SessionCache(ttl_seconds=60, max_entries=2, clock=lambda: now[0])
+
+    cache.put("a", {"sub": "1", "exp": 2000})
+    cache.put("b", {"sub": "2", "exp": 1010})
+    cache.get("a")
+    cache.put("c", {"sub": "3", "exp": 2000})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sub": "1", "exp": 2000}
+
+    now[0] = 1061
+    assert cache.get("a") is None
+    assert cache.get("c") is None
+
+
+def test_session_cache_respects_token_expiry():
+    now = [1000.0]
+    cache = SessionCache(ttl_seconds=60, max_entries=10, clock=lambda: now[0])
+    cache.put("a", {"sub": "1", "exp": 1010})
+
+    now[0] = 1010
+    assert cache.get("a") is None
@@ -0,0 +1,144 @@
+from types import SimpleNamespace
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.models.file import File as FileModel
+from app.services.source_lookup import PageGrid, SourceLookup
+from main import app
+
+SOURCE_MAP = {
+    "pages": [
+        {
+            "page": 1,
+            "page_idx": 0,
+            "width": 600,
+            "height": 800,
+            "blocks": [
+                {"id": "p1-b1", "type": "title", "text": "采购合同 Purchase Agreement", "bbox": [50, 40, 550, 80]},
+                {
+                    "id": "p1-b2",
+                    "type": "text",
+                    "text": "The buyer shall pay the full contract price within thirty days after delivery.",
+                    "bbox": [50, 100, 550, 300],
+                },
+                {"id": "p1-b3", "type": "table", "text": "付款期限 三十日", "bbox": [300, 200, 500, 280]},
+                {"id": "p1-b4", "type": "text", "text": "1", "bbox": [290, 760, 310, 780]},
+            ],
+        },
+        {
+            "page": 2,
+            "page_idx": 1,
+            "width": 600,
+            "height": 800,
+            "blocks": [
+                {
+                    "id": "p2-b1",
+                    "type": "text",
+                    "text": "Either party may terminate this agreement with written notice.",
+                    "bbox": [50, 100, 550, 160],
+                }
+            ],
+        },
+    ]
+}
+
+
+class FakeQuery:
+    def __init__(self, item):
+        self.item = item
+
+    def filter(self, *args, **kwargs):
+        return self
+
+    def first(self):
+        return self.item
+
+
+class FakeDb:
+    def __init__(self, file):
+        self.file = file
+
+    def query(self, model):
+        return FakeQuery(self.file if model is FileModel else None)
+
+
+class FakeMinio:
+    def __init__(self, objects):
+        self.objects = objects
+        self.metadata = {}
+        self.get_calls = []
+
+    def stat_object(self, bucket, path):
+        if (bucket, path) not in self.objects:
+            raise FileNotFoundError(path)
+        content = self.objects[(bucket, path)]
+        return SimpleNamespace(etag=str(hash(content)), metadata=self.metadata.get((bucket, path), {}))
+
+    def get_object(self, bucket, path, offset=0, length=0):
+        self.get_calls.append(path)
+        if (bucket, path) not in self.objects:
+            raise FileNotFoundError(path)
+        return io.BytesIO(self.objects[(bucket, path)])
+
+    def put_object(self, bucket, path, data, length, content_type=None, metadata=None):
+        self.objects[(bucket, path)] = data.read()
+        self.metadata[(bucket, path)] = metadata or {}
+
+
+def test_grid_hit_returns_innermost_block_first():
+    grid = PageGrid(SOURCE_MAP["pages"][0], size=4)
+
+    assert [block["id"] for block in grid.hit(400, 250)] == ["p1-b3", "p1-b2"]
+    assert [block["id"] for block in grid.hit(100, 90)] == []
+    assert [block["id"] for block in grid.hit(300, 770)] == ["p1-b4"]
+
+
+def test_trace_matches_spans_across_and_inside_blocks():
+    lookup = SourceLookup(SOURCE_MAP)
+
+    spanning = lookup.trace("# 采购合同 Purchase Agreement\n\nThe buyer shall pay the full contract price")
+    inside = lookup.trace("pay the **full contract price** within thirty days")
+
+    assert [(block["page"], block["id"]) for block in spanning] == [(1, "p1-b1"), (1, "p1-b2")]
+    assert [block["id"] for block in inside] == ["p1-b2"]
+    assert lookup.trace("付款期限：三十日")[0]["id"] == "p1-b3"
+    assert lookup.trace("terminate this agreement with written notice", page=1) == []
+    assert lookup.trace("1") == [dict(SOURCE_MAP["pages"][0]["blocks"][3], page=1, matched_chars=1)]
+    assert lookup.trace("section 1 of the annex") == []
+
+
+def test_hit_and_trace_endpoints_use_cached_lookup(monkeypatch):
+    fake_file = SimpleNamespace(id=3, user_id="u1", filename="sample.pdf", minio_path="uploads/sample.pdf")
+    middle = {
+        "pdf_info": [
+            {
+                "page_idx": 0,
+                "page_size": [600, 800],
+                "para_blocks": [{"type": "text", "bbox": [10, 20, 200, 60], "text": "Hello MinerU source lookup"}],
+            }
+        ]
+    }
+    fake_minio = FakeMinio({("mds", "sample/auto/sample_middle.json"): json.dumps(middle).encode("utf-8")})
+    monkeypatch.setattr("app.api.parsed.get_buckets", lambda: ["mds"])
+    monkeypatch.setattr("app.api.parsed.minio_client", fake_minio)
+    app.dependency_overrides[get_db] = lambda: FakeDb(fake_file)
+
+    try:
+        client = TestClient(app)
+        hit = client.get("/api/files/3/source_map/hit", params={"page": 1, "x": 50, "y": 30}, headers={"X-User-Id": "u1"})
+        miss = client.get("/api/files/3/source_map/hit", params={"page": 1, "x": 500, "y": 30}, headers={"X-User-Id": "u1"})
+        trace = client.post(
+            "/api/files/3/source_map/trace",
+            json={"text": "Hello, MinerU source lookup!"},
+            headers={"X-User-Id": "u1"},
+        )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert fake_minio.get_calls == ["sample/auto/sample_middle.json"]
+    assert [block["id"] for block in hit.json()["blocks"]] == ["p1-b1"]
+    assert miss.json() == {"blocks": []}
+    assert [(block["id"], block["matched_chars"]) for block in trace.json()["blocks"]] == [("p1-b1", 23)]
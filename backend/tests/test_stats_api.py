@@ -2,7 +2,7 @@ from datetime import date, datetime
 
 from fastapi.testclient import TestClient
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -10,6 +10,7 @@ from app.database import get_db
 from app.models.base import Base
 from app.models.enums import FileStatus
 from app.models.file import File
+from app.services.stats import StatsService
 from main import app
 
 
@@ -75,8 +76,101 @@ def test_stats_are_scoped_to_authenticated_user(client_and_session):
     response = client.get("/api/stats")
 
     assert response.status_code == 200
-    assert response.json() == {
+    body = response.json()
+    assert {key: body[key] for key in ("totalFiles", "todayUploads", "usedSpace", "parsedFiles")} == {
         "totalFiles": 1,
         "todayUploads": 1,
         "usedSpace": 1.0,
+        "parsedFiles": 1,
     }
+
+
+def add_file(testing_session, user_id="u1", size=1024, status=FileStatus.PENDING) -> int:
+    with testing_session() as db:
+        file = File(
+            user_id=user_id,
+            filename="a.pdf",
+            size=size,
+            status=status,
+            upload_time=datetime.utcnow(),
+            minio_path="a.pdf",
+        )
+        db.add(file)
+        db.commit()
+        return file.id
+
+
+def get_stats(client, user_id="u1"):
+    return client.get("/api/stats", headers={"X-User-Id": user_id}).json()
+
+
+def test_counters_follow_parse_transitions_and_deletes(client_and_session):
+    client, testing_session = client_and_session
+    parsed_id = add_file(testing_session, size=2048)
+    failed_id = add_file(testing_session, size=1024)
+
+    with testing_session() as db:
+        parsed = db.get(File, parsed_id)
+        parsed.status = FileStatus.PARSING
+        parsed.start_at = datetime(2026, 10, 18, 8, 0, 0)
+        db.commit()
+        parsed.status = FileStatus.PARSED
+        parsed.finish_at = datetime(2026, 10, 18, 8, 0, 30)
+        parsed.page_count = 12
+        db.get(File, failed_id).status = FileStatus.PARSE_FAILED
+        db.commit()
+
+    stats = get_stats(client)
+    assert stats["totalFiles"] == 2
+    assert stats["parsedFiles"] == 1
+    assert stats["failedFiles"] == 1
+    assert stats["failureRate"] == 0.5
+    assert stats["pagesParsed"] == 12
+    assert stats["parseSeconds"] == 30.0
+    assert stats["daily"][-1]["uploads"] == 2
+
+    with testing_session() as db:
+        db.delete(db.get(File, failed_id))
+        db.commit()
+
+    stats = get_stats(client)
+    assert stats["totalFiles"] == 1
+    assert stats["failedFiles"] == 0
+    assert stats["usedSpace"] == round(2048 / (1024 * 1024), 2)
+
+
+def test_stats_read_counters_without_scanning_files(client_and_session):
+    client, testing_session = client_and_session
+    add_file(testing_session)
+    get_stats(client)
+    engine = testing_session.kw["bind"]
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        get_stats(client)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert not [statement for statement in statements if "FROM files" in statement]
+
+
+def test_reconcile_corrects_drift_from_bulk_deletes(client_and_session):
+    client, testing_session = client_and_session
+    add_file(testing_session)
+    add_file(testing_session)
+    with testing_session() as db:
+        # 批量删除不触发映射事件，计数会偏离
+        db.execute(File.__table__.delete())
+        db.commit()
+    assert get_stats(client)["totalFiles"] == 2
+
+    with testing_session() as db:
+        assert StatsService(db).reconcile_all() == 1
+
+    stats = get_stats(client)
+    assert stats["totalFiles"] == 0
+    assert stats["daily"][-1]["uploads"] == 0
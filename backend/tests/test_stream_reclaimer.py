@@ -0,0 +1,231 @@
+import json
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import files as files_api
+from app.database import get_db
+from app.models.base import Base
+from app.models.enums import FileStatus
+from app.models.file import File
+from app.services import stream_reclaimer
+from app.services.parse_scheduler import StreamMessage
+from app.services.parser import DEAD_LETTER_STREAM, PARSER_STREAM
+from app.services.stream_reclaimer import StaleMessageReclaimer
+from main import app
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+class FakeStreamRedis:
+    def __init__(self, entries, messages):
+        self.entries = entries
+        self.messages = messages
+        self.client = object()
+        self.touched = []
+        self.claimed = []
+        self.acked = []
+        self.dead_letters = []
+        self.dead_letter_reads = 0
+
+    def touch_messages(self, stream, group, consumer, message_ids):
+        self.touched.append((stream, consumer, message_ids))
+
+    def pending_entries(self, stream, group, min_idle_ms, count=100):
+        return self.entries if stream == PARSER_STREAM else []
+
+    def read_message(self, stream, message_id):
+        return self.messages.get(message_id)
+
+    def claim_messages(self, stream, group, consumer, min_idle_ms, message_ids):
+        self.claimed.extend(message_ids)
+        return [(message_id, self.messages[message_id]) for message_id in message_ids]
+
+    def ack_message(self, stream, group, message_id, user_id=None):
+        self.acked.append(message_id)
+
+    def dead_letter(self, stream, group, dead_letter_stream, message_id, fields, maxlen=10000, user_id=None):
+        self.dead_letters.append((dead_letter_stream, fields))
+        self.acked.append(message_id)
+
+    def read_dead_letters(self, dead_letter_stream, count=100, before=None):
+        self.dead_letter_reads += 1
+        entries = [(index, fields) for index, (_, fields) in enumerate(self.dead_letters)]
+        if before is not None:
+            entries = [(index, fields) for index, fields in entries if index < int(before.split("-")[0])]
+        return [(f"{index}-0".encode(), fields) for index, fields in reversed(entries)][:count]
+
+
+def add_file(session_factory, status=FileStatus.PARSING, heartbeat_age=None, user_id="u1") -> int:
+    with session_factory() as db:
+        file = File(
+            user_id=user_id,
+            filename="a.pdf",
+            size=1,
+            status=status,
+            upload_time=datetime.utcnow(),
+            minio_path="a.pdf",
+            last_heartbeat_at=datetime.now() - heartbeat_age if heartbeat_age is not None else None,
+        )
+        db.add(file)
+        db.commit()
+        return file.id
+
+
+def entry(message_id: bytes, times_delivered=1) -> dict:
+    return {
+        "message_id": message_id,
+        "consumer": b"worker_dead",
+        "time_since_delivered": 600_000,
+        "times_delivered": times_delivered,
+    }
+
+
+def message(file_id: int, user_id="u1") -> dict:
+    return {b"data": json.dumps({"file_id": file_id, "user_id": user_id}).encode("utf-8")}
+
+
+def make_reclaimer(session_factory, now=None):
+    now = now or [100.0]
+    return StaleMessageReclaimer(
+        "worker_me",
+        idle_seconds=300,
+        max_deliveries=3,
+        interval_seconds=30,
+        clock=lambda: now[0],
+        session_context=session_factory,
+    )
+
+
+def test_reclaim_claims_stale_message_and_skips_live_heartbeat(session_factory):
+    stale_id = add_file(session_factory, heartbeat_age=timedelta(minutes=20))
+    live_id = add_file(session_factory, heartbeat_age=timedelta(seconds=10))
+    redis = FakeStreamRedis(
+        [entry(b"1-0"), entry(b"2-0")],
+        {b"1-0": message(stale_id), b"2-0": message(live_id)},
+    )
+
+    claimed = make_reclaimer(session_factory).reclaim(redis, limit=5)
+
+    assert [ref for ref, _ in claimed] == [StreamMessage(PARSER_STREAM, b"1-0")]
+    assert redis.claimed == [b"1-0"]
+    assert redis.acked == []
+
+
+def test_reclaim_acks_messages_whose_file_already_finished(session_factory):
+    parsed_id = add_file(session_factory, status=FileStatus.PARSED)
+    redis = FakeStreamRedis([entry(b"1-0"), entry(b"2-0")], {b"1-0": message(parsed_id)})
+
+    assert make_reclaimer(session_factory).reclaim(redis, limit=5) == []
+    assert redis.acked == [b"1-0", b"2-0"]
+
+
+def test_reclaim_moves_message_to_dead_letter_after_max_deliveries(session_factory):
+    file_id = add_file(session_factory, heartbeat_age=timedelta(minutes=20))
+    redis = FakeStreamRedis([entry(b"1-0", times_delivered=3)], {b"1-0": message(file_id)})
+
+    assert make_reclaimer(session_factory).reclaim(redis, limit=5) == []
+
+    stream, fields = redis.dead_letters[0]
+    assert stream == DEAD_LETTER_STREAM
+    assert fields[b"original_id"] == b"1-0"
+    assert fields[b"deliveries"] == "3"
+    assert redis.acked == [b"1-0"]
+    with session_factory() as db:
+        file = db.get(File, file_id)
+        assert file.status == FileStatus.PARSE_FAILED
+        assert file.error_message == stream_reclaimer.DEAD_LETTER_REASON
+
+
+def test_maybe_reclaim_runs_on_interval_and_touches_owned_messages(session_factory):
+    now = [100.0]
+    reclaimer = make_reclaimer(session_factory, now)
+    redis = FakeStreamRedis([], {})
+
+    owned = [StreamMessage(PARSER_STREAM, b"9-0"), StreamMessage("file_parser_stream:bulk", b"3-0")]
+
+    assert reclaimer.maybe_reclaim(redis, owned, limit=1) == []
+    assert redis.touched == []
+
+    now[0] = 131.0
+    reclaimer.maybe_reclaim(redis, owned, limit=1)
+    assert redis.touched == [
+        (PARSER_STREAM, "worker_me", [b"9-0"]),
+        ("file_parser_stream:bulk", "worker_me", [b"3-0"]),
+    ]
+
+
+def test_dead_letters_endpoint_lists_only_current_user(session_factory, monkeypatch):
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        response = client.post("/api/auth/register", json={"email": "ada@example.com", "password": "secret123"})
+        user_id = str(response.json()["user"]["id"])
+        redis = FakeStreamRedis([], {})
+        redis.dead_letters = [
+            (DEAD_LETTER_STREAM, {b"data": message(5, user_id)[b"data"], b"deliveries": b"3", b"reason": b"x"}),
+            (DEAD_LETTER_STREAM, {b"data": message(6, "other")[b"data"], b"deliveries": b"3"}),
+        ]
+        monkeypatch.setattr(files_api, "redis_client", redis)
+
+        response = client.get("/api/files/dead-letters")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["file_id"] for item in items] == [5]
+    assert items[0]["deliveries"] == 3
+
+
+def test_dead_letters_endpoint_pages_past_other_users_entries(session_factory, monkeypatch):
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        response = client.post("/api/auth/register", json={"email": "ada@example.com", "password": "secret123"})
+        user_id = str(response.json()["user"]["id"])
+        redis = FakeStreamRedis([], {})
+        # 当前用户的三条死信被其他用户更新的大量死信压在后面
+        own = [(DEAD_LETTER_STREAM, {b"data": message(file_id, user_id)[b"data"]}) for file_id in (1, 2, 3)]
+        others = [(DEAD_LETTER_STREAM, {b"data": message(99, "other")[b"data"]}) for _ in range(450)]
+        redis.dead_letters = own + others
+        monkeypatch.setattr(files_api, "redis_client", redis)
+        monkeypatch.setattr(files_api, "DEAD_LETTER_SCAN_BATCH", 100)
+
+        first = client.get("/api/files/dead-letters", params={"limit": 2}).json()
+        second = client.get("/api/files/dead-letters", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [item["file_id"] for item in first["items"]] == [3, 2]
+    assert first["next_cursor"] == "1-0"
+    assert [item["file_id"] for item in second["items"]] == [1]
+    assert second["next_cursor"] is None
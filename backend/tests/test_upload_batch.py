@@ -0,0 +1,173 @@
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+import httpx
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import get_db
+from app.models.base import Base
+from app.models.enums import FileStatus
+from app.models.file import File
+from app.services.auth import AUTH_COOKIE_NAME
+from app.services.parser import PARSE_USER_LANE_LIMIT, ParserService
+from main import app
+
+
+class PipelineRedis:
+    def __init__(self):
+        self.calls = []
+        self.admissions = []
+
+    def admit_tasks(self, stream, user_id, tasks, limit):
+        self.calls.append((stream, tasks))
+        self.admissions.append((user_id, limit))
+        return len(tasks)
+
+
+@pytest.fixture()
+def client_and_session():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    testing_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = testing_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        client.post("/api/auth/register", json={"email": "ada@example.com", "password": "secret123"})
+        yield client, testing_session, engine
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_batch_upload_reports_per_file_failures(client_and_session, monkeypatch):
+    client, testing_session, _ = client_and_session
+    fake_redis = PipelineRedis()
+
+    def fake_upload(reader, filename, content_type=None):
+        if reader.file_obj.read(4) == b"FAIL":
+            raise RuntimeError("minio unavailable")
+        reader.read()
+
+    monkeypatch.setattr("app.api.upload.upload_file", fake_upload)
+    monkeypatch.setattr("app.services.parser.redis_client", fake_redis)
+
+    response = client.post(
+        "/api/upload",
+        files=[
+            ("files", ("a.pdf", b"%PDF-a", "application/pdf")),
+            ("files", ("b.pdf", b"FAIL", "application/pdf")),
+            ("files", ("c.pdf", b"%PDF-c", "application/pdf")),
+        ],
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["success"], body["failed"]) == (3, 2, 1)
+    assert [item["filename"] for item in body["files"]] == ["a.pdf", "b.pdf", "c.pdf"]
+    assert body["files"][1]["status"] == "failed"
+    assert "minio unavailable" in body["files"][1]["error_message"]
+    assert body["files"][0]["status"] == "pending"
+
+    assert len(fake_redis.calls) == 1
+    stream, tasks = fake_redis.calls[0]
+    assert stream == "file_parser_stream"
+    assert [task["file_id"] for task in tasks] == [body["files"][0]["id"], body["files"][2]["id"]]
+    with testing_session() as db:
+        assert db.query(File).count() == 2
+        assert {file.parse_stage for file in db.query(File)} == {"queued"}
+
+
+def test_queue_parse_files_commits_once_and_publishes_one_pipeline(client_and_session, monkeypatch):
+    _, testing_session, engine = client_and_session
+    fake_redis = PipelineRedis()
+    monkeypatch.setattr("app.services.parser.redis_client", fake_redis)
+    with testing_session() as db:
+        files = [
+            File(user_id="u1", filename=f"{index}.pdf", size=1, status=FileStatus.PARSE_FAILED, minio_path=f"{index}.pdf")
+            for index in range(5)
+        ]
+        db.add_all(files)
+        db.commit()
+        db.query(File).all()
+
+        commits = []
+        event.listen(engine, "commit", lambda connection: commits.append(1))
+        ParserService(db, mineru_api_client=object()).queue_parse_files(files, "u1", lane="bulk")
+
+    assert len(commits) == 1
+    assert len(fake_redis.calls) == 1
+    assert fake_redis.calls[0][0] == "file_parser_stream:bulk"
+    assert len(fake_redis.calls[0][1]) == 5
+    assert fake_redis.admissions == [("u1", PARSE_USER_LANE_LIMIT)]
+
+
+def test_file_list_is_served_while_an_upload_blocks_on_minio(client_and_session, monkeypatch):
+    client, _, _ = client_and_session
+    release = threading.Event()
+    entered = threading.Event()
+
+    def blocking_upload(reader, filename, content_type=None):
+        entered.set()
+        release.wait(timeout=5)
+        reader.read()
+
+    monkeypatch.setattr("app.api.upload.upload_file", blocking_upload)
+    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_files", lambda self, *args, **kwargs: self.db.commit())
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {client.cookies.get(AUTH_COOKIE_NAME)}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as http:
+            upload = asyncio.create_task(
+                http.post("/api/upload", files={"files": ("a.pdf", b"%PDF", "application/pdf")})
+            )
+            for _ in range(200):
+                if entered.is_set() or upload.done():
+                    break
+                await asyncio.sleep(0.01)
+            assert entered.is_set()
+            listing = await asyncio.wait_for(http.get("/api/files", params={"page": 1, "page_size": 20}), timeout=2)
+            still_uploading = not upload.done()
+            release.set()
+            return listing, still_uploading, await upload
+
+    listing, still_uploading, upload = asyncio.run(scenario())
+
+    assert listing.status_code == 200
+    assert still_uploading
+    assert upload.status_code == 200
+
+
+def test_upload_registers_and_queues_files_in_one_commit(client_and_session, monkeypatch):
+    client, testing_session, engine = client_and_session
+    fake_redis = PipelineRedis()
+    monkeypatch.setattr("app.api.upload.upload_file", lambda reader, *args, **kwargs: reader.read())
+    monkeypatch.setattr("app.services.parser.redis_client", fake_redis)
+    commits = []
+    event.listen(engine, "commit", lambda connection: commits.append(1))
+
+    response = client.post(
+        "/api/upload",
+        files=[("files", (f"{index}.pdf", b"%PDF", "application/pdf")) for index in range(3)],
+    )
+
+    assert response.status_code == 200
+    assert len(commits) == 1
+    assert len(fake_redis.calls[0][1]) == 3
+    with testing_session() as db:
+        assert {file.parse_stage for file in db.query(File)} == {"queued"}
@@ -0,0 +1,196 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+import pytest
+from minio.datatypes import Part
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import upload as upload_api
+from app.database import get_db
+from app.models.base import Base
+from app.models.file import File
+from app.models.upload_session import UploadSession
+from main import app
+
+MIB = 1024 * 1024
+
+
+class FakeMultipartStore:
+    def __init__(self):
+        self.uploads = {}
+        self.completed = []
+        self.aborted = []
+        self.objects = {}
+
+    def create(self, minio_path, content_type=None):
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {"path": minio_path, "parts": {}}
+        return upload_id
+
+    def url(self, minio_path, upload_id, part_number, expires=3600):
+        return f"http://minio:9000/mineru-files/{minio_path}?uploadId={upload_id}&partNumber={part_number}"
+
+    def put_part(self, upload_id, part_number, size):
+        self.uploads[upload_id]["parts"][part_number] = size
+
+    def list_parts(self, minio_path, upload_id):
+        return [
+            Part(number, f"etag-{number}", size=size)
+            for number, size in self.uploads[upload_id]["parts"].items()
+        ]
+
+    def complete(self, minio_path, upload_id, parts):
+        self.completed.append((minio_path, [part.part_number for part in parts]))
+        self.objects[minio_path] = sum(part.size for part in parts)
+        # 合并后 MinIO 中的 upload_id 失效
+        del self.uploads[upload_id]
+
+    def stat(self, minio_path):
+        if minio_path not in self.objects:
+            return None
+        return SimpleNamespace(size=self.objects[minio_path], content_type="application/pdf")
+
+    def abort(self, minio_path, upload_id):
+        self.aborted.append(upload_id)
+
+
+@pytest.fixture()
+def client_and_store(monkeypatch):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    testing_session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = testing_session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    store = FakeMultipartStore()
+    monkeypatch.setattr(upload_api, "create_multipart_upload", store.create)
+    monkeypatch.setattr(upload_api, "presigned_upload_part_url", store.url)
+    monkeypatch.setattr(upload_api, "list_uploaded_parts", store.list_parts)
+    monkeypatch.setattr(upload_api, "complete_multipart_upload", store.complete)
+    monkeypatch.setattr(upload_api, "stat_uploaded_object", store.stat)
+    monkeypatch.setattr(upload_api, "abort_multipart_upload", store.abort)
+    monkeypatch.setattr(upload_api, "UPLOAD_PART_SIZE", 16 * MIB)
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        client.post("/api/auth/register", json={"email": "ada@example.com", "password": "secret123"})
+        yield client, store, testing_session
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_create_session_returns_presigned_part_urls(client_and_store):
+    client, store, _ = client_and_store
+
+    response = client.post("/api/upload/sessions", json={"filename": "scan.pdf", "size": 40 * MIB})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["part_size"] == 16 * MIB
+    assert body["part_count"] == 3
+    assert body["uploaded_parts"] == []
+    assert [part["part_number"] for part in body["parts"]] == [1, 2, 3]
+    assert "uploadId=upload-1" in body["parts"][0]["url"]
+
+
+def test_resume_lists_only_missing_parts(client_and_store):
+    client, store, _ = client_and_store
+    session = client.post("/api/upload/sessions", json={"filename": "scan.pdf", "size": 40 * MIB}).json()
+    store.put_part("upload-1", 1, 16 * MIB)
+
+    body = client.get(f"/api/upload/sessions/{session['id']}").json()
+
+    assert body["uploaded_parts"] == [1]
+    assert [part["part_number"] for part in body["parts"]] == [2, 3]
+
+
+def test_complete_rejects_missing_parts(client_and_store):
+    client, store, _ = client_and_store
+    session = client.post("/api/upload/sessions", json={"filename": "scan.pdf", "size": 40 * MIB}).json()
+    store.put_part("upload-1", 1, 16 * MIB)
+
+    response = client.post(f"/api/upload/sessions/{session['id']}/complete")
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["missing_parts"] == [2, 3]
+    assert store.completed == []
+
+
+def test_complete_registers_file_and_queues_parse(client_and_store, monkeypatch):
+    client, store, testing_session = client_and_store
+    queued = []
+
+    def queue_parse_files(self, files, user_id, lane="interactive", **kwargs):
+        self.db.commit()
+        queued.extend((file.id, lane) for file in files)
+
+    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_files", queue_parse_files)
+    session = client.post(
+        "/api/upload/sessions",
+        json={"filename": "scan.pdf", "size": 40 * MIB, "content_type": "application/pdf"},
+    ).json()
+    for number, size in ((1, 16 * MIB), (2, 16 * MIB), (3, 8 * MIB)):
+        store.put_part("upload-1", number, size)
+
+    response = client.post(f"/api/upload/sessions/{session['id']}/complete")
+
+    assert response.status_code == 200
+    uploaded = response.json()
+    assert uploaded["filename"] == "scan.pdf"
+    assert uploaded["size"] == 40 * MIB
+    assert uploaded["status"] == "pending"
+    assert queued == [(uploaded["id"], "interactive")]
+    assert store.completed == [(uploaded["minio_path"], [1, 2, 3])]
+    with testing_session() as db:
+        assert db.query(UploadSession).count() == 0
+        assert db.query(File).one().content_type == "application/pdf"
+
+
+def test_complete_retry_registers_already_merged_object(client_and_store, monkeypatch):
+    client, store, testing_session = client_and_store
+    monkeypatch.setattr("app.services.parser.ParserService.queue_parse_files", lambda self, *args, **kwargs: self.db.commit())
+    register_files = upload_api._register_files
+    calls = []
+
+    def flaky_register(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return register_files(*args, **kwargs)
+
+    monkeypatch.setattr(upload_api, "_register_files", flaky_register)
+    session = client.post("/api/upload/sessions", json={"filename": "scan.pdf", "size": 40 * MIB}).json()
+    for number, size in ((1, 16 * MIB), (2, 16 * MIB), (3, 8 * MIB)):
+        store.put_part("upload-1", number, size)
+
+    failed = client.post(f"/api/upload/sessions/{session['id']}/complete")
+    retried = client.post(f"/api/upload/sessions/{session['id']}/complete")
+
+    assert failed.status_code == 500
+    assert retried.status_code == 200
+    assert len(store.completed) == 1
+    with testing_session() as db:
+        assert db.query(UploadSession).count() == 0
+        assert db.query(File).one().minio_path == store.completed[0][0]
+
+
+def test_abort_session_removes_multipart_upload(client_and_store):
+    client, store, testing_session = client_and_store
+    session = client.post("/api/upload/sessions", json={"filename": "scan.pdf", "size": MIB}).json()
+
+    response = client.delete(f"/api/upload/sessions/{session['id']}")
+
+    assert response.status_code == 200
+    assert store.aborted == ["upload-1"]
+    assert client.get(f"/api/upload/sessions/{session['id']}").status_code == 404
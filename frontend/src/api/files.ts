@@ -1,6 +1,7 @@
+import axios from 'axios'
 import api from './index'
 import type { AxiosProgressEvent } from 'axios'
-import type { FileItem, ExportFormat, FolderItem, MarkdownVariant, PopoStatus, PopoTreeNode, SourceMap } from '@/types/file'
+import type { ContentSearchHit, FileItem, ExportFormat, FolderItem, MarkdownVariant, PopoStatus, PopoTreeNode, SourceBlockMatch, SourceMap } from '@/types/file'
 
 // 文件列表参数
 export interface FileListParams {
@@ -9,18 +10,21 @@ export interface FileListParams {
   search?: string
   status?: string
   folder_id?: string
+  // 上一页返回的 next_cursor，传入后后端按游标分页并忽略 page
+  cursor?: string
 }
 
 // 文件列表响应
 export interface FileListResponse {
   files: FileItem[]
   total: number
+  next_cursor?: string | null
 }
 
 export interface UploadResponse {
   total: number
-  success?: number
-  failed?: number
+  success: number
+  failed: number
   files: Array<{
     id?: string
     filename: string
@@ -30,6 +34,29 @@ export interface UploadResponse {
   }>
 }
 
+export interface UploadSessionResponse {
+  id: string
+  filename: string
+  size: number
+  part_size: number
+  part_count: number
+  uploaded_parts: number[]
+  parts: Array<{
+    part_number: number
+    url: string
+  }>
+}
+
+// 超过该大小的文件走分片上传，分片直接 PUT 到 MinIO，断线后可续传
+export const CHUNKED_UPLOAD_THRESHOLD = 64 * 1024 * 1024
+
+const uploadSessionKey = (file: File) => `upload_session:${file.name}:${file.size}:${file.lastModified}`
+
+export interface ContentSearchResponse {
+  query: string
+  hits: ContentSearchHit[]
+}
+
 export interface ExportResponse {
   status: string
   download_url: string
@@ -54,6 +81,14 @@ export const filesApi = {
       .then(res => res.data)
   },
 
+  /**
+   * 按解析内容全文检索，返回命中页和摘要
+   */
+  searchContent(q: string, limit = 20) {
+    return api.get<ContentSearchResponse>('/files/search', { params: { q, limit } })
+      .then(res => res.data)
+  },
+
   /**
    * 获取文件夹列表
    */
@@ -108,6 +143,89 @@ export const filesApi = {
     }).then(res => res.data)
   },
 
+  /**
+   * 直传上传：先获取预签名 URL，浏览器直接 PUT 到 MinIO，再通知后端登记
+   */
+  async uploadDirect(files: File[], folderId?: string, onProgress?: (loaded: number) => void) {
+    const { data } = await api.post<{ uploads: Array<{ filename: string, url: string, upload_token: string }> }>(
+      '/upload/presign',
+      {
+        files: files.map(file => ({ filename: file.name, size: file.size, content_type: file.type || null })),
+        folder_id: folderId ? Number(folderId) : null
+      }
+    )
+    const loadedByFile = files.map(() => 0)
+    await Promise.all(data.uploads.map((upload, index) => (
+      axios.put(upload.url, files[index], {
+        headers: { 'Content-Type': files[index].type || 'application/octet-stream' },
+        onUploadProgress: (progressEvent: AxiosProgressEvent) => {
+          loadedByFile[index] = progressEvent.loaded
+          onProgress?.(loadedByFile.reduce((sum, loaded) => sum + loaded, 0))
+        }
+      })
+    )))
+    return api.post<UploadResponse>('/upload/complete', {
+      upload_tokens: data.uploads.map(upload => upload.upload_token)
+    }).then(res => res.data)
+  },
+
+  createUploadSession(file: File, folderId?: string) {
+    return api.post<UploadSessionResponse>('/upload/sessions', {
+      filename: file.name,
+      size: file.size,
+      content_type: file.type || null,
+      folder_id: folderId ? Number(folderId) : null
+    }).then(res => res.data)
+  },
+
+  getUploadSession(sessionId: string) {
+    return api.get<UploadSessionResponse>(`/upload/sessions/${sessionId}`)
+      .then(res => res.data)
+  },
+
+  completeUploadSession(sessionId: string) {
+    return api.post<UploadResponse['files'][number]>(`/upload/sessions/${sessionId}/complete`)
+      .then(res => res.data)
+  },
+
+  /**
+   * 分片上传大文件，已上传的分片在重试时跳过
+   */
+  async uploadLargeFile(file: File, folderId?: string, onProgress?: (loaded: number) => void) {
+    const key = uploadSessionKey(file)
+    let session: UploadSessionResponse | null = null
+    const savedId = localStorage.getItem(key)
+    if (savedId) {
+      session = await this.getUploadSession(savedId).catch(() => null)
+    }
+    if (!session) {
+      session = await this.createUploadSession(file, folderId)
+      localStorage.setItem(key, session.id)
+    }
+
+    let loaded = session.uploaded_parts.reduce((sum, number) => (
+      sum + Math.min(session!.part_size, file.size - (number - 1) * session!.part_size)
+    ), 0)
+    onProgress?.(loaded)
+    for (const part of session.parts) {
+      const start = (part.part_number - 1) * session.part_size
+      const blob = file.slice(start, Math.min(start + session.part_size, file.size))
+      let partLoaded = 0
+      await axios.put(part.url, blob, {
+        onUploadProgress: (progressEvent: AxiosProgressEvent) => {
+          partLoaded = progressEvent.loaded
+          onProgress?.(loaded + partLoaded)
+        }
+      })
+      loaded += blob.size
+      onProgress?.(loaded)
+    }
+
+    const uploaded = await this.completeUploadSession(session.id)
+    localStorage.removeItem(key)
+    return uploaded
+  },
+
   /**
    * 删除文件
    */
@@ -157,13 +275,33 @@ export const filesApi = {
   },
 
   /**
-   * 获取 PDF 溯源信息
+   * 获取 PDF 溯源信息，pages 为页码范围（如 1-20），不传返回全部页
    */
-  getSourceMap(fileId: string) {
-    return api.get<SourceMap>(`/files/${fileId}/source_map`)
+  getSourceMap(fileId: string, pages?: string) {
+    return api.get<SourceMap>(`/files/${fileId}/source_map`, {
+      params: pages ? { pages } : undefined
+    })
       .then(res => res.data)
   },
 
+  /**
+   * 查询 PDF 某页坐标处的溯源块，坐标与 bbox 同一坐标系
+   */
+  hitSourceBlocks(fileId: string, page: number, x: number, y: number) {
+    return api.get<{ blocks: SourceBlockMatch[] }>(`/files/${fileId}/source_map/hit`, {
+      params: { page, x, y }
+    })
+      .then(res => res.data.blocks)
+  },
+
+  /**
+   * 按 Markdown 片段文本查询对应的溯源块
+   */
+  traceSourceBlocks(fileId: string, text: string, page?: number) {
+    return api.post<{ blocks: SourceBlockMatch[] }>(`/files/${fileId}/source_map/trace`, { text, page })
+      .then(res => res.data.blocks)
+  },
+
   /**
    * 导出文件
    */
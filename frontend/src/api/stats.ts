@@ -1,9 +1,24 @@
 import api from './index'
 
+export interface DailyStats {
+  date: string
+  uploads: number
+  parsed: number
+  failed: number
+  pagesParsed: number
+  parseSeconds: number
+}
+
 export interface StatsResponse {
   totalFiles: number
   todayUploads: number
   usedSpace: number
+  parsedFiles: number
+  failedFiles: number
+  failureRate: number
+  pagesParsed: number
+  parseSeconds: number
+  daily: DailyStats[]
   recentFiles: Array<{
     id: string
     name: string
@@ -5,6 +5,9 @@ interface StatsState {
   totalFiles: number
   todayUploads: number
   usedSpace: number
+  pagesParsed: number
+  failureRate: number
+  daily: StatsResponse['daily']
   recentFiles: StatsResponse['recentFiles']
 }
 
@@ -13,6 +16,9 @@ export const useStatsStore = defineStore('stats', {
     totalFiles: 0,
     todayUploads: 0,
     usedSpace: 0,
+    pagesParsed: 0,
+    failureRate: 0,
+    daily: [],
     recentFiles: []
   }),
   
@@ -23,6 +29,9 @@ export const useStatsStore = defineStore('stats', {
         this.totalFiles = response.totalFiles
         this.todayUploads = response.todayUploads
         this.usedSpace = response.usedSpace
+        this.pagesParsed = response.pagesParsed
+        this.failureRate = response.failureRate
+        this.daily = response.daily
         this.recentFiles = response.recentFiles
       } catch (error) {
         console.error('获取统计数据失败:', error)
@@ -32,6 +32,25 @@ export interface FileItem {
   mineru_task_status?: string | null
 }
 
+// /api/files/events 推送的解析进度
+export interface FileProgressEvent {
+  file_id: number | string
+  status: FileStatus
+  parse_stage?: string | null
+  progress_percent?: number | null
+  progress_message?: string | null
+  last_heartbeat_at?: string | null
+  mineru_task_status?: string | null
+}
+
+export interface ContentSearchHit {
+  file_id: number
+  filename: string
+  page: number | null
+  source: 'pages' | 'popo' | 'content'
+  snippet: string
+}
+
 export interface FolderItem {
   id: number
   user_id: string
@@ -70,8 +89,17 @@ export interface SourcePage {
   blocks: SourceBlock[]
 }
 
+// 服务端点选和文本溯源返回的块，附带所在页码
+export interface SourceBlockMatch extends SourceBlock {
+  page: number
+  matched_chars?: number
+}
+
 export interface SourceMap {
   pages: SourcePage[]
+  // 按页范围请求时返回全文档的页数和 bbox 总数
+  page_count?: number
+  block_count?: number
 }
 
 // Popo 后处理生成的文档结构树节点